@@ -0,0 +1,233 @@
+"""
+Admission Control
+=================
+Caps the work uploads cause, not just their size.
+
+Before any OCR runs, the DOCX's pictures are sized from their headers
+(docx_ingest.scan_media) and turned into a job cost:
+
+- memory: encoded bytes plus decoded pixels of every picture (an
+  extraction holds them until its document is done), plus the largest
+  single working set - greyscale copies, the upscaled OCR input and the
+  detector's float tensor
+- cpu: the calibrated estimator's processing seconds for those pixels
+
+Extractions are admitted while the costs in flight fit ADMISSION_MEMORY_MB
+and ADMISSION_CPU_SECONDS. Others wait up to ADMISSION_WAIT_SECONDS
+(background jobs wait in their queue for as long as it takes) and are then
+turned away with AdmissionBusyError. A job that could never fit, or that
+looks like a decompression bomb, is refused at once with
+AdmissionRejectedError. When nothing is in flight, any job that fits the
+budgets on its own is admitted.
+
+The budgets are for the whole service, but the controller lives in each
+process: under SERVING_MODE=prefork every worker gets an equal share
+(budget / SERVE_WORKERS), so all workers together stay within it.
+"""
+
+import os
+import time
+import threading
+from contextlib import contextmanager
+from docx_ingest import MAX_IMAGE_PIXELS, MAX_MEDIA_BYTES
+from extract_metrics_new import UniversalExtractorWithReport, PREPROCESS_MODE
+from instrumentation import ADMISSION_REJECTIONS
+
+ADMISSION_MEMORY_MB = float(os.environ.get('ADMISSION_MEMORY_MB', '1536'))  # Decoded image memory in flight
+ADMISSION_CPU_SECONDS = float(os.environ.get('ADMISSION_CPU_SECONDS', '900'))  # Estimated work in flight
+# Pre-fork workers each admit against their share of the service-wide budgets
+ADMISSION_WORKERS = (max(1, int(os.environ.get('SERVE_WORKERS', '2')))
+                     if os.environ.get('SERVING_MODE') == 'prefork' else 1)
+ADMISSION_WAIT_SECONDS = float(os.environ.get('ADMISSION_WAIT_SECONDS', '30'))  # Before answering 503
+MAX_COMPRESSION_RATIO = 100  # Uncompressed / compressed size of one picture
+COMPRESSION_CHECK_BYTES = 1024 * 1024  # Small entries may compress well legitimately
+
+DECODED_BYTES_PER_PIXEL = 4  # RGBA, the widest mode screenshots decode to
+WORKING_BYTES_PER_PIXEL = 2  # Greyscale and contrast-enhanced copies
+SCALED_BYTES_PER_PIXEL = 2  # Upscaled PIL image and its numpy copy
+DETECTOR_BYTES_PER_PIXEL = 12  # float32 RGB tensor inside the OCR detector
+DETECTOR_MAX_PIXELS = 2560 * 2560  # EasyOCR resizes larger inputs down to its canvas
+UNKNOWN_PIXELS_PER_BYTE = 4  # For pictures whose header could not be read
+
+
+class AdmissionRejectedError(Exception):
+    """The job can never be admitted: too large, or a decompression bomb"""
+
+
+class AdmissionBusyError(Exception):
+    """The budgets stayed full for the whole wait"""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class JobCost:
+    """Estimated peak memory and CPU seconds of one extraction"""
+
+    def __init__(self, memory_bytes=0, cpu_seconds=0.0, images=0, pixels=0):
+        self.memory_bytes = int(memory_bytes)
+        self.cpu_seconds = float(cpu_seconds)
+        self.images = images
+        self.pixels = pixels
+
+    def __add__(self, other):
+        return JobCost(self.memory_bytes + other.memory_bytes, self.cpu_seconds + other.cpu_seconds,
+                       self.images + other.images, self.pixels + other.pixels)
+
+    def to_dict(self):
+        return {
+            'memory_mb': round(self.memory_bytes / (1024 * 1024), 1),
+            'cpu_seconds': round(self.cpu_seconds, 1),
+            'images': self.images,
+            'megapixels': round(self.pixels / 1e6, 3)
+        }
+
+
+def check_media(manifest):
+    """Raises AdmissionRejectedError for pictures that look like decompression bombs"""
+    for entry in manifest.entries:
+        if entry['pixels'] > MAX_IMAGE_PIXELS:
+            raise AdmissionRejectedError(
+                f"{entry['name']} is {entry['width']}x{entry['height']} pixels, "
+                f"over the limit of {MAX_IMAGE_PIXELS / 1e6:.0f} megapixels")
+        if entry['bytes'] > MAX_MEDIA_BYTES:
+            raise AdmissionRejectedError(
+                f"{entry['name']} is {entry['bytes'] // (1024 * 1024)} MB uncompressed, "
+                f"over the limit of {MAX_MEDIA_BYTES // (1024 * 1024)} MB")
+        compressed = max(1, entry.get('compressed_bytes') or entry['bytes'])
+        if entry['bytes'] > COMPRESSION_CHECK_BYTES and entry['bytes'] / compressed > MAX_COMPRESSION_RATIO:
+            raise AdmissionRejectedError(
+                f"{entry['name']} expands {entry['bytes'] // compressed}x when unzipped; refusing it")
+
+
+def scaled_pixels(pixels, preprocess_mode):
+    """Pixels of the OCR input preprocess_image makes from a picture"""
+    extractor = UniversalExtractorWithReport
+    if preprocess_mode == 'adaptive':
+        return min(pixels * extractor.MAX_SCALE ** 2, extractor.PIXEL_BUDGET)
+    return pixels * extractor.SCALE_FACTOR ** 2
+
+
+def estimate_cost(manifest, cpu_seconds, preprocess_mode=None):
+    """JobCost of extracting the pictures in a MediaManifest
+
+    cpu_seconds comes from the calibrated estimator for the same pictures.
+    """
+    preprocess_mode = preprocess_mode or PREPROCESS_MODE
+    held, working, total_pixels = 0, 0, 0
+    for entry in manifest.entries:
+        pixels = entry['pixels'] or entry['bytes'] * UNKNOWN_PIXELS_PER_BYTE
+        scaled = scaled_pixels(pixels, preprocess_mode)
+        held += entry['bytes'] + pixels * DECODED_BYTES_PER_PIXEL
+        working = max(working, pixels * WORKING_BYTES_PER_PIXEL + scaled * SCALED_BYTES_PER_PIXEL
+                      + min(scaled, DETECTOR_MAX_PIXELS) * DETECTOR_BYTES_PER_PIXEL)
+        total_pixels += pixels
+    return JobCost(held + working, cpu_seconds, manifest.image_count, total_pixels)
+
+
+class AdmissionController:
+    """Admits extractions against global memory and CPU budgets"""
+
+    def __init__(self, memory_bytes=int(ADMISSION_MEMORY_MB * 1024 * 1024 / ADMISSION_WORKERS),
+                 cpu_seconds=ADMISSION_CPU_SECONDS / ADMISSION_WORKERS, wait_seconds=ADMISSION_WAIT_SECONDS):
+        self.memory_bytes = memory_bytes
+        self.cpu_seconds = cpu_seconds
+        self.wait_seconds = wait_seconds
+        self._cond = threading.Condition()
+        self._memory_in_use = 0
+        self._cpu_in_use = 0.0
+        self._running = 0
+        self._waiting = 0
+        self._admitted = 0
+        self._rejected = {'too_large': 0, 'busy': 0}
+
+    def check(self, cost):
+        """Raises AdmissionRejectedError when the job could not fit even on an idle service"""
+        if cost.memory_bytes > self.memory_bytes:
+            self._count_rejection('too_large')
+            raise AdmissionRejectedError(
+                f"Extraction needs about {cost.memory_bytes // (1024 * 1024)} MB for {cost.images} images, "
+                f"over the {self.memory_bytes // (1024 * 1024)} MB budget")
+        if cost.cpu_seconds > self.cpu_seconds:
+            self._count_rejection('too_large')
+            raise AdmissionRejectedError(
+                f"Extraction is estimated at {cost.cpu_seconds:.0f}s of OCR, "
+                f"over the {self.cpu_seconds:.0f}s budget")
+
+    def _count_rejection(self, reason):
+        with self._cond:
+            self._rejected[reason] += 1
+        ADMISSION_REJECTIONS.inc(reason=reason)
+
+    def _fits(self, cost):
+        if self._running == 0:
+            return True
+        return (self._memory_in_use + cost.memory_bytes <= self.memory_bytes
+                and self._cpu_in_use + cost.cpu_seconds <= self.cpu_seconds)
+
+    def acquire(self, cost, wait_indefinitely=False):
+        """Blocks until the cost fits the budgets, for at most wait_seconds unless told to wait indefinitely"""
+        self.check(cost)
+        deadline = None if wait_indefinitely else time.monotonic() + self.wait_seconds
+        with self._cond:
+            self._waiting += 1
+            try:
+                while not self._fits(cost):
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        self._rejected['busy'] += 1
+                        ADMISSION_REJECTIONS.inc(reason='busy')
+                        raise AdmissionBusyError(
+                            "The service is at its memory/CPU budget, retry later",
+                            retry_after=max(1, round(self._cpu_in_use)))
+                    self._cond.wait(remaining)
+            finally:
+                self._waiting -= 1
+            self._memory_in_use += cost.memory_bytes
+            self._cpu_in_use += cost.cpu_seconds
+            self._running += 1
+            self._admitted += 1
+        return cost
+
+    def release(self, cost):
+        with self._cond:
+            self._memory_in_use -= cost.memory_bytes
+            self._cpu_in_use -= cost.cpu_seconds
+            self._running -= 1
+            self._cond.notify_all()
+
+    @contextmanager
+    def admit(self, cost, wait_indefinitely=False):
+        """Context manager: `with controller.admit(cost): ...`"""
+        self.acquire(cost, wait_indefinitely)
+        try:
+            yield cost
+        finally:
+            self.release(cost)
+
+    def stats(self):
+        with self._cond:
+            return {
+                'memory_budget_bytes': self.memory_bytes,
+                'memory_in_use_bytes': self._memory_in_use,
+                'cpu_budget_seconds': self.cpu_seconds,
+                'cpu_in_use_seconds': round(self._cpu_in_use, 1),
+                'running': self._running,
+                'waiting': self._waiting,
+                'admitted_total': self._admitted,
+                'rejected_total': dict(self._rejected)
+            }
+
+
+_controller = None
+_controller_lock = threading.Lock()
+
+
+def get_admission_controller():
+    """Returns the process-wide admission controller"""
+    global _controller
+    with _controller_lock:
+        if _controller is None:
+            _controller = AdmissionController()
+        return _controller
@@ -0,0 +1,141 @@
+"""
+Extraction Artifacts
+====================
+Images behind extraction results, served by reference instead of being
+base64-encoded into every response.
+
+A workspace (see workspaces.py) holds:
+- images/<image_file>       originals, exactly as embedded in the DOCX
+- debug/<stem>_processed.png  processed images, when the extraction saved them
+- artifacts.json            the preprocessing settings of the extraction
+- results.json/results.csv  the serialized results, for full extractions
+- derived/                  processed images and thumbnails rendered on demand
+
+Only the original bytes are written during an extraction. The 3x processed
+PNG and the downscaled WebP/JPEG thumbnails are produced the first time
+someone asks for them, then kept next to the originals.
+"""
+
+import io
+import os
+import json
+from PIL import Image, features
+from extract_metrics_new import UniversalExtractorWithReport, PREPROCESS_MODE
+
+ARTIFACT_KINDS = ('original', 'processed')
+MANIFEST = 'artifacts.json'
+DEFAULT_THUMBNAIL_SIZE = 480  # px, longest side
+MAX_THUMBNAIL_SIZE = 2048
+THUMBNAIL_QUALITY = 80
+THUMBNAIL_FORMATS = {
+    'webp': ('WEBP', 'webp'),
+    'jpeg': ('JPEG', 'jpg')
+}
+DEFAULT_THUMBNAIL_FORMAT = 'webp' if features.check('webp') else 'jpeg'
+
+
+class ArtifactNotFound(Exception):
+    pass
+
+
+def write_manifest(workspace, extractor):
+    """Records what is needed to re-render processed images later"""
+    with open(os.path.join(workspace, MANIFEST), 'w', encoding='utf-8') as f:
+        json.dump({'preprocess_mode': extractor.preprocess_mode}, f)
+
+
+def save_original(workspace, extractor, image_file):
+    """Writes one original image's encoded bytes into the workspace"""
+    data = extractor.original_image_bytes(image_file)
+    if data is None:
+        return
+    images_dir = os.path.join(workspace, 'images')
+    os.makedirs(images_dir, exist_ok=True)
+    path = os.path.join(images_dir, image_file)
+    if not os.path.exists(path):
+        with open(path, 'wb') as f:
+            f.write(data)
+
+
+def artifact_urls(workspace_id, image_file):
+    """References to one result's images, relative to the service root"""
+    base = f'/artifacts/{workspace_id}'
+    return {
+        'original_image_url': f'{base}/original/{image_file}',
+        'processed_image_url': f'{base}/processed/{image_file}',
+        'processed_thumbnail_url': f'{base}/processed/{image_file}?size={DEFAULT_THUMBNAIL_SIZE}'
+    }
+
+
+def report_url(workspace_id):
+    """The on-demand HTML report of a workspace that has results.json"""
+    return f'/artifacts/{workspace_id}/report.html'
+
+
+def _write_atomic(path, render):
+    """Renders into a temp file and renames it, so concurrent requests never see half a file"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'wb') as f:
+        render(f)
+    os.replace(tmp_path, path)
+
+
+def _processed_file(workspace, image_file, original):
+    stem = os.path.splitext(image_file)[0]
+    saved = os.path.join(workspace, 'debug', f'{stem}_processed.png')
+    if os.path.isfile(saved):
+        return saved
+
+    path = os.path.join(workspace, 'derived', f'{stem}_processed.png')
+    if not os.path.isfile(path):
+        try:
+            with open(os.path.join(workspace, MANIFEST), 'r', encoding='utf-8') as f:
+                mode = json.load(f).get('preprocess_mode', PREPROCESS_MODE)
+        except (OSError, ValueError):
+            mode = PREPROCESS_MODE
+        renderer = UniversalExtractorWithReport(None, save_artifacts=False, cache=False, workers=0,
+                                                preprocess_mode=mode, load_reader=False)
+        processed = renderer.preprocess_image(original, stem)
+        _write_atomic(path, lambda f: processed.save(f, format='PNG'))
+    return path
+
+
+def _thumbnail_file(source, size, fmt):
+    pil_format, extension = THUMBNAIL_FORMATS[fmt]
+    stem = os.path.splitext(os.path.basename(source))[0]
+    path = os.path.join(os.path.dirname(os.path.dirname(source)), 'derived', f'{stem}_{size}.{extension}')
+    if not os.path.isfile(path):
+        with Image.open(source) as image:
+            thumbnail = image.convert('RGB') if pil_format == 'JPEG' else image.copy()
+            thumbnail.thumbnail((size, size), Image.LANCZOS)
+            buffer = io.BytesIO()
+            thumbnail.save(buffer, format=pil_format, quality=THUMBNAIL_QUALITY)
+        _write_atomic(path, lambda f: f.write(buffer.getvalue()))
+    return path
+
+
+def artifact_file(workspace, kind, image_file, size=None, fmt=None):
+    """Path of an artifact, rendering processed images/thumbnails on first use
+
+    Raises ValueError for bad parameters and ArtifactNotFound when the
+    workspace has no such image.
+    """
+    if kind not in ARTIFACT_KINDS:
+        raise ValueError(f"Unknown artifact kind '{kind}'")
+    if os.path.basename(image_file) != image_file or image_file.startswith('.'):
+        raise ValueError("Invalid image name")
+
+    original = os.path.join(workspace, 'images', image_file)
+    if not os.path.isfile(original):
+        raise ArtifactNotFound(image_file)
+
+    path = original if kind == 'original' else _processed_file(workspace, image_file, original)
+    if size is None and fmt is None:
+        return path
+
+    fmt = fmt or DEFAULT_THUMBNAIL_FORMAT
+    if fmt not in THUMBNAIL_FORMATS:
+        raise ValueError(f"Unsupported thumbnail format '{fmt}'")
+    size = min(MAX_THUMBNAIL_SIZE, max(16, int(size or DEFAULT_THUMBNAIL_SIZE)))
+    return _thumbnail_file(path, size, fmt)
@@ -0,0 +1,320 @@
+"""
+Directory Backfill
+==================
+Extracts every DOCX under one or more directory trees - e.g. two years of
+monthly reports - in one resumable run.
+
+- documents are spread over the OCR worker processes (reader_pool), which
+  load the model once and keep it warm for the whole run
+- every metric is appended to <out>/metrics.jsonl as soon as its document
+  finishes: the serialized result (reports.serialize_result) plus the
+  document path and hash
+- <out>/checkpoint.jsonl records each finished document by the MD5 of its
+  bytes. A rerun skips documents already done - also when they were moved
+  or renamed - and retries failed ones unless --skip-failed. Any metrics a
+  crash left behind for an unfinished document are truncated away first
+- a summary of throughput and failures is printed at the end and written
+  to <out>/summary.json
+
+Usage:
+    python -m backfill <dirs|docx...> [--out backfill_output] [--workers N]
+        [--ocr-backend easyocr|tesseract] [--ocr-fallback <engine>|none]
+        [--debug-info] [--skip-failed] [--restart]
+"""
+
+import os
+import json
+import time
+import hashlib
+import argparse
+from contextlib import nullcontext
+from concurrent.futures import wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
+from reader_pool import get_reader_pool, get_worker_reader, get_ocr_process_pool, reset_ocr_process_pool, OCR_WORKERS
+from docx_ingest import natural_sort_key, HASH_CHUNK
+from extract_metrics_new import UniversalExtractorWithReport
+from ocr_backends import validate_backend, uses_easyocr
+from reports import serialize_result
+
+METRICS_FILE = 'metrics.jsonl'
+CHECKPOINT_FILE = 'checkpoint.jsonl'
+SUMMARY_FILE = 'summary.json'
+IN_FLIGHT_PER_WORKER = 2  # Documents queued per worker; bounds the results held in memory
+
+
+def find_documents(paths):
+    """DOCX paths under the given files and directory trees, in natural order"""
+    documents = []
+    for path in paths:
+        if not os.path.isdir(path):
+            documents.append(path)
+            continue
+        for root, dirs, files in os.walk(path):
+            dirs.sort(key=natural_sort_key)
+            documents.extend(os.path.join(root, f) for f in sorted(files, key=natural_sort_key)
+                             if f.lower().endswith('.docx') and not f.startswith('~$'))
+    return documents
+
+
+def document_hash(path):
+    md5 = hashlib.md5()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b''):
+            md5.update(chunk)
+    return md5.hexdigest()
+
+
+def extract_document(path, options, reader=None):
+    """(serialized results, seconds) of one document"""
+    started = time.time()
+    extractor = UniversalExtractorWithReport(path, reader=reader, workers=0, save_artifacts=False,
+                                             load_reader=False, **options)
+    try:
+        results = [serialize_result(r) for r in extractor.process_document()]
+    finally:
+        extractor.release_images()
+    return results, time.time() - started
+
+
+def _extract_in_worker(path, options):
+    """Worker task: one whole document with the process's warm reader"""
+    return extract_document(path, options, get_worker_reader())
+
+
+class Checkpoint:
+    """Append-only record of finished documents, keyed by document hash
+
+    Each line also stores how far metrics.jsonl had been written, so a
+    resumed run can drop the lines of a document that never finished.
+    """
+
+    def __init__(self, out_dir, restart=False):
+        self.path = os.path.join(out_dir, CHECKPOINT_FILE)
+        self.metrics_path = os.path.join(out_dir, METRICS_FILE)
+        self.entries = {}
+        if restart:
+            for path in (self.path, self.metrics_path):
+                if os.path.exists(path):
+                    os.remove(path)
+        metrics_end = 0
+        if os.path.exists(self.path):
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        break  # A line cut off by the crash
+                    self.entries[entry['document_hash']] = entry
+                    metrics_end = max(metrics_end, entry['metrics_end'])
+        # Metrics past the last checkpointed document belong to one that did not finish
+        if os.path.exists(self.metrics_path) and os.path.getsize(self.metrics_path) > metrics_end:
+            with open(self.metrics_path, 'r+b') as f:
+                f.truncate(metrics_end)
+        self._metrics = open(self.metrics_path, 'a', encoding='utf-8')
+        self._checkpoint = open(self.path, 'a', encoding='utf-8')
+
+    def is_done(self, digest, skip_failed=False):
+        entry = self.entries.get(digest)
+        return entry is not None and (entry['status'] == 'done' or skip_failed)
+
+    def record(self, path, digest, records=None, error=None, seconds=None):
+        """Appends a document's metrics, then its checkpoint line"""
+        for record in records or []:
+            self._metrics.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self._metrics.flush()
+        os.fsync(self._metrics.fileno())
+
+        entry = {
+            'document_hash': digest,
+            'path': path,
+            'status': 'failed' if error else 'done',
+            'error': error,
+            'metrics': len(records or []),
+            'values': sum(1 for r in records or [] if r['value'] is not None),
+            'seconds': round(seconds, 2) if seconds is not None else None,
+            'metrics_end': self._metrics.tell(),
+            'finished_at': time.strftime('%Y-%m-%dT%H:%M:%S')
+        }
+        self._checkpoint.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        self._checkpoint.flush()
+        os.fsync(self._checkpoint.fileno())
+        self.entries[digest] = entry
+        return entry
+
+    def close(self):
+        self._metrics.close()
+        self._checkpoint.close()
+
+
+def metric_records(path, digest, results, debug_info=False):
+    records = []
+    for r in results:
+        record = {'document': path, 'document_hash': digest, **r}
+        if not debug_info:
+            record.pop('debug_info')
+        records.append(record)
+    return records
+
+
+def run_backfill(paths, out_dir='backfill_output', workers=None, ocr_options=None,
+                 debug_info=False, skip_failed=False, restart=False):
+    """Extracts every document under `paths`, resuming from out_dir's checkpoint; returns the summary"""
+    workers = max(1, OCR_WORKERS if workers is None else workers)
+    ocr_options = ocr_options or {}
+    os.makedirs(out_dir, exist_ok=True)
+    checkpoint = Checkpoint(out_dir, restart)
+    started = time.time()
+
+    documents = find_documents(paths)
+    pending, seen = [], set()
+    skipped = duplicates = 0
+    for path in documents:
+        digest = document_hash(path)
+        if digest in seen:
+            duplicates += 1  # The same bytes under another name
+        elif checkpoint.is_done(digest, skip_failed):
+            skipped += 1
+        else:
+            pending.append((path, digest))
+        seen.add(digest)
+
+    print("=" * 60)
+    print(f"Backfill: {len(documents)} documents, {skipped} already done, {duplicates} duplicates, "
+          f"{len(pending)} to process on {workers} worker(s)")
+    print("=" * 60)
+
+    finished = []
+
+    def finish(path, digest, outcome=None, error=None):
+        results, seconds = outcome if outcome else ([], None)
+        entry = checkpoint.record(path, digest, metric_records(path, digest, results, debug_info), error, seconds)
+        finished.append(entry)
+        status = f"✗ {error}" if error else f"✓ {entry['values']}/{entry['metrics']} values in {seconds:.1f}s"
+        print(f"[{len(finished)}/{len(pending)}] {path} {status}")
+
+    interrupted = False
+    try:
+        if workers == 1:
+            easyocr = uses_easyocr(ocr_options.get('ocr_backend'), ocr_options.get('ocr_fallback'))
+            # Straight from the pool: checkout_reader hands out none while OCR_WORKERS > 1
+            with get_reader_pool().reader() if easyocr else nullcontext() as reader:
+                for path, digest in pending:
+                    try:
+                        outcome = extract_document(path, ocr_options, reader)
+                    except Exception as e:
+                        finish(path, digest, error=str(e))
+                    else:
+                        finish(path, digest, outcome)
+        else:
+            _run_parallel(pending, workers, ocr_options, finish)
+    except KeyboardInterrupt:
+        interrupted = True
+        print("\n⏹  Interrupted; rerun the same command to resume")
+    finally:
+        checkpoint.close()
+
+    summary = summarize(finished, skipped, duplicates, len(pending), time.time() - started, interrupted)
+    with open(os.path.join(out_dir, SUMMARY_FILE), 'w', encoding='utf-8') as f:
+        json.dump(summary, f, indent=2, ensure_ascii=False)
+    print_summary(summary, out_dir)
+    return summary
+
+
+def _run_parallel(pending, workers, ocr_options, finish):
+    """Keeps every worker busy with whole documents, recording each as it completes"""
+    pool = get_ocr_process_pool(workers)
+    queue = list(reversed(pending))
+    running = {}
+    try:
+        while queue or running:
+            while queue and len(running) < workers * IN_FLIGHT_PER_WORKER:
+                path, digest = queue.pop()
+                running[pool.submit(_extract_in_worker, path, ocr_options)] = (path, digest)
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                path, digest = running.pop(future)
+                try:
+                    outcome = future.result()
+                except BrokenProcessPool:
+                    raise
+                except Exception as e:
+                    finish(path, digest, error=str(e))
+                else:
+                    finish(path, digest, outcome)
+    except BrokenProcessPool:
+        reset_ocr_process_pool()
+        raise
+    finally:
+        for future in running:
+            future.cancel()
+
+
+def summarize(finished, skipped, duplicates, pending, elapsed, interrupted=False):
+    done = [e for e in finished if e['status'] == 'done']
+    failed = [e for e in finished if e['status'] == 'failed']
+    metrics = sum(e['metrics'] for e in done)
+    return {
+        'documents_processed': len(done),
+        'documents_failed': len(failed),
+        'documents_skipped': skipped,
+        'documents_duplicate': duplicates,
+        'documents_remaining': pending - len(finished),
+        'metrics': metrics,
+        'values_found': sum(e['values'] for e in done),
+        'elapsed_seconds': round(elapsed, 1),
+        'documents_per_minute': round(len(finished) / elapsed * 60, 2) if elapsed else None,
+        'metrics_per_second': round(metrics / elapsed, 2) if elapsed else None,
+        'interrupted': interrupted,
+        'failures': [{'path': e['path'], 'error': e['error']} for e in failed]
+    }
+
+
+def print_summary(summary, out_dir):
+    print("\n" + "=" * 60)
+    print(f"📊 Backfill summary ({summary['elapsed_seconds']}s)")
+    print(f"  processed: {summary['documents_processed']} | failed: {summary['documents_failed']} | "
+          f"skipped: {summary['documents_skipped']} | duplicates: {summary['documents_duplicate']} | "
+          f"remaining: {summary['documents_remaining']}")
+    print(f"  metrics: {summary['metrics']} ({summary['values_found']} with a value)")
+    print(f"  throughput: {summary['documents_per_minute']} documents/min, "
+          f"{summary['metrics_per_second']} metrics/s")
+    for failure in summary['failures']:
+        print(f"  ✗ {failure['path']}: {failure['error']}")
+    print(f"💾 {os.path.join(out_dir, METRICS_FILE)}, {os.path.join(out_dir, SUMMARY_FILE)}")
+    print("=" * 60)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('paths', nargs='+', help='Directories (searched recursively) or DOCX files')
+    parser.add_argument('--out', default='backfill_output', help='Output and checkpoint directory')
+    parser.add_argument('--workers', type=int, help='OCR worker processes (default: OCR_WORKERS, min 1)')
+    parser.add_argument('--ocr-backend', help='easyocr or tesseract')
+    parser.add_argument('--ocr-fallback', help='Fallback engine, or none')
+    parser.add_argument('--debug-info', action='store_true', help='Keep debug_info in metrics.jsonl')
+    parser.add_argument('--skip-failed', action='store_true', help='Do not retry documents that failed before')
+    parser.add_argument('--restart', action='store_true', help='Discard the checkpoint and start over')
+    args = parser.parse_args()
+
+    for path in args.paths:
+        if not os.path.exists(path):
+            raise SystemExit(f"Error: File not found: {path}")
+
+    ocr_options = {}
+    try:
+        if args.ocr_backend:
+            ocr_options['ocr_backend'] = validate_backend(args.ocr_backend)
+        if args.ocr_fallback:
+            ocr_options['ocr_fallback'] = ('' if args.ocr_fallback.lower() == 'none'
+                                           else validate_backend(args.ocr_fallback))
+    except ValueError as e:
+        raise SystemExit(f"Error: {e}")
+
+    summary = run_backfill(args.paths, args.out, args.workers, ocr_options,
+                           args.debug_info, args.skip_failed, args.restart)
+    if summary['documents_failed']:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
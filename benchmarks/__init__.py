@@ -0,0 +1,5 @@
+"""
+Benchmarks for the metrics extraction pipeline.
+
+Run modules with `python -m benchmarks.<name> --help` from the repository root.
+"""
@@ -0,0 +1,149 @@
+"""
+Shared helpers for the benchmark scripts: loading sample images, running
+two extractor configurations side by side, summarising timings and the
+agreement gate the numeric-mode and OCR-backend harnesses share.
+"""
+
+import os
+import json
+import argparse
+import statistics
+from reader_pool import create_reader
+from docx_ingest import load_media, natural_sort_key, IMAGE_EXTENSIONS
+from extract_metrics_new import UniversalExtractorWithReport
+
+
+def load_images(paths):
+    """Returns [(name, encoded bytes)] from image files, directories and DOCX files"""
+    images = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                for filename in sorted(files, key=natural_sort_key):
+                    full = os.path.join(root, filename)
+                    if filename.lower().endswith(IMAGE_EXTENSIONS + ('.docx',)):
+                        images.extend(load_images([full]))
+        elif path.lower().endswith('.docx'):
+            stem = os.path.splitext(os.path.basename(path))[0]
+            images.extend((f'{stem}/{m.name}', m.data) for m in load_media(path))
+        else:
+            with open(path, 'rb') as f:
+                images.append((os.path.basename(path), f.read()))
+    return images
+
+
+def load_golden(path):
+    """Optional {image name: expected value} mapping"""
+    if not path:
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def summarize(values):
+    if not values:
+        return {'mean': 0.0, 'median': 0.0, 'p95': 0.0, 'total': 0.0}
+    ordered = sorted(values)
+    return {
+        'mean': round(statistics.fmean(ordered), 4),
+        'median': round(statistics.median(ordered), 4),
+        'p95': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 4),
+        'total': round(sum(ordered), 4)
+    }
+
+
+def write_json(path, data):
+    if path:
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2)
+        print(f"💾 Results: {path}")
+
+
+def compare_configs(images, reader, configs, reference, golden=None):
+    """Runs every image through each extractor config and scores agreement
+
+    `configs` maps a label to UniversalExtractorWithReport keyword arguments.
+    A value counts as correct when it equals the golden value for the image,
+    or the `reference` config's value when there is no golden entry.
+    """
+    golden = golden or {}
+    extractors = {label: UniversalExtractorWithReport(None, reader=reader, save_artifacts=False,
+                                                      cache=False, workers=0, batch_size=1, **kwargs)
+                  for label, kwargs in configs.items()}
+    rows = []
+    for name, data in images:
+        row = {'image': name}
+        for label, extractor in extractors.items():
+            value, info = extractor.extract_metric_value(data, name)
+            timings = info.get('timings', {})
+            row[label] = {
+                'value': value,
+                'preprocess_seconds': timings.get('preprocess_seconds', 0.0),
+                'ocr_seconds': timings.get('ocr_seconds', 0.0),
+                'preprocess': info.get('preprocess')
+            }
+        expected = golden.get(name, row[reference]['value'])
+        for label in configs:
+            row[label]['correct'] = row[label]['value'] == expected
+        rows.append(row)
+        print(f"{name}: " + " | ".join(f"{label}={row[label]['value']} ({row[label]['ocr_seconds']:.2f}s)"
+                                       for label in configs))
+
+    summary = {}
+    for label in configs:
+        summary[label] = {
+            'accuracy': round(sum(r[label]['correct'] for r in rows) / len(rows), 3) if rows else 0.0,
+            'preprocess_seconds': summarize([r[label]['preprocess_seconds'] for r in rows]),
+            'ocr_seconds': summarize([r[label]['ocr_seconds'] for r in rows])
+        }
+        summary[label]['total_seconds'] = round(summary[label]['preprocess_seconds']['total']
+                                                + summary[label]['ocr_seconds']['total'], 4)
+    summary['reference'] = 'golden' if golden else reference
+    return {'images': rows, 'summary': summary}
+
+
+def print_summary(results, labels):
+    print("=" * 60)
+    for label in labels:
+        s = results['summary'][label]
+        print(f"{label:>9}: accuracy {s['accuracy']:.1%} | preprocess {s['preprocess_seconds']['mean']:.3f}s "
+              f"| OCR {s['ocr_seconds']['mean']:.3f}s (mean per image)")
+
+
+def run_agreement_gate(doc, configs, reference, candidate, labels, min_agreement):
+    """Command-line entry point for harnesses that gate one config on agreeing with another
+
+    Compares the two `configs` on the images given on the command line,
+    reports how often `candidate` selected the same value as `reference` and
+    the speedup, and exits non-zero when agreement is below --min-agreement.
+    `labels` maps both config names to display names for the messages.
+    """
+    parser = argparse.ArgumentParser(description=doc, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('paths', nargs='+', help='Image files, directories or DOCX reports')
+    parser.add_argument('--golden', help='JSON mapping image name -> expected value')
+    parser.add_argument('--min-agreement', type=float, default=min_agreement,
+                        help=f'Required fraction of images where {labels[candidate]} selects the same value '
+                             f'as {labels[reference]} (default: {min_agreement})')
+    parser.add_argument('--json', help='Write machine-readable results here')
+    args = parser.parse_args()
+
+    images = load_images(args.paths)
+    if not images:
+        raise SystemExit("No images found")
+
+    results = compare_configs(images, create_reader(), configs, reference, load_golden(args.golden))
+    summary = results['summary']
+    disagreements = [r['image'] for r in results['images'] if r[candidate]['value'] != r[reference]['value']]
+    summary['agreement'] = round(1 - len(disagreements) / len(results['images']), 3)
+    summary['speedup'] = (round(summary[reference]['total_seconds'] / summary[candidate]['total_seconds'], 2)
+                          if summary[candidate]['total_seconds'] else None)
+
+    print_summary(results, configs)
+    print(f"  agreement with {labels[reference]}: {summary['agreement']:.1%} | speedup: {summary['speedup']}x")
+    for name in disagreements:
+        print(f"  ✗ {name}")
+    write_json(args.json, results)
+
+    if summary['agreement'] < args.min_agreement:
+        raise SystemExit(f"{labels[candidate]} agreement {summary['agreement']:.1%} "
+                         f"is below the required {args.min_agreement:.1%}")
@@ -0,0 +1,144 @@
+"""
+Synthetic DOCX Corpus Generator
+===============================
+Builds reproducible QA-style reports offline: title paragraphs in the
+"Response Time – Jan" / trailing-colon style the extractor looks for, each
+followed by a rendered metric card (green/yellow/red, varied sizes). A
+share of the cards repeat an earlier image byte for byte, to exercise
+de-duplication (python-docx stores a repeated picture once and references
+it again, as Word does for copies of the same picture).
+
+Usage:
+    python -m benchmarks.corpus <out_dir> [--documents 5] [--images 12]
+        [--duplicate-rate 0.2] [--sizes 320x180,640x360,1280x720] [--seed 1]
+
+Writes <out_dir>/report_NN.docx plus manifest.json with the expected
+title/value pairs of every document.
+"""
+
+import io
+import os
+import json
+import random
+import argparse
+from docx import Document
+from docx.shared import Inches
+from PIL import Image, ImageDraw, ImageFont
+
+MONTHS = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+METRICS = [
+    ('Response Time', 'ms', (50, 2000), 0),
+    ('Throughput', '', (100, 5000), 0),
+    ('Error Rate', '%', (0, 15), 2),
+    ('Availability', '%', (95, 100), 2),
+    ('Apdex Score', '', (0, 1), 2),
+    ('CPU Usage', '%', (5, 99), 1),
+]
+COLOURS = {
+    'green': ((46, 160, 67), (230, 255, 237)),
+    'yellow': ((191, 135, 0), (255, 248, 197)),
+    'red': ((207, 34, 46), (255, 235, 233)),
+}
+DEFAULT_SIZES = ((320, 180), (640, 360), (1280, 720))
+
+
+def parse_sizes(text):
+    return tuple(tuple(int(v) for v in size.lower().split('x')) for size in text.split(','))
+
+
+def render_metric_image(value_text, label, colour, size):
+    """A dashboard-style card: a big coloured value and a small label"""
+    foreground, background = COLOURS[colour]
+    width, height = size
+    image = Image.new('RGB', size, background)
+    draw = ImageDraw.Draw(image)
+    draw.rectangle((0, 0, width - 1, height - 1), outline=foreground, width=max(2, width // 160))
+
+    value_font = ImageFont.load_default(size=max(12, height // 3))
+    label_font = ImageFont.load_default(size=max(8, height // 10))
+    left, top, right, bottom = draw.textbbox((0, 0), value_text, font=value_font)
+    draw.text(((width - (right - left)) / 2, height * 0.45 - (bottom - top) / 2), value_text,
+              fill=foreground, font=value_font)
+    draw.text((width * 0.05, height * 0.05), label, fill=(60, 60, 60), font=label_font)
+
+    buffer = io.BytesIO()
+    image.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def random_metric(rng):
+    name, unit, (low, high), decimals = rng.choice(METRICS)
+    value = round(rng.uniform(low, high), decimals)
+    if decimals == 0:
+        value = int(value)
+    return name, unit, value
+
+
+def build_document(rng, image_count, duplicate_rate, sizes):
+    """Returns (docx bytes, [{title, value, colour, size, duplicate}])"""
+    document = Document()
+    document.add_heading('Performance Test Report', level=1)
+    document.add_paragraph('Generated benchmark document.')
+
+    entries = []
+    rendered = []  # (png bytes, entry) of unique cards, for duplicates
+    for i in range(image_count):
+        if rendered and rng.random() < duplicate_rate:
+            png, original = rng.choice(rendered)
+            entry = dict(original, duplicate=True)
+        else:
+            name, unit, value = random_metric(rng)
+            colour = rng.choice(list(COLOURS))
+            size = rng.choice(sizes)
+            png = render_metric_image(f'{value}{unit}', name, colour, size)
+            entry = {'value': value, 'colour': colour, 'size': list(size), 'duplicate': False, 'metric': name}
+            rendered.append((png, entry))
+
+        # Alternate between the two title styles the extractor recognises
+        if i % 2 == 0:
+            title = f"{entry['metric']} {i + 1} – {rng.choice(MONTHS)}"
+        else:
+            title = f"{entry['metric']} {i + 1}:"
+        document.add_paragraph(title)
+        document.add_picture(io.BytesIO(png), width=Inches(4))
+        entries.append(dict(entry, title=title))
+
+    buffer = io.BytesIO()
+    document.save(buffer)
+    return buffer.getvalue(), entries
+
+
+def generate_corpus(out_dir, documents=5, images=12, duplicate_rate=0.2, sizes=DEFAULT_SIZES, seed=1):
+    """Writes the corpus and returns its manifest"""
+    rng = random.Random(seed)
+    os.makedirs(out_dir, exist_ok=True)
+    manifest = {'seed': seed, 'duplicate_rate': duplicate_rate, 'documents': {}}
+    for n in range(1, documents + 1):
+        data, entries = build_document(rng, images, duplicate_rate, sizes)
+        filename = f'report_{n:02d}.docx'
+        with open(os.path.join(out_dir, filename), 'wb') as f:
+            f.write(data)
+        manifest['documents'][filename] = entries
+        print(f"✓ {filename}: {len(entries)} images ({sum(e['duplicate'] for e in entries)} duplicates)")
+
+    with open(os.path.join(out_dir, 'manifest.json'), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('out_dir')
+    parser.add_argument('--documents', type=int, default=5)
+    parser.add_argument('--images', type=int, default=12, help='Images per document')
+    parser.add_argument('--duplicate-rate', type=float, default=0.2,
+                        help='Chance that an image repeats an earlier one (default: 0.2)')
+    parser.add_argument('--sizes', type=parse_sizes, default=DEFAULT_SIZES,
+                        help='Comma-separated WxH image sizes to pick from')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+    generate_corpus(args.out_dir, args.documents, args.images, args.duplicate_rate, args.sizes, args.seed)
+
+
+if __name__ == "__main__":
+    main()
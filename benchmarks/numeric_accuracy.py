@@ -0,0 +1,30 @@
+"""
+Numeric Mode Accuracy Harness
+=============================
+Runs a golden set through the full-alphabet and the numeric OCR modes and
+reports, per image, the time taken and whether the numeric mode selected
+the same `value`. Exits non-zero when agreement is below --min-agreement,
+so it can gate turning OCR_MODE=numeric on.
+
+Usage:
+    python -m benchmarks.numeric_accuracy <images|dirs|docx...> [--golden golden.json]
+        [--min-agreement 1.0] [--json out.json]
+
+Without a golden file, the full mode's value is the reference.
+"""
+
+from benchmarks.common import run_agreement_gate
+
+CONFIGS = {
+    'full': {'ocr_mode': 'full'},
+    'numeric': {'ocr_mode': 'numeric'}
+}
+LABELS = {'full': 'full mode', 'numeric': 'Numeric mode'}
+
+
+def main():
+    run_agreement_gate(__doc__, CONFIGS, 'full', 'numeric', LABELS, min_agreement=1.0)
+
+
+if __name__ == "__main__":
+    main()
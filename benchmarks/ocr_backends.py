@@ -0,0 +1,31 @@
+"""
+OCR Backend Comparison
+======================
+Runs the same images through the EasyOCR and Tesseract backends (see
+ocr_backends.py) and reports the time each took and how often Tesseract
+selected the same `value` as EasyOCR. Exits non-zero when agreement is
+below --min-agreement, so it can gate switching OCR_BACKEND.
+
+Usage:
+    python -m benchmarks.ocr_backends <images|dirs|docx...> [--golden golden.json]
+        [--min-agreement 0.0] [--json out.json]
+
+Without a golden file, EasyOCR's value is the reference. Fallbacks are off
+so each engine is measured on its own.
+"""
+
+from benchmarks.common import run_agreement_gate
+
+CONFIGS = {
+    'easyocr': {'ocr_backend': 'easyocr', 'ocr_fallback': ''},
+    'tesseract': {'ocr_backend': 'tesseract', 'ocr_fallback': ''}
+}
+LABELS = {'easyocr': 'EasyOCR', 'tesseract': 'Tesseract'}
+
+
+def main():
+    run_agreement_gate(__doc__, CONFIGS, 'easyocr', 'tesseract', LABELS, min_agreement=0.0)
+
+
+if __name__ == "__main__":
+    main()
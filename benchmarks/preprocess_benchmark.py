@@ -0,0 +1,47 @@
+"""
+Preprocessing Benchmark
+=======================
+Compares the fixed (grayscale -> contrast -> 3x LANCZOS) pipeline with the
+adaptive one (text-region crop -> glyph-height scale -> pixel budget) on
+the same images: preprocessing and OCR time and whether the selected value
+matches.
+
+Usage:
+    python -m benchmarks.preprocess_benchmark <images|dirs|docx...> [--golden golden.json] [--json out.json]
+
+Without a golden file, the fixed pipeline's value is the reference.
+"""
+
+import argparse
+from reader_pool import create_reader
+from benchmarks.common import load_images, load_golden, compare_configs, print_summary, write_json
+
+CONFIGS = {
+    'fixed': {'preprocess_mode': 'fixed'},
+    'adaptive': {'preprocess_mode': 'adaptive'}
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('paths', nargs='+', help='Image files, directories or DOCX reports')
+    parser.add_argument('--golden', help='JSON mapping image name -> expected value')
+    parser.add_argument('--json', help='Write machine-readable results here')
+    args = parser.parse_args()
+
+    images = load_images(args.paths)
+    if not images:
+        raise SystemExit("No images found")
+
+    results = compare_configs(images, create_reader(), CONFIGS, 'fixed', load_golden(args.golden))
+    fixed, adaptive = results['summary']['fixed'], results['summary']['adaptive']
+    results['summary']['speedup'] = (round(fixed['total_seconds'] / adaptive['total_seconds'], 2)
+                                     if adaptive['total_seconds'] else None)
+
+    print_summary(results, CONFIGS)
+    print(f"  speedup: {results['summary']['speedup']}x")
+    write_json(args.json, results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+"""
+Benchmark Runner
+================
+Times a DOCX corpus (see benchmarks.corpus) three ways:
+
+- stages: each document through UniversalExtractorWithReport.process_document,
+  broken down by the instrumentation spans (docx.parse, media.extract,
+  preprocess, ocr, ...)
+- endpoints: /estimate and /extract-simple through the Flask test client
+- concurrency: N simultaneous /extract-simple uploads, as throughput
+
+Peak RSS of the process (and of OCR worker processes) is recorded too.
+Results are written as JSON; with --baseline, any stage or endpoint whose
+mean got slower by more than --threshold fails the run.
+
+Usage:
+    python -m benchmarks.runner <corpus_dir> [--repeat 3] [--concurrency 4]
+        [--json results.json] [--baseline previous.json] [--threshold 0.25]
+
+The OCR cache is off unless --use-cache is given, so repeats measure real work.
+"""
+
+import os
+import sys
+import json
+import time
+import tempfile
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import ocr_cache
+from reader_pool import checkout_reader
+from instrumentation import collect_timings
+from extract_metrics_new import UniversalExtractorWithReport
+from benchmarks.common import summarize, write_json
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+ENDPOINTS = ('/estimate', '/extract-simple')
+
+
+def find_documents(corpus_dir):
+    return sorted(os.path.join(corpus_dir, f) for f in os.listdir(corpus_dir) if f.lower().endswith('.docx'))
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process and of its reaped children, in MB"""
+    if resource is None:
+        return {'self': None, 'children': None}
+    # ru_maxrss is KB on Linux, bytes on macOS
+    scale = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    return {
+        'self': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale, 1),
+        'children': round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale, 1)
+    }
+
+
+def bench_stages(documents, repeat):
+    """Per-stage seconds for each document run, from the instrumentation spans"""
+    samples = {}
+    with checkout_reader() as reader:
+        for _ in range(repeat):
+            for path in documents:
+                with collect_timings() as timings:
+                    started = time.perf_counter()
+                    extractor = UniversalExtractorWithReport(path, reader=reader, save_artifacts=False)
+                    results = extractor.process_document()
+                    extractor.release_images()
+                timings['total'] = time.perf_counter() - started
+                for stage, seconds in timings.items():
+                    samples.setdefault(stage, []).append(seconds)
+                print(f"  {os.path.basename(path)}: {len(results)} metrics in {timings['total']:.2f}s")
+    return {stage: summarize(values) for stage, values in sorted(samples.items())}
+
+
+def post_document(client, endpoint, path):
+    with open(path, 'rb') as f:
+        data = {'file': (f, os.path.basename(path))}
+        started = time.perf_counter()
+        response = client.post(endpoint, data=data, content_type='multipart/form-data')
+        elapsed = time.perf_counter() - started
+    if response.status_code != 200:
+        raise RuntimeError(f"{endpoint} returned {response.status_code} for {path}: {response.get_data(as_text=True)}")
+    return elapsed, response.get_json()
+
+
+def bench_endpoints(app, documents, repeat):
+    client = app.test_client()
+    samples = {endpoint: [] for endpoint in ENDPOINTS}
+    for _ in range(repeat):
+        for path in documents:
+            for endpoint in ENDPOINTS:
+                elapsed, _ = post_document(client, endpoint, path)
+                samples[endpoint].append(elapsed)
+    return {endpoint: summarize(values) for endpoint, values in samples.items()}
+
+
+def bench_concurrency(app, documents, concurrency):
+    """Wall time and throughput of `concurrency` simultaneous /extract-simple uploads"""
+    uploads = [documents[i % len(documents)] for i in range(max(concurrency, len(documents)))]
+    local = threading.local()
+
+    def upload(path):
+        if not hasattr(local, 'client'):
+            local.client = app.test_client()
+        elapsed, body = post_document(local.client, '/extract-simple', path)
+        return elapsed, body['count']
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        outcomes = list(pool.map(upload, uploads))
+    wall = time.perf_counter() - started
+
+    images = sum(count for _, count in outcomes)
+    return {
+        'concurrency': concurrency,
+        'uploads': len(uploads),
+        'wall_seconds': round(wall, 3),
+        'documents_per_second': round(len(uploads) / wall, 3),
+        'images_per_second': round(images / wall, 3),
+        'latency_seconds': summarize([elapsed for elapsed, _ in outcomes])
+    }
+
+
+def find_regressions(results, baseline, threshold, min_seconds):
+    """[(name, baseline mean, current mean)] for every timing that slowed past the threshold"""
+    regressions = []
+    for section in ('stages', 'endpoints'):
+        for name, current in results.get(section, {}).items():
+            previous = baseline.get(section, {}).get(name)
+            if not previous:
+                continue
+            before, after = previous['mean'], current['mean']
+            if after > before * (1 + threshold) and after - before > min_seconds:
+                regressions.append((f'{section}/{name}', before, after))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('corpus_dir', help='Directory of .docx files (python -m benchmarks.corpus builds one)')
+    parser.add_argument('--repeat', type=int, default=1, help='Passes over the corpus (default: 1)')
+    parser.add_argument('--concurrency', type=int, default=4, help='Simultaneous uploads (0 to skip)')
+    parser.add_argument('--use-cache', action='store_true', help='Leave the OCR cache on')
+    parser.add_argument('--json', help='Write machine-readable results here')
+    parser.add_argument('--baseline', help='Results JSON of an earlier run to compare against')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='Allowed slowdown of a mean timing vs the baseline (default: 0.25 = 25%%)')
+    parser.add_argument('--min-seconds', type=float, default=0.01,
+                        help='Ignore slowdowns smaller than this many seconds (default: 0.01)')
+    args = parser.parse_args()
+
+    documents = find_documents(args.corpus_dir)
+    if not documents:
+        raise SystemExit(f"No .docx files in {args.corpus_dir}")
+
+    ocr_cache.OCR_CACHE_ENABLED = args.use_cache
+    import metrics_service  # Imported late: loading the service builds its estimator and job manager
+    # Keep benchmark runs out of the service's calibration data
+    metrics_service.estimator.path = os.path.join(tempfile.gettempdir(), 'benchmark_estimator.json')
+
+    print(f"Benchmarking {len(documents)} documents from {args.corpus_dir}")
+    print("Stages...")
+    results = {
+        'corpus': os.path.abspath(args.corpus_dir),
+        'documents': len(documents),
+        'repeat': args.repeat,
+        'ocr_cache': args.use_cache,
+        'stages': bench_stages(documents, args.repeat)
+    }
+    print("Endpoints...")
+    results['endpoints'] = bench_endpoints(metrics_service.app, documents, args.repeat)
+    if args.concurrency > 0:
+        print(f"Concurrency ({args.concurrency} uploads)...")
+        results['concurrency'] = bench_concurrency(metrics_service.app, documents, args.concurrency)
+    results['peak_rss_mb'] = peak_rss_mb()
+
+    print("=" * 60)
+    for stage, s in results['stages'].items():
+        print(f"{stage:>24}: mean {s['mean']:.4f}s | p95 {s['p95']:.4f}s")
+    for endpoint, s in results['endpoints'].items():
+        print(f"{endpoint:>24}: mean {s['mean']:.4f}s | p95 {s['p95']:.4f}s")
+    if 'concurrency' in results:
+        c = results['concurrency']
+        print(f"{'throughput':>24}: {c['documents_per_second']} docs/s, {c['images_per_second']} images/s")
+    print(f"{'peak RSS':>24}: {results['peak_rss_mb']['self']} MB (children {results['peak_rss_mb']['children']} MB)")
+    write_json(args.json, results)
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = find_regressions(results, baseline, args.threshold, args.min_seconds)
+        for name, before, after in regressions:
+            print(f"  ✗ {name}: {before:.4f}s -> {after:.4f}s")
+        if regressions:
+            raise SystemExit(f"{len(regressions)} timing(s) regressed more than {args.threshold:.0%}")
+        print(f"✓ No regressions beyond {args.threshold:.0%} of {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -80,14 +80,18 @@ function renderMetricDebugCard(metric, idx) {
     const valueClass = hasValue ? 'value-success' : 'value-failure';
     const displayValue = hasValue ? metric.value : 'FAILED';
     
-    // Images
+    // Images: inline base64 when present, otherwise loaded from the artifact URLs when scrolled into view
     const originalImage = debug.original_image 
         ? `<img src="data:image/png;base64,${debug.original_image}" class="debug-image" alt="Original Image">` 
-        : '<div class="no-image">No image available</div>';
+        : debug.original_image_url
+            ? `<img src="${debug.original_image_url}" loading="lazy" class="debug-image" alt="Original Image">`
+            : '<div class="no-image">No image available</div>';
         
     const processedImage = debug.processed_image 
         ? `<img src="data:image/png;base64,${debug.processed_image}" class="debug-image" alt="Processed Image">` 
-        : '<div class="no-image">No image available</div>';
+        : debug.processed_image_url
+            ? `<a href="${debug.processed_image_url}" target="_blank" rel="noopener"><img src="${debug.processed_thumbnail_url || debug.processed_image_url}" loading="lazy" class="debug-image" alt="Processed Image"></a>`
+            : '<div class="no-image">No image available</div>';
 
     // Candidates Table
     const candidates = debug.candidates || [];
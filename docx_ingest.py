@@ -0,0 +1,428 @@
+"""
+In-Memory DOCX Ingestion
+========================
+Reads images and titles straight out of the DOCX zip archive.
+
+A DOCX is a zip file whose embedded pictures live under `word/media/`.
+Reading them from the archive in memory, hashing while iterating and
+decoding each picture once replaces the old round trip of saving the
+upload, unpacking every image to disk with docx2txt and reading each file
+back to hash, preprocess and base64 it.
+
+`DocxDocumentModel` is built by one streaming walk of `word/document.xml`
+and is shared by the estimate, title extraction and image extraction, so
+a request no longer parses the same document three times.
+
+`scan_media` is the cheapest view of all: it reads only the zip central
+directory and the first bytes of each picture to get its pixel size.
+
+Media entries are read and hashed in chunks. An entry that inflates past
+MAX_MEDIA_MB is abandoned mid-stream, and an entry whose CRC and size
+match one already read is hashed without being kept in memory. PIL
+refuses to decode images of more than twice MAX_IMAGE_PIXELS.
+"""
+
+import io
+import os
+import re
+import zipfile
+import hashlib
+import struct
+import posixpath
+import xml.etree.ElementTree as ET
+from PIL import Image
+from instrumentation import span
+
+MEDIA_PREFIX = 'word/media/'
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+DOCUMENT_XML = 'word/document.xml'
+DOCUMENT_RELS = 'word/_rels/document.xml.rels'
+
+W_NS = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+A_NS = '{http://schemas.openxmlformats.org/drawingml/2006/main}'
+R_NS = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}'
+PKG_REL_NS = '{http://schemas.openxmlformats.org/package/2006/relationships}'
+
+HEADER_CHUNK = 4096
+MAX_HEADER_BYTES = 256 * 1024  # JPEG SOF markers can sit behind large EXIF blocks
+HASH_CHUNK = 1024 * 1024
+MAX_MEDIA_BYTES = int(os.environ.get('MAX_MEDIA_MB', '64')) * 1024 * 1024  # Per picture, uncompressed
+MAX_IMAGE_PIXELS = int(os.environ.get('MAX_IMAGE_PIXELS', str(50_000_000)))  # Per picture
+
+# PIL warns above this and raises DecompressionBombError above twice this
+Image.MAX_IMAGE_PIXELS = MAX_IMAGE_PIXELS
+
+TITLE_PATTERN = re.compile(r'[–-]\s*(Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)', re.IGNORECASE)
+MAX_TITLE_LENGTH = 100
+
+
+def natural_sort_key(filename):
+    """Sorts 'image10.png' after 'image2.png'"""
+    parts = re.split(r'(\d+)', filename)
+    return [int(part) if part.isdigit() else part.lower() for part in parts]
+
+
+def rewind(source):
+    """Seeks file-like sources back to the start; paths are returned unchanged"""
+    if hasattr(source, 'seek'):
+        source.seek(0)
+    return source
+
+
+def open_image(source):
+    """Opens a PIL image from a path, raw bytes or an already decoded image"""
+    if isinstance(source, Image.Image):
+        return source
+    if isinstance(source, (bytes, bytearray)):
+        return Image.open(io.BytesIO(source))
+    if isinstance(source, MediaImage):
+        return source.image
+    return Image.open(source)
+
+
+def is_title(text):
+    """Metric titles look like 'Response Time – Jan' or end with a colon"""
+    if not text or len(text) >= MAX_TITLE_LENGTH:
+        return False
+    return bool(TITLE_PATTERN.search(text)) or text.endswith(':')
+
+
+class DocxDocumentModel:
+    """Titles and image references of a DOCX, from one pass over its XML
+
+    - titles: top-level body paragraphs that look like metric titles
+    - image_rids: relationship ids of every picture reference, in document order
+    - image_targets: rId -> media filename (e.g. 'image3.png')
+    """
+
+    def __init__(self, titles, image_rids, image_targets):
+        self.titles = titles
+        self.image_rids = image_rids
+        self.image_targets = image_targets
+
+    @property
+    def image_count(self):
+        return len(self.image_rids)
+
+    @property
+    def image_references(self):
+        """Media filename behind every picture reference, in document order (None if unresolved)"""
+        return [self.image_targets.get(rid) for rid in self.image_rids]
+
+    @property
+    def media_order(self):
+        """Media filenames in order of first appearance in the document"""
+        order = []
+        for rid in self.image_rids:
+            name = self.image_targets.get(rid)
+            if name and name not in order:
+                order.append(name)
+        return order
+
+    @classmethod
+    def from_source(cls, source):
+        """Builds the model from a path or seekable file-like object"""
+        with zipfile.ZipFile(rewind(source)) as archive:
+            image_targets = _read_image_targets(archive)
+            with archive.open(DOCUMENT_XML) as xml_file:
+                titles, image_rids = _walk_document(xml_file)
+        return cls(titles, image_rids, image_targets)
+
+
+def _read_image_targets(archive):
+    if DOCUMENT_RELS not in archive.namelist():
+        return {}
+    targets = {}
+    root = ET.fromstring(archive.read(DOCUMENT_RELS))
+    for rel in root.iter(f'{PKG_REL_NS}Relationship'):
+        if rel.get('Type', '').endswith('/image') and rel.get('TargetMode') != 'External':
+            targets[rel.get('Id')] = posixpath.basename(rel.get('Target', ''))
+    return targets
+
+
+def _walk_document(xml_file):
+    """Streams document.xml once, collecting body-level titles and blip references"""
+    body_tag, p_tag, t_tag = f'{W_NS}body', f'{W_NS}p', f'{W_NS}t'
+    tab_tag, br_tag, cr_tag = f'{W_NS}tab', f'{W_NS}br', f'{W_NS}cr'
+    blip_tag, embed_attr = f'{A_NS}blip', f'{R_NS}embed'
+
+    titles, image_rids = [], []
+    depth = 0
+    body_depth = None
+    paragraph_depths = []  # Depths of the w:p elements we are inside
+    text_parts = []
+
+    for event, elem in ET.iterparse(xml_file, events=('start', 'end')):
+        if event == 'start':
+            depth += 1
+            if elem.tag == body_tag:
+                body_depth = depth
+            elif elem.tag == p_tag:
+                paragraph_depths.append(depth)
+                if body_depth is not None and depth == body_depth + 1:
+                    text_parts = []
+            elif elem.tag == blip_tag and elem.get(embed_attr):
+                image_rids.append(elem.get(embed_attr))
+            continue
+
+        # Only text of the top-level paragraph itself counts (not nested text boxes)
+        in_top_paragraph = (body_depth is not None and len(paragraph_depths) == 1
+                            and paragraph_depths[0] == body_depth + 1)
+        if in_top_paragraph:
+            if elem.tag == t_tag:
+                text_parts.append(elem.text or '')
+            elif elem.tag == tab_tag:
+                text_parts.append('\t')
+            elif elem.tag in (br_tag, cr_tag):
+                text_parts.append('\n')
+
+        if elem.tag == p_tag:
+            if in_top_paragraph:
+                text = ''.join(text_parts).strip()
+                if is_title(text):
+                    titles.append(text)
+            paragraph_depths.pop()
+        if body_depth is not None and depth == body_depth + 1:
+            elem.clear()  # Keep memory flat on large documents
+        depth -= 1
+
+    return titles, image_rids
+
+
+class MediaImage:
+    """One embedded picture, held in memory and decoded at most once"""
+
+    def __init__(self, name, data, md5):
+        self.name = name
+        self.data = data
+        self.md5 = md5
+        self._image = None
+
+    @property
+    def image(self):
+        if self._image is None:
+            self._image = Image.open(io.BytesIO(self.data))
+            self._image.load()
+        return self._image
+
+    def release(self):
+        """Drops the decoded pixels; the encoded bytes stay available"""
+        self._image = None
+
+
+class MediaTooLargeError(ValueError):
+    """Raised when a picture inflates past MAX_MEDIA_BYTES"""
+
+
+def read_media(archive, info, keep=True, max_bytes=MAX_MEDIA_BYTES):
+    """(bytes or None, md5) of a zip entry, read and hashed chunk by chunk
+
+    With keep=False only the hash is computed, so a duplicate never sits
+    in memory whole. Reading stops as soon as the entry passes max_bytes,
+    whatever its central directory entry claims.
+    """
+    digest = hashlib.md5()
+    buffer = bytearray() if keep else None
+    size = 0
+    with archive.open(info) as f:
+        while True:
+            chunk = f.read(HASH_CHUNK)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > max_bytes:
+                raise MediaTooLargeError(f"{os.path.basename(info.filename)} inflates past "
+                                         f"{max_bytes // (1024 * 1024)} MB")
+            with span('media.hash'):
+                digest.update(chunk)
+            if keep:
+                buffer += chunk
+    return (bytes(buffer) if keep else None), digest.hexdigest()
+
+
+def load_media(source, order=None, aliases=None):
+    """Returns the unique images under word/media/
+
+    `source` is a path or a seekable file-like object. Images are returned
+    in `order` (media filenames, usually DocxDocumentModel.media_order),
+    with any unreferenced entries after them in natural filename order.
+    Duplicates (same MD5) are dropped as the archive is iterated, keeping
+    the first entry; `aliases`, when given, is filled with {dropped
+    filename: kept filename}.
+    """
+    position = {name: i for i, name in enumerate(order or [])}
+    with zipfile.ZipFile(rewind(source)) as archive:
+        entries = [info for info in archive.infolist()
+                   if info.filename.startswith(MEDIA_PREFIX)
+                   and info.filename.lower().endswith(IMAGE_EXTENSIONS)]
+        entries.sort(key=lambda info: (position.get(os.path.basename(info.filename), len(position)),
+                                       natural_sort_key(os.path.basename(info.filename))))
+
+        media = []
+        kept = {}  # md5 -> filename
+        seen_entries = set()
+        aliases = {} if aliases is None else aliases
+        for info in entries:
+            name = os.path.basename(info.filename)
+            key = (info.CRC, info.file_size)
+            if key in seen_entries:
+                # Very likely a copy: confirm by hash before reading it into memory
+                _, md5 = read_media(archive, info, keep=False)
+                if md5 in kept:
+                    aliases[name] = kept[md5]
+                    continue
+            seen_entries.add(key)
+            data, md5 = read_media(archive, info)
+            if md5 in kept:
+                aliases[name] = kept[md5]
+                continue
+            kept[md5] = name
+            media.append(MediaImage(name, data, md5))
+        return media
+
+
+def pair_titles_with_media(titles, references, media, aliases=None):
+    """[(title, MediaImage)] pairing each title with the picture referenced at its position
+
+    `references` are DocxDocumentModel.image_references and `aliases` the
+    ones load_media filled in. A picture used more than once pairs with every
+    title that uses it, and references to media that was not loaded are
+    skipped with their title. When no reference resolves, titles pair with
+    `media` in order.
+    """
+    by_name = {m.name: m for m in media}
+    aliases = aliases or {}
+    resolved = [by_name.get(aliases.get(name, name)) for name in references]
+    if not any(resolved):
+        resolved = media
+    return [(title, m) for title, m in zip(titles, resolved) if m is not None]
+
+
+def docx_sources(source, name=None, max_bytes=None):
+    """[(name, file-like)] of the DOCX documents in a .docx or a .zip of them
+
+    A DOCX is itself a zip, so a plain zip is told apart by not having
+    word/document.xml. Members of a zip are read into memory; anything
+    that is not a .docx (and macOS resource forks) is skipped. Raises
+    ValueError when the uncompressed documents exceed max_bytes.
+    """
+    name = name or os.path.basename(getattr(source, 'name', None) or str(source))
+    with zipfile.ZipFile(rewind(source)) as archive:
+        members = archive.namelist()
+        if DOCUMENT_XML in members:
+            return [(name, rewind(source))]
+
+        entries = [info for info in archive.infolist()
+                   if info.filename.lower().endswith('.docx') and not info.is_dir()
+                   and not info.filename.startswith('__MACOSX/')
+                   and not os.path.basename(info.filename).startswith('~$')]
+        total = sum(info.file_size for info in entries)
+        if max_bytes is not None and total > max_bytes:
+            raise ValueError(f"{name} expands to {total // (1024 * 1024)} MB of documents, "
+                             f"over the {max_bytes // (1024 * 1024)} MB limit")
+        entries.sort(key=lambda info: natural_sort_key(info.filename))
+        return [(posixpath.basename(info.filename), io.BytesIO(archive.read(info))) for info in entries]
+
+
+# ---------------------------------------------------------------------------
+# Header-only media scan (fast estimate)
+# ---------------------------------------------------------------------------
+
+def image_size_from_header(header):
+    """Pixel (width, height) from the leading bytes of a PNG/JPEG/GIF/BMP, or None"""
+    if header[:8] == b'\x89PNG\r\n\x1a\n' and len(header) >= 24:
+        return struct.unpack('>II', header[16:24])
+    if header[:6] in (b'GIF87a', b'GIF89a') and len(header) >= 10:
+        return struct.unpack('<HH', header[6:10])
+    if header[:2] == b'BM' and len(header) >= 26:
+        width, height = struct.unpack('<ii', header[18:26])
+        return width, abs(height)
+    if header[:2] == b'\xff\xd8':
+        return _jpeg_size(header)
+    return None
+
+
+def _jpeg_size(header):
+    # Walk the marker segments until a start-of-frame (SOF0..SOF15, minus DHT/JPG/DAC)
+    i = 2
+    while i + 9 < len(header):
+        if header[i] != 0xFF:
+            i += 1
+            continue
+        marker = header[i + 1]
+        if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7 or marker == 0xFF:
+            i += 1 if marker == 0xFF else 2
+            continue
+        length = struct.unpack('>H', header[i + 2:i + 4])[0]
+        if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+            height, width = struct.unpack('>HH', header[i + 5:i + 9])
+            return width, height
+        i += 2 + length
+    return None
+
+
+class MediaManifest:
+    """What the zip manifest and image headers say about a DOCX's pictures"""
+
+    def __init__(self, entries):
+        self.entries = entries
+
+    @property
+    def image_count(self):
+        return len(self.entries)
+
+    @property
+    def total_pixels(self):
+        return sum(e['pixels'] for e in self.entries)
+
+    @property
+    def megapixels(self):
+        return self.total_pixels / 1e6
+
+    def to_dict(self):
+        return {
+            'image_count': self.image_count,
+            'total_pixels': self.total_pixels,
+            'megapixels': round(self.megapixels, 3),
+            'images': self.entries
+        }
+
+
+def scan_media(source):
+    """Lists the distinct pictures of a DOCX without parsing XML or decoding pixels
+
+    Duplicates are detected from the CRC-32 and size recorded in the zip
+    central directory, so no entry has to be read in full.
+    """
+    entries = []
+    seen = set()
+    with zipfile.ZipFile(rewind(source)) as archive:
+        for info in archive.infolist():
+            if not (info.filename.startswith(MEDIA_PREFIX)
+                    and info.filename.lower().endswith(IMAGE_EXTENSIONS)):
+                continue
+            if (info.CRC, info.file_size) in seen:
+                continue
+            seen.add((info.CRC, info.file_size))
+
+            size = None
+            with archive.open(info) as f:
+                header = b''
+                while size is None and len(header) < min(info.file_size, MAX_HEADER_BYTES):
+                    chunk = f.read(HEADER_CHUNK)
+                    if not chunk:
+                        break
+                    header += chunk
+                    size = image_size_from_header(header)
+
+            width, height = size or (0, 0)
+            entries.append({
+                'name': os.path.basename(info.filename),
+                'bytes': info.file_size,
+                'compressed_bytes': info.compress_size,
+                'width': width,
+                'height': height,
+                'pixels': width * height
+            })
+    entries.sort(key=lambda e: natural_sort_key(e['name']))
+    return MediaManifest(entries)
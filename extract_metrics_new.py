@@ -9,95 +9,277 @@ Features:
 5. VISUAL HTML REPORT for verification
 """
 
+import io
 import os
-import docx2txt
-from docx import Document
-from docx.oxml.text.paragraph import CT_P
-import easyocr
 from PIL import Image, ImageEnhance
 import numpy as np
 import json
 import re
-import csv
 import hashlib
-
-def natural_sort_key(filename):
-    """Sorts 'image10.png' after 'image2.png'"""
-    parts = re.split(r'(\d+)', filename)
-    return [int(part) if part.isdigit() else part.lower() for part in parts]
+import shutil
+import time
+from concurrent.futures.process import BrokenProcessPool
+from reader_pool import (checkout_reader, create_reader, get_worker_reader,
+                         get_ocr_process_pool, reset_ocr_process_pool, OCR_WORKERS, OCR_LANGUAGES)
+from ocr_cache import get_ocr_cache
+from docx_ingest import (DocxDocumentModel, MediaImage, load_media, pair_titles_with_media, open_image,
+                         docx_sources)
+from instrumentation import span, record_stage, IMAGES_PROCESSED
+from ocr_backends import (create_backend, validate_backend, backend_version, best_confidence,
+                          OCR_BACKEND, OCR_FALLBACK_BACKEND, OCR_FALLBACK_CONFIDENCE, EASYOCR)
+from near_duplicates import NearDuplicateIndex, NEAR_DUPLICATES
+from reports import serialize_result, save_exports, write_report
+
+OCR_CACHE_VERSION = 1  # Bump when candidate extraction or scoring changes
+PREPROCESS_MODE = os.environ.get('PREPROCESS_MODE', 'fixed')  # 'fixed' (3x) or 'adaptive'
+OCR_BATCH_SIZE = int(os.environ.get('OCR_BATCH_SIZE', '1'))  # Images per readtext_batched call, 1 = off
+OCR_MODE = os.environ.get('OCR_MODE', 'full')  # 'full' alphabet or 'numeric' fast path
 
 
 class UniversalExtractorWithReport:
     """Production extractor with full reporting capabilities"""
 
-    def __init__(self, docx_path, output_dir='extracted_data'):
+    CONTRAST_FACTOR = 2.5
+    SCALE_FACTOR = 3
+
+    # Adaptive preprocessing: crop to text, scale by glyph height, cap pixels
+    TARGET_GLYPH_HEIGHT = 40  # px; EasyOCR reads comfortably around this height
+    MIN_SCALE = 1.0
+    MAX_SCALE = 3.0
+    PIXEL_BUDGET = 4_000_000  # Max pixels handed to OCR per image
+    EDGE_THRESHOLD = 40  # Grey-level jump that counts as a glyph edge
+    DETECTION_MAX_SIDE = 600  # Region detection runs on a subsampled copy
+    CROP_PADDING = 0.08  # Fraction of the crop added on each side
+
+    # Numeric OCR mode: digits, decimal point and unit characters only
+    NUMERIC_ALLOWLIST = '0123456789.,%msS'
+    NUMERIC_CANVAS_SIZE = 1280  # Detection canvas (EasyOCR default is 2560)
+
+    # Batched OCR: images are padded up to a size bucket so a batch shares one shape
+    BATCH_BUCKET_STEP = 256  # px
+    BATCH_WINDOW_FACTOR = 4  # Images gathered per bucketing pass = batch_size * this
+
+    def __init__(self, docx_path, output_dir='extracted_data', reader=None,
+                 workers=None, torch_threads=None, cache=None,
+                 save_artifacts=True, keep_processed_images=False, document=None,
+                 preprocess_mode=None, batch_size=None, ocr_mode=None, load_reader=True,
+                 ocr_backend=None, ocr_fallback=None, near_duplicates=None, lineage=None):
+        # docx_path may also be a seekable file-like object (e.g. an upload stream)
         self.docx_path = docx_path
+        self._document = document
         self.output_dir = output_dir
+        self.workers = OCR_WORKERS if workers is None else workers
+        self.torch_threads = torch_threads
+        self.cache = cache if cache is not None else get_ocr_cache()
+        # Without artifacts nothing is written to disk; images stay in memory
+        self.save_artifacts = save_artifacts
+        self.keep_processed_images = keep_processed_images
+        self.preprocess_mode = preprocess_mode or PREPROCESS_MODE
+        self.batch_size = max(1, OCR_BATCH_SIZE if batch_size is None else batch_size)
+        self.ocr_mode = ocr_mode or OCR_MODE
+        # Raises ValueError for unknown engines; a fallback equal to the primary is dropped
+        self.ocr_backend = validate_backend(ocr_backend or OCR_BACKEND)
+        fallback = validate_backend(OCR_FALLBACK_BACKEND if ocr_fallback is None else ocr_fallback, allow_none=True)
+        self.ocr_fallback = fallback if fallback != self.ocr_backend else None
+        self.near_duplicates = NEAR_DUPLICATES if near_duplicates is None else near_duplicates
+        # A lineage.DocumentLineage: unchanged images reuse the previous revision's outcome
+        self.lineage = lineage
+        self._engines = {}
+        self.images = {}
+        self.image_hashes = {}
+        self.image_aliases = {}  # Media filename -> the identical image kept in self.images
+        self.processed_images = {}
+        self.total = None
         self.images_dir = os.path.join(output_dir, 'images')
         self.debug_dir = os.path.join(output_dir, 'debug')
 
-        print("Initializing EasyOCR...")
-        self.reader = easyocr.Reader(['en'], gpu=False, verbose=False)
-        print("✓ Ready\n")
-
-        for d in [self.output_dir, self.images_dir, self.debug_dir]:
-            os.makedirs(d, exist_ok=True)
+        # Prefer a reader checked out from the shared pool; loading a private
+        # one reloads the model weights and is only a fallback for ad-hoc use.
+        # load_reader=False is for extractors that only preprocess.
+        if reader is None and self.workers <= 1 and load_reader and EASYOCR in self.ocr_backends:
+            print("Initializing EasyOCR...")
+            reader = create_reader()
+            print("✓ Ready\n")
+        self.reader = reader
+
+        if save_artifacts:
+            for d in [self.output_dir, self.images_dir, self.debug_dir]:
+                os.makedirs(d, exist_ok=True)
+
+    @property
+    def document(self):
+        """Parsed document model, built once and shared by every step"""
+        if self._document is None:
+            with span('docx.parse'):
+                self._document = DocxDocumentModel.from_source(self.docx_path)
+        return self._document
 
     def extract_titles_from_docx(self):
         """Dynamically extracts titles"""
         try:
-            from docx.text.paragraph import Paragraph
-            doc = Document(self.docx_path)
-            titles = []
-            for element in doc.element.body:
-                if isinstance(element, CT_P):
-                    para = Paragraph(element, doc)
-                    text = para.text.strip()
-                    if text and (re.search(r'[–-]\s*(Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)', text, re.IGNORECASE) or
-                                text.endswith(':')):
-                        clean = text.strip()
-                        if len(clean) < 100: titles.append(clean)
-            return titles
+            return list(self.document.titles)
         except Exception as e:
             print(f"  ⚠️  Title extraction error: {e}")
             return []
 
     def extract_and_deduplicate_images(self):
-        """Extracts and removes duplicates"""
-        print("Extracting images...")
-        docx2txt.process(self.docx_path, self.images_dir)
-
-        all_files = sorted([f for f in os.listdir(self.images_dir) 
-                          if f.lower().endswith(('.png', '.jpg', '.jpeg'))],
-                          key=natural_sort_key)
+        """Extracts and removes duplicates (in memory, straight from the zip)
 
+        Images come in order of their first appearance in the document; each
+        title pairs with its own picture reference (see pair_titles).
+        """
+        print("Extracting images...")
         unique_files = []
-        seen_hashes = set()
 
-        for filename in all_files:
-            filepath = os.path.join(self.images_dir, filename)
-            with open(filepath, 'rb') as f:
-                file_hash = hashlib.md5(f.read()).hexdigest()
+        order = self.document.media_order
+        with span('media.extract'):
+            for media in load_media(self.docx_path, order=order, aliases=self.image_aliases):
+                self.images[media.name] = media
+                self.image_hashes[media.name] = media.md5
+                unique_files.append(media.name)
 
-            if file_hash not in seen_hashes:
-                seen_hashes.add(file_hash)
-                unique_files.append(filename)
+                if self.save_artifacts:
+                    with open(os.path.join(self.images_dir, media.name), 'wb') as f:
+                        f.write(media.data)
 
         return unique_files
 
-    def preprocess_image(self, image_path, base_name):
-        """Universal preprocessing (Grayscale -> Contrast -> Scale)"""
-        img = Image.open(image_path).convert('L')
-        enhancer = ImageEnhance.Contrast(img).enhance(2.5)
-        w, h = enhancer.size
-        scaled = enhancer.resize((w * 3, h * 3), Image.LANCZOS)
+    def pair_titles(self, titles, image_files):
+        """[(title, image file)], one per picture reference; a picture used twice appears twice"""
+        media = [self.images[f] for f in image_files]
+        return [(title, m.name) for title, m in
+                pair_titles_with_media(titles, self.document.image_references, media, self.image_aliases)]
+
+    def preprocess_image(self, image, base_name):
+        """Universal preprocessing (Grayscale -> Contrast -> Scale)
+
+        `image` may be a path, raw bytes, a MediaImage or a decoded PIL image.
+        In 'adaptive' mode the image is first cropped to its text region and
+        scaled from the measured glyph height instead of a fixed 3x.
+        The chosen crop/scale are recorded in the returned image's `info`.
+        """
+        img = open_image(image).convert('L')
+        enhancer = ImageEnhance.Contrast(img).enhance(self.CONTRAST_FACTOR)
+
+        if self.preprocess_mode == 'adaptive':
+            box, glyph_height = self.detect_text_region(enhancer)
+            cropped = enhancer.crop(box)
+            scale = self.choose_scale(cropped.size, glyph_height)
+            w, h = cropped.size
+            with span('preprocess.scale'):
+                scaled = cropped.resize((max(1, round(w * scale)), max(1, round(h * scale))), Image.LANCZOS)
+            scaled.info['preprocess'] = {'mode': 'adaptive', 'crop': list(box),
+                                         'glyph_height': glyph_height, 'scale': round(scale, 3)}
+        else:
+            w, h = enhancer.size
+            with span('preprocess.scale'):
+                scaled = enhancer.resize((w * self.SCALE_FACTOR, h * self.SCALE_FACTOR), Image.LANCZOS)
+            scaled.info['preprocess'] = {'mode': 'fixed', 'scale': self.SCALE_FACTOR}
 
         # Save debug image for HTML report
-        debug_path = os.path.join(self.debug_dir, f'{base_name}_processed.png')
-        scaled.save(debug_path)
+        if self.save_artifacts:
+            debug_path = os.path.join(self.debug_dir, f'{base_name}_processed.png')
+            with span('preprocess.debug_png'):
+                scaled.save(debug_path)
+        if self.keep_processed_images:
+            self.processed_images[base_name] = scaled
 
         return scaled
 
+    def detect_text_region(self, gray):
+        """Cheap text locator: horizontal edge density per row, on a subsampled copy
+
+        Rows with many strong grey-level jumps form text bands. Returns the
+        padded bounding box of all bands (in source pixels) and the median
+        band height as the glyph height, or the full image and None when no
+        text-like structure is found.
+        """
+        width, height = gray.size
+        step = max(1, max(width, height) // self.DETECTION_MAX_SIDE)
+        pixels = np.asarray(gray, dtype=np.int16)[::step, ::step]
+        edges = np.abs(np.diff(pixels, axis=1)) > self.EDGE_THRESHOLD
+
+        row_active = edges.sum(axis=1) >= max(2, edges.shape[1] // 100)
+        bands = []
+        start = None
+        for y, active in enumerate(np.append(row_active, False)):
+            if active and start is None:
+                start = y
+            elif not active and start is not None:
+                if y - start >= 2:
+                    bands.append((start, y))
+                start = None
+        if not bands:
+            return (0, 0, width, height), None
+
+        band_rows = np.concatenate([np.arange(a, b) for a, b in bands])
+        columns = np.flatnonzero(edges[band_rows].any(axis=0))
+        left, right = columns.min() * step, (columns.max() + 2) * step
+        top, bottom = bands[0][0] * step, bands[-1][1] * step
+        pad_x = int((right - left) * self.CROP_PADDING) + step
+        pad_y = int((bottom - top) * self.CROP_PADDING) + step
+        box = (int(max(0, left - pad_x)), int(max(0, top - pad_y)),
+               int(min(width, right + pad_x)), int(min(height, bottom + pad_y)))
+
+        glyph_height = int(np.median([b - a for a, b in bands]) * step)
+        return box, glyph_height
+
+    def choose_scale(self, size, glyph_height):
+        """Scale factor from glyph height, clamped and held under the pixel budget"""
+        if glyph_height:
+            scale = self.TARGET_GLYPH_HEIGHT / glyph_height
+        else:
+            scale = self.SCALE_FACTOR
+        scale = min(self.MAX_SCALE, max(self.MIN_SCALE, scale))
+        w, h = size
+        if w * h * scale * scale > self.PIXEL_BUDGET:
+            scale = (self.PIXEL_BUDGET / (w * h)) ** 0.5
+        return scale
+
+    def original_image_bytes(self, image_file):
+        """Encoded bytes of an extracted image, from memory or the artifacts dir"""
+        if image_file in self.images:
+            return self.images[image_file].data
+        path = os.path.join(self.images_dir, image_file)
+        if os.path.isfile(path):
+            with open(path, 'rb') as f:
+                return f.read()
+        return None
+
+    def processed_image_bytes(self, result):
+        """PNG of the OCR input for a result, re-rendered in memory if needed"""
+        relative = result['debug_info'].get('processed_image')
+        if not relative:
+            return None
+        image_file = result.get('artifact_file', result['image_file'])
+        base_name = os.path.splitext(image_file)[0]
+        processed = self.processed_images.get(base_name)
+        if processed is None:
+            path = os.path.join(self.output_dir, relative)
+            if os.path.isfile(path):
+                with open(path, 'rb') as f:
+                    return f.read()
+            if image_file not in self.images:
+                return None
+            # OCR ran in a worker process: rebuild from the decoded original
+            processed = self.preprocess_image(self.images[image_file], base_name)
+        buffer = io.BytesIO()
+        processed.save(buffer, format='PNG')
+        return buffer.getvalue()
+
+    def release_images(self):
+        """Frees in-memory image data once a document has been reported on"""
+        self.images.clear()
+        self.processed_images.clear()
+
+    def release_result(self, result):
+        """Frees the decoded pixels behind one result once it has been sent"""
+        image_file = result.get('artifact_file', result['image_file'])
+        self.processed_images.pop(os.path.splitext(image_file)[0], None)
+        media = self.images.get(image_file)
+        if media is not None:
+            media.release()
+
     def score_candidate(self, value, text, area, confidence):
         """Scoring logic"""
         score = 0
@@ -109,193 +291,614 @@ class UniversalExtractorWithReport:
         if re.search(r'ms|seconds?|%', text, re.IGNORECASE): score += 50
         return score
 
-    def extract_metric_value(self, image_path, base_name):
-        """Extracts value and returns debug info"""
-        debug_info = {
+    @property
+    def ocr_backends(self):
+        """Engines this extractor may read with: the primary, then the fallback"""
+        return (self.ocr_backend, self.ocr_fallback) if self.ocr_fallback else (self.ocr_backend,)
+
+    def ocr_engine(self, name):
+        """Backend instance for an engine, created on first use"""
+        if name not in self._engines:
+            if name == EASYOCR and self.reader is None:
+                print("Initializing EasyOCR...")
+                self.reader = create_reader()
+            self._engines[name] = create_backend(name, self.reader)
+        return self._engines[name]
+
+    def ocr_fingerprint(self):
+        """Identifies the preprocessing/OCR settings that produced a cached result"""
+        settings = {
+            'version': OCR_CACHE_VERSION,
+            'contrast': self.CONTRAST_FACTOR,
+            'scale': self.SCALE_FACTOR,
+            'preprocess_mode': self.preprocess_mode,
+            'languages': OCR_LANGUAGES
+        }
+        for name in self.ocr_backends:
+            settings[name] = backend_version(name)
+        if self.ocr_backends != (EASYOCR,):
+            settings['backends'] = list(self.ocr_backends)
+        if self.ocr_fallback:
+            settings['fallback_confidence'] = OCR_FALLBACK_CONFIDENCE
+        if self.ocr_mode == 'numeric':
+            settings['numeric'] = [self.NUMERIC_ALLOWLIST, self.NUMERIC_CANVAS_SIZE]
+        if self.workers <= 1 and self.batch_size > 1:
+            # Batched OCR reads images padded to a size bucket, which can read differently
+            settings['batch'] = [self.batch_size, self.BATCH_BUCKET_STEP]
+        if self.preprocess_mode == 'adaptive':
+            settings['adaptive'] = [self.TARGET_GLYPH_HEIGHT, self.MIN_SCALE, self.MAX_SCALE, self.PIXEL_BUDGET,
+                                    self.EDGE_THRESHOLD, self.DETECTION_MAX_SIDE, self.CROP_PADDING]
+        return hashlib.md5(json.dumps(settings, sort_keys=True).encode()).hexdigest()
+
+    def build_candidates(self, ocr_raw):
+        """Turns raw OCR boxes into scored numeric candidates"""
+        candidates = []
+        for bbox, text, confidence in ocr_raw:
+            for num_str in re.findall(r'([0-9]+\.?[0-9]*)', text):
+                try:
+                    value = float(num_str)
+                    pts = np.array(bbox)
+                    area = (np.max(pts[:, 0]) - np.min(pts[:, 0])) * (np.max(pts[:, 1]) - np.min(pts[:, 1]))
+                    score = self.score_candidate(value, text, area, confidence)
+
+                    candidates.append({
+                        'value': value,
+                        'text': text,
+                        'score': float(score),
+                        'area': float(area),
+                        'conf': float(confidence * 100)
+                    })
+                except: continue
+        return candidates
+
+    def _new_debug_info(self, base_name):
+        return {
             'processed_image': f'debug/{base_name}_processed.png',
             'ocr_text': [],
             'candidates': [],
             'selection_reason': ''
         }
 
-        try:
-            processed = self.preprocess_image(image_path, base_name)
-            ocr_raw = self.reader.readtext(np.array(processed), detail=1)
-
-            if not ocr_raw:
-                debug_info['selection_reason'] = "No text detected by OCR"
-                return None, debug_info
-
-            # Record raw OCR for report
-            debug_info['ocr_text'] = [
-                {'text': text, 'conf': float(conf * 100)} 
-                for _, text, conf in ocr_raw
-            ]
-
-            candidates = []
-            for bbox, text, confidence in ocr_raw:
-                for num_str in re.findall(r'([0-9]+\.?[0-9]*)', text):
-                    try:
-                        value = float(num_str)
-                        pts = np.array(bbox)
-                        area = (np.max(pts[:, 0]) - np.min(pts[:, 0])) * (np.max(pts[:, 1]) - np.min(pts[:, 1]))
-                        score = self.score_candidate(value, text, area, confidence)
+    def _cached_ocr(self, image_hash, debug_info):
+        """Cached (ocr_raw, candidates) for an image, or None"""
+        if not (self.cache and image_hash):
+            return None
+        with span('cache.lookup'):
+            cached = self.cache.get(image_hash, self.ocr_fingerprint())
+        if cached is None:
+            return None
+        # Cache hit: no preprocessing, no OCR, no processed debug image
+        debug_info['processed_image'] = None
+        debug_info['cache_hit'] = True
+        return cached['ocr_raw'], cached['candidates']
+
+    def _prepare_image(self, image, base_name, debug_info):
+        """Preprocesses one image and records its timing/size in debug_info"""
+        source = open_image(image)
+        started = time.perf_counter()
+        processed = self.preprocess_image(source, base_name)
+        debug_info['preprocess'] = processed.info.get('preprocess')
+        debug_info['timings'] = {
+            'megapixels': source.size[0] * source.size[1] / 1e6,
+            'preprocess_seconds': time.perf_counter() - started,
+            'ocr_seconds': 0.0
+        }
+        return processed
+
+    def readtext_options(self):
+        """Extra readtext/readtext_batched arguments for the current OCR mode"""
+        if self.ocr_mode == 'numeric':
+            return {'allowlist': self.NUMERIC_ALLOWLIST, 'canvas_size': self.NUMERIC_CANVAS_SIZE}
+        return {}
+
+    def run_ocr(self, pixels, debug_info):
+        """Raw OCR boxes for one preprocessed image, from the primary engine or its fallback"""
+        started = time.perf_counter()
+        raw = self.ocr_engine(self.ocr_backend).readtext(pixels, **self.readtext_options())
+        debug_info['ocr_backend'] = self.ocr_backend
+        raw = self._apply_fallback(pixels, raw, debug_info)
+        debug_info['timings']['ocr_seconds'] = time.perf_counter() - started
+        return raw
+
+    def _apply_fallback(self, pixels, raw, debug_info):
+        """Re-reads the image with the fallback engine when the primary reading is not confident"""
+        primary = best_confidence(raw)
+        if not self.ocr_fallback or primary * 100 >= OCR_FALLBACK_CONFIDENCE:
+            return raw
+        fallback_raw = self.ocr_engine(self.ocr_fallback).readtext(pixels, **self.readtext_options())
+        fallback = best_confidence(fallback_raw)
+        used = fallback > primary
+        debug_info['ocr_fallback'] = {
+            'backend': self.ocr_fallback,
+            'primary_confidence': round(primary * 100, 1),
+            'fallback_confidence': round(fallback * 100, 1),
+            'used': used
+        }
+        if not used:
+            return raw
+        debug_info['ocr_backend'] = self.ocr_fallback
+        return fallback_raw
+
+    def _store_ocr(self, image_hash, raw):
+        """Normalises raw OCR output to plain types, scores it and caches both"""
+        ocr_raw = [
+            ([[float(x), float(y)] for x, y in bbox], text, float(conf))
+            for bbox, text, conf in raw
+        ]
+        candidates = self.build_candidates(ocr_raw)
+        if self.cache and image_hash:
+            self.cache.put(image_hash, self.ocr_fingerprint(), {'ocr_raw': ocr_raw, 'candidates': candidates})
+        return ocr_raw, candidates
+
+    def select_value(self, ocr_raw, candidates, debug_info):
+        """Picks the best candidate and fills in the report fields"""
+        if not ocr_raw:
+            debug_info['selection_reason'] = "No text detected by OCR"
+            return None, debug_info
 
-                        candidates.append({
-                            'value': value,
-                            'text': text,
-                            'score': float(score),
-                            'area': float(area),
-                            'conf': float(confidence * 100)
-                        })
-                    except: continue
+        # Record raw OCR for report
+        debug_info['ocr_text'] = [
+            {'text': text, 'conf': float(conf * 100)} 
+            for _, text, conf in ocr_raw
+        ]
 
-            debug_info['candidates'] = candidates
+        debug_info['candidates'] = candidates
+
+        if not candidates:
+            debug_info['selection_reason'] = "No valid numbers found in text"
+            return None, debug_info
 
-            if not candidates:
-                debug_info['selection_reason'] = "No valid numbers found in text"
-                return None, debug_info
+        # Sort by score
+        candidates.sort(key=lambda x: x['score'], reverse=True)
+        best = candidates[0]
+        debug_info['selection_reason'] = f"Highest Score: {best['score']:.1f} (Decimal: {'.' in str(best['value'])})"
 
-            # Sort by score
-            candidates.sort(key=lambda x: x['score'], reverse=True)
-            best = candidates[0]
-            debug_info['selection_reason'] = f"Highest Score: {best['score']:.1f} (Decimal: {'.' in str(best['value'])})"
+        return best['value'], debug_info
+
+    def extract_metric_value(self, image, base_name, image_hash=None):
+        """Extracts value and returns debug info"""
+        debug_info = self._new_debug_info(base_name)
+
+        try:
+            cached = self._cached_ocr(image_hash, debug_info)
+            if cached is not None:
+                ocr_raw, candidates = cached
+            else:
+                processed = self._prepare_image(image, base_name, debug_info)
+                raw = self.run_ocr(np.array(processed), debug_info)
+                ocr_raw, candidates = self._store_ocr(image_hash, raw)
 
-            return best['value'], debug_info
+            return self.select_value(ocr_raw, candidates, debug_info)
 
         except Exception as e:
             debug_info['selection_reason'] = f"Error: {str(e)}"
             return None, debug_info
 
-    def process_document(self):
-        """Main processing loop"""
+    def size_bucket(self, size):
+        """Rounds (width, height) up to the batching grid"""
+        step = self.BATCH_BUCKET_STEP
+        return tuple(-(-dim // step) * step for dim in size)
+
+    def extract_metric_values_batched(self, tasks):
+        """Batched extract_metric_value over [(image, base_name, image_hash)]
+
+        Images are preprocessed, grouped by size bucket, padded to the bucket
+        size and run through the reader's readtext_batched in groups of
+        batch_size. Results come back in task order with the same debug info
+        as the single-image path. Only the primary engine is batched; low
+        confidence readings go through the fallback one at a time.
+        """
+        outcomes = [None] * len(tasks)
+        buckets = {}
+
+        for i, (image, base_name, image_hash) in enumerate(tasks):
+            debug_info = self._new_debug_info(base_name)
+            try:
+                cached = self._cached_ocr(image_hash, debug_info)
+                if cached is not None:
+                    outcomes[i] = self.select_value(*cached, debug_info)
+                    continue
+                processed = np.array(self._prepare_image(image, base_name, debug_info))
+                bucket = self.size_bucket((processed.shape[1], processed.shape[0]))
+                buckets.setdefault(bucket, []).append((i, processed, image_hash, debug_info))
+            except Exception as e:
+                debug_info['selection_reason'] = f"Error: {str(e)}"
+                outcomes[i] = (None, debug_info)
+
+        for (width, height), items in buckets.items():
+            for start in range(0, len(items), self.batch_size):
+                group = items[start:start + self.batch_size]
+                try:
+                    # Pad right/bottom with the background level so box coordinates are unchanged
+                    batch = [np.pad(p, ((0, height - p.shape[0]), (0, width - p.shape[1])),
+                                    mode='constant', constant_values=int(np.median(p[-1])))
+                             for _, p, _, _ in group]
+                    started = time.perf_counter()
+                    raw_batch = self.ocr_engine(self.ocr_backend).readtext_batched(
+                        batch, batch_size=self.batch_size, **self.readtext_options())
+                    per_image = (time.perf_counter() - started) / len(group)
+                except Exception as e:
+                    for i, _, _, debug_info in group:
+                        debug_info['selection_reason'] = f"Error: {str(e)}"
+                        outcomes[i] = (None, debug_info)
+                    continue
+
+                for (i, pixels, image_hash, debug_info), raw in zip(group, raw_batch):
+                    try:
+                        debug_info['ocr_backend'] = self.ocr_backend
+                        started = time.perf_counter()
+                        raw = self._apply_fallback(pixels, raw, debug_info)
+                        debug_info['timings']['ocr_seconds'] = per_image + time.perf_counter() - started
+                        outcomes[i] = self.select_value(*self._store_ocr(image_hash, raw), debug_info)
+                    except Exception as e:
+                        debug_info['selection_reason'] = f"Error: {str(e)}"
+                        outcomes[i] = (None, debug_info)
+
+        return outcomes
+
+    def _extract_batched(self, tasks):
+        """Yields batched results in task order, a window of images at a time"""
+        window = self.batch_size * self.BATCH_WINDOW_FACTOR
+        for start in range(0, len(tasks), window):
+            yield from self.extract_metric_values_batched(tasks[start:start + window])
+
+    def process_document(self, on_result=None, should_stop=None):
+        """Main processing loop
+
+        on_result(result, total) is called after every image; should_stop()
+        is checked before each image so callers can cancel a long run.
+        """
+        results = []
+        for result in self.iter_results(should_stop):
+            results.append(result)
+            if on_result:
+                on_result(result, self.total)
+        return results
+
+    def iter_results(self, should_stop=None):
+        """Yields each result as soon as its image is done
+
+        `self.total` holds the number of results to expect once the first
+        one is requested. Closing the generator stops the remaining work.
+        """
         titles = self.extract_titles_from_docx()
         image_files = self.extract_and_deduplicate_images()
+        pairs = self.pair_titles(titles, image_files)
+        # Pictures used more than once are OCR'd once, in order of first use
+        distinct = list(dict.fromkeys(f for _, f in pairs))
 
-        results = []
+        total = self.total = len(pairs)
         print("="*60)
-        print(f"Processing {len(image_files)} unique images with {len(titles)} titles...")
+        print(f"Processing {total} images ({len(distinct)} unique) with {len(titles)} titles...")
         print("="*60)
 
-        for idx, (title, image_file) in enumerate(zip(titles, image_files)):
-            base_name = os.path.splitext(image_file)[0]
-            print(f"[{idx+1}] {title}...", end=" ")
+        tasks = [(self.images[f], os.path.splitext(f)[0], self.image_hashes[f]) for f in distinct]
+        outcomes = self.run_tasks(tasks)
+        first_use = {}  # image file -> (id, value, debug_info) of its first result
 
-            value, info = self.extract_metric_value(
-                os.path.join(self.images_dir, image_file), 
-                base_name
-            )
+        try:
+            for idx, (title, image_file) in enumerate(pairs):
+                if should_stop and should_stop():
+                    print(f"⏹  Stopped after {idx} of {total} images")
+                    break
+
+                print(f"[{idx+1}] {title}...", end=" ")
+                if image_file in first_use:
+                    first_id, value, first_info = first_use[image_file]
+                    info = _repeat_info(first_info)
+                    info['duplicate_of'] = first_id
+                else:
+                    value, info = next(outcomes)
+                    first_use[image_file] = (idx + 1, value, _repeat_info(info))
+                if self.lineage is not None:
+                    info = self.lineage.mark(idx, title, image_file, self.image_hashes[image_file], value, info)
+
+                result = {
+                    'id': idx + 1,
+                    'title': title,
+                    'value': value,
+                    'image_file': image_file,
+                    'debug_info': info
+                }
+                self._record_stage_metrics(value, info)
+                print(f"✓ {value}" if value is not None else "✗ No Value")
+                yield result
+            else:
+                # Only a complete extraction becomes the lineage's next revision
+                if self.lineage is not None:
+                    revision = self.lineage.save(self.ocr_fingerprint())
+                    print(f"🔁 Lineage {self.lineage.id} revision {revision}: "
+                          f"{self.lineage.reused} reused, {self.lineage.recomputed} recomputed")
+        finally:
+            outcomes.close()
+
+    def run_tasks(self, tasks):
+        """(value, debug_info) for each (image, base_name, image_hash) task, in task order
+
+        OCR runs in the worker processes, batched or one image at a time,
+        depending on how the extractor is configured. With near_duplicates,
+        images that look like an earlier one reuse its result; with a lineage,
+        images the previous revision already had reuse its outcome.
+        """
+        reusable = self.lineage.reusable(self.ocr_fingerprint()) if self.lineage is not None else {}
+        if reusable:
+            return self._run_incremental(tasks, reusable)
+        return self._run_new(tasks)
+
+    def _run_new(self, tasks):
+        if self.near_duplicates:
+            return self._run_near_duplicates(tasks)
+        return self._dispatch_tasks(tasks)
+
+    def _run_incremental(self, tasks, reusable):
+        """OCRs only the tasks whose image hash is not in `reusable`"""
+        outcomes = self._run_new([task for task in tasks if task[2] not in reusable])
+        try:
+            for _, _, image_hash in tasks:
+                if image_hash in reusable:
+                    yield self.lineage.reuse(reusable[image_hash])
+                else:
+                    yield next(outcomes)
+        finally:
+            outcomes.close()
+
+    def _near_duplicate_matches(self, tasks):
+        """For each task, (index of the task it nearly duplicates, distance) or None"""
+        index = NearDuplicateIndex()
+        matches = []
+        with span('media.phash'):
+            for i, (image, _, _) in enumerate(tasks):
+                try:
+                    matches.append(index.add(i, open_image(image)))
+                except Exception as e:
+                    print(f"  ⚠️  Perceptual hash failed: {e}")
+                    matches.append(None)
+                if self.workers > 1 and isinstance(image, MediaImage):
+                    image.release()  # Workers decode their own copy
+        return matches
+
+    def _run_near_duplicates(self, tasks):
+        matches = self._near_duplicate_matches(tasks)
+        outcomes = self._dispatch_tasks([task for task, match in zip(tasks, matches) if match is None])
+        done = {}
+        try:
+            for i, match in enumerate(matches):
+                if match is None:
+                    done[i] = next(outcomes)
+                    yield done[i]
+                    continue
+                # The representative always comes first, so its result is ready
+                representative, distance = match
+                value, info = done[representative]
+                info = {key: v for key, v in info.items() if key != 'timings'}
+                info['near_duplicate'] = {'of': tasks[representative][1], 'distance': distance}
+                yield value, info
+        finally:
+            outcomes.close()
+
+    def _dispatch_tasks(self, tasks):
+        if self.workers > 1:
+            # Workers decode their own copy from the encoded bytes
+            return self._extract_parallel([(image.data if isinstance(image, MediaImage) else image, base_name, image_hash)
+                                           for image, base_name, image_hash in tasks])
+        if self.batch_size > 1:
+            return self._extract_batched(tasks)
+        return (self.extract_metric_value(*task) for task in tasks)
+
+    def process_batch(self, sources):
+        """Extracts several documents with one OCR pass over their combined images
+
+        `sources` is a list of (name, path or file-like). Images are
+        de-duplicated across all documents by MD5, and every distinct image
+        is OCR'd once through run_tasks. Returns one {'document', 'results',
+        'error'} per source, in order. Results have the process_document
+        shape plus 'artifact_file', the batch-wide name of the image in
+        self.images (its MD5 plus extension); a debug_info flagged
+        'batch_reused' was shared with an earlier document.
+        """
+        documents = []
+        unique = {}
+        for name, source in sources:
+            aliases = {}
+            try:
+                with span('docx.parse'):
+                    document = DocxDocumentModel.from_source(source)
+                with span('media.extract'):
+                    media = load_media(source, order=document.media_order, aliases=aliases)
+            except Exception as e:
+                print(f"  ⚠️  {name}: {e}")
+                documents.append((name, [], str(e)))
+                continue
+            pairs = pair_titles_with_media(document.titles, document.image_references, media, aliases)
+            documents.append((name, pairs, None))
+            for _, m in pairs:
+                unique.setdefault(m.md5, m)
+
+        total = sum(len(pairs) for _, pairs, _ in documents)
+        print("="*60)
+        print(f"Batch: {len(documents)} documents, {total} images, {len(unique)} distinct")
+        print("="*60)
 
-            results.append({
-                'id': idx + 1,
-                'title': title,
-                'value': value,
-                'image_file': image_file,
-                'debug_info': info
-            })
-            print(f"✓ {value}" if value is not None else "✗ No Value")
+        tasks = []
+        for md5, media in unique.items():
+            artifact_file = md5 + os.path.splitext(media.name)[1].lower()
+            self.images[artifact_file] = media
+            self.image_hashes[artifact_file] = md5
+            if self.save_artifacts:
+                with open(os.path.join(self.images_dir, artifact_file), 'wb') as f:
+                    f.write(media.data)
+            tasks.append((media, md5, md5))
+
+        outcomes = {}
+        results = self.run_tasks(tasks)
+        try:
+            for idx, (media, md5, _) in enumerate(tasks):
+                print(f"[{idx+1}/{len(tasks)}] {media.name}...", end=" ")
+                value, info = next(results)
+                outcomes[md5] = (value, info)
+                self._record_stage_metrics(value, info)
+                print(f"✓ {value}" if value is not None else "✗ No Value")
+        finally:
+            results.close()
+
+        batch = []
+        used = set()
+        for name, pairs, error in documents:
+            document_results = []
+            for idx, (title, media) in enumerate(pairs):
+                value, info = outcomes[media.md5]
+                if media.md5 in used:
+                    info = dict(info, batch_reused=True)
+                used.add(media.md5)
+                document_results.append({
+                    'id': idx + 1,
+                    'title': title,
+                    'value': value,
+                    'image_file': media.name,
+                    'artifact_file': media.md5 + os.path.splitext(media.name)[1].lower(),
+                    'debug_info': info
+                })
+            batch.append({'document': name, 'results': document_results, 'error': error})
+        return batch
+
+    def _record_stage_metrics(self, value, info):
+        """Feeds one result's preprocess/OCR timings into the stage metrics
+
+        The timings travel in debug_info, so this also covers images that were
+        processed in OCR worker processes.
+        """
+        timings = info.get('timings')
+        if timings:
+            record_stage('preprocess', timings['preprocess_seconds'])
+            record_stage('ocr', timings['ocr_seconds'])
+        if info.get('lineage', {}).get('status') == 'reused':
+            outcome = 'lineage_reused'
+        elif info.get('near_duplicate'):
+            outcome = 'near_duplicate'
+        elif info.get('duplicate_of'):
+            outcome = 'duplicate'
+        elif info.get('cache_hit'):
+            outcome = 'cache_hit'
+        elif info.get('selection_reason', '').startswith('Error'):
+            outcome = 'error'
+        else:
+            outcome = 'value' if value is not None else 'no_value'
+        IMAGES_PROCESSED.inc(outcome=outcome)
+
+    def worker_options(self):
+        """Constructor settings an OCR worker process needs to mirror this extractor"""
+        return {
+            'save_artifacts': self.save_artifacts,
+            'preprocess_mode': self.preprocess_mode,
+            'ocr_mode': self.ocr_mode,
+            'ocr_backend': self.ocr_backend,
+            'ocr_fallback': self.ocr_fallback or ''
+        }
 
-        return results
+    def _extract_parallel(self, tasks):
+        """Runs extract_metric_value across the OCR process pool, yielding in task order"""
+        pool = get_ocr_process_pool(self.workers, self.torch_threads)
+        options = self.worker_options()
+        futures = [pool.submit(_extract_in_worker, self.output_dir, options, *task) for task in tasks]
+        try:
+            for future in futures:
+                yield future.result()
+        except BrokenProcessPool:
+            reset_ocr_process_pool()
+            raise
+        finally:
+            for future in futures:
+                future.cancel()
 
     def generate_html_report(self, results):
-        """Generates the visual HTML report"""
-        html = """<!DOCTYPE html>
-<html>
-<head>
-    <meta charset="UTF-8">
-    <title>Extraction Debug Report</title>
-    <style>
-        body { font-family: sans-serif; background: #f4f6f8; padding: 20px; }
-        .card { background: white; padding: 20px; margin-bottom: 20px; border-radius: 8px; box-shadow: 0 2px 4px rgba(0,0,0,0.1); }
-        .header { display: flex; justify-content: space-between; align-items: center; border-bottom: 1px solid #eee; padding-bottom: 10px; margin-bottom: 15px; }
-        .value-box { font-size: 24px; font-weight: bold; padding: 5px 15px; border-radius: 4px; }
-        .success { background: #d4edda; color: #155724; }
-        .failure { background: #f8d7da; color: #721c24; }
-        .grid { display: grid; grid-template-columns: 1fr 1fr; gap: 20px; }
-        .img-container { text-align: center; border: 1px solid #eee; padding: 10px; border-radius: 4px; }
-        img { max-width: 100%; height: auto; }
-        .debug-section { margin-top: 15px; background: #f8f9fa; padding: 15px; border-radius: 4px; font-size: 13px; }
-        .candidate { display: flex; justify-content: space-between; padding: 5px; border-bottom: 1px solid #eee; }
-        .candidate.selected { background: #e8f5e9; font-weight: bold; border-left: 3px solid #28a745; }
-    </style>
-</head>
-<body>
-    <h1>📊 Extraction Debug Report</h1>
-"""
-        for r in results:
-            val_display = str(r['value']) if r['value'] is not None else "FAILED"
-            status_class = "success" if r['value'] is not None else "failure"
-
-            html += f"""
-    <div class="card">
-        <div class="header">
-            <h3>#{r['id']} {r['title']}</h3>
-            <div class="value-box {status_class}">{val_display}</div>
-        </div>
-
-        <div class="grid">
-            <div class="img-container">
-                <strong>Original Image</strong><br>
-                <img src="images/{r['image_file']}">
-            </div>
-            <div class="img-container">
-                <strong>Processed for OCR</strong><br>
-                <img src="{r['debug_info']['processed_image']}">
-            </div>
-        </div>
-
-        <div class="debug-section">
-            <strong>🏆 Selection Reason:</strong> {r['debug_info']['selection_reason']}<br><br>
-            <strong>🔢 Top 5 Candidates:</strong>
-            <div style="margin-top:5px; border:1px solid #ddd; background:white;">
-"""
-            # List top candidates
-            for c in r['debug_info']['candidates'][:5]:
-                is_selected = (c['value'] == r['value'])
-                sel_class = "selected" if is_selected else ""
-                html += f"""
-                <div class="candidate {sel_class}">
-                    <span>Val: {c['value']} (from "{c['text']}")</span>
-                    <span>Score: {c['score']:.0f} | Area: {c['area']:.0f}</span>
-                </div>"""
-
-            html += """
-            </div>
-        </div>
-    </div>"""
-
-        html += "</body></html>"
-
-        with open(os.path.join(self.output_dir, 'report.html'), 'w', encoding='utf-8') as f:
-            f.write(html)
-        print(f"📄 HTML Report: {os.path.join(self.output_dir, 'report.html')}")
-
-    def save_results(self, results):
-        """Saves all outputs"""
-        # JSON/CSV
-        export_data = [{'title': r['title'], 'value': r['value']} for r in results]
-
-        with open(os.path.join(self.output_dir, 'results.json'), 'w', encoding='utf-8') as f:
-            json.dump(export_data, f, indent=2, ensure_ascii=False)
-
-        with open(os.path.join(self.output_dir, 'results.csv'), 'w', newline='', encoding='utf-8') as f:
-            writer = csv.DictWriter(f, fieldnames=['title', 'value'])
-            writer.writeheader()
-            writer.writerows(export_data)
-
+        """Generates the visual HTML report, paginated and with lazy-loaded images"""
+        path = write_report(self.output_dir, [serialize_result(r) for r in results])
+        print(f"📄 HTML Report: {path}")
+
+    def save_results(self, results, report=False):
+        """Saves results.json and results.csv; report=True also writes the HTML report"""
+        records = [serialize_result(r) for r in results]
+        save_exports(self.output_dir, records)
         print(f"💾 Data saved: results.json, results.csv")
 
-        # HTML
-        self.generate_html_report(results)
+        if report:
+            self.generate_html_report(results)
+
+def _repeat_info(info):
+    """debug_info for another use of an already processed picture: no timings, its own lineage entry"""
+    repeat = {key: v for key, v in info.items() if key != 'timings'}
+    if 'lineage' in repeat:
+        repeat['lineage'] = dict(repeat['lineage'])
+    return repeat
+
+def _extract_in_worker(output_dir, options, image, base_name, image_hash):
+    """OCR worker task: uses the process's warm reader"""
+    extractor = UniversalExtractorWithReport(None, output_dir, reader=get_worker_reader(), workers=0,
+                                             batch_size=1, **options)
+    return extractor.extract_metric_value(image, base_name, image_hash)
+
+def save_batch(extractor, batch):
+    """Writes each document's results and report to <output_dir>/<document name>/"""
+    summary = []
+    used_dirs = set()
+    for entry in batch:
+        stem = os.path.splitext(os.path.basename(entry['document']))[0]
+        dir_name, n = stem, 1
+        while dir_name in used_dirs:
+            n += 1
+            dir_name = f'{stem}_{n}'
+        used_dirs.add(dir_name)
+
+        if entry['results']:
+            document_dir = os.path.join(extractor.output_dir, dir_name)
+            writer = UniversalExtractorWithReport(None, document_dir, workers=0, cache=False, load_reader=False)
+            for r in entry['results']:
+                with open(os.path.join(writer.images_dir, r['image_file']), 'wb') as f:
+                    f.write(extractor.original_image_bytes(r['artifact_file']))
+                processed = r['debug_info'].get('processed_image')
+                if processed and os.path.isfile(os.path.join(extractor.output_dir, processed)):
+                    shutil.copyfile(os.path.join(extractor.output_dir, processed), os.path.join(document_dir, processed))
+            writer.save_results(entry['results'], report=True)
+
+        summary.append({
+            'document': entry['document'],
+            'output_dir': dir_name,
+            'error': entry['error'],
+            'count': len(entry['results']),
+            'successful_extractions': sum(1 for r in entry['results'] if r['value'] is not None)
+        })
+
+    with open(os.path.join(extractor.output_dir, 'batch.json'), 'w', encoding='utf-8') as f:
+        json.dump(summary, f, indent=2, ensure_ascii=False)
+    print(f"💾 Batch summary: {os.path.join(extractor.output_dir, 'batch.json')}")
 
 def main():
     import sys
-    if len(sys.argv) < 2: sys.exit("Usage: python extract_metrics.py <docx_file>")
-    if not os.path.exists(sys.argv[1]): sys.exit(f"Error: File not found: {sys.argv[1]}")
-
-    extractor = UniversalExtractorWithReport(sys.argv[1])
-    results = extractor.process_document()
-    extractor.save_results(results)
+    if len(sys.argv) < 2: sys.exit("Usage: python extract_metrics.py <docx_file> [<docx_or_zip> ...] | <directory>")
+    for path in sys.argv[1:]:
+        if not os.path.exists(path): sys.exit(f"Error: File not found: {path}")
+
+    # Directory trees go through the resumable backfill (python -m backfill for its options)
+    if any(os.path.isdir(path) for path in sys.argv[1:]):
+        from backfill import run_backfill
+        summary = run_backfill(sys.argv[1:])
+        if summary['documents_failed']: sys.exit(1)
+        return
+
+    # Several documents (or a zip of them) share one reader and one OCR pass
+    if len(sys.argv) > 2 or sys.argv[1].lower().endswith('.zip'):
+        sources = [source for path in sys.argv[1:] for source in docx_sources(path)]
+        with checkout_reader() as reader:
+            extractor = UniversalExtractorWithReport(None, reader=reader)
+            batch = extractor.process_batch(sources)
+        save_batch(extractor, batch)
+        print("\n🚀 Complete!")
+        return
+
+    with checkout_reader() as reader:
+        extractor = UniversalExtractorWithReport(sys.argv[1], reader=reader)
+        results = extractor.process_document()
+    extractor.save_results(results, report=True)
     print("\n🚀 Complete!")
 
 if __name__ == "__main__":
@@ -0,0 +1,199 @@
+"""
+Instrumentation
+===============
+Stage timing spans and Prometheus-style metrics for the extraction service.
+
+- `span('stage')` times a block, feeds the `extraction_stage_seconds`
+  histogram and, inside `collect_timings()`, the per-request timings block.
+- `record_stage()` does the same for durations measured elsewhere (e.g. in
+  OCR worker processes and reported back through debug_info).
+- `process_memory()` reports this process's RSS/PSS, for sizing pre-fork
+  workers that share the model pages copy-on-write.
+- `REGISTRY.render()` produces the text exposition format served on
+  /metrics. Collectors registered with `REGISTRY.add_collector` are called
+  at scrape time for live values such as reader pool utilisation.
+"""
+
+import os
+import time
+import threading
+import contextvars
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in pairs)
+    return '{' + ','.join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + '}'
+
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name, help_text):
+        self.name, self.help = name, help_text
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, key, value) for key, value in self._values.items()]
+
+
+class Gauge(Counter):
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[_label_key(labels)] = value
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram:
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, buckets=DEFAULT_BUCKETS):
+        self.name, self.help = name, help_text
+        self.buckets = tuple(buckets)
+        self._series = {}  # key -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._series.setdefault(key, [0] * len(self.buckets) + [0.0, 0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def samples(self):
+        out = []
+        with self._lock:
+            for key, series in self._series.items():
+                for bound, count in zip(self.buckets, series):
+                    out.append((f'{self.name}_bucket', key + (('le', bound),), count))
+                out.append((f'{self.name}_bucket', key + (('le', '+Inf'),), series[-1]))
+                out.append((f'{self.name}_sum', key, series[-2]))
+                out.append((f'{self.name}_count', key, series[-1]))
+        return out
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, help_text):
+        return self.register(Counter(name, help_text))
+
+    def gauge(self, name, help_text):
+        return self.register(Gauge(name, help_text))
+
+    def histogram(self, name, help_text, buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, help_text, buckets))
+
+    def add_collector(self, collector):
+        """collector() is called on every scrape to refresh live gauges"""
+        self._collectors.append(collector)
+
+    def render(self):
+        for collector in self._collectors:
+            try:
+                collector()
+            except Exception as e:
+                print(f"  ⚠️  Metrics collector failed: {e}")
+        lines = []
+        for metric in self._metrics:
+            lines.append(f'# HELP {metric.name} {metric.help}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            for name, key, value in metric.samples():
+                lines.append(f'{name}{_format_labels(key)} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.histogram('extraction_stage_seconds', 'Time spent per extraction stage')
+REQUESTS_TOTAL = REGISTRY.counter('http_requests_total', 'HTTP requests by endpoint, method and status')
+REQUEST_SECONDS = REGISTRY.histogram('http_request_duration_seconds', 'HTTP request latency by endpoint')
+REQUESTS_IN_FLIGHT = REGISTRY.gauge('http_requests_in_flight', 'HTTP requests currently being served')
+IMAGES_PROCESSED = REGISTRY.counter('extraction_images_total', 'Images processed, by outcome')
+ADMISSION_REJECTIONS = REGISTRY.counter('admission_rejections_total',
+                                        'Extractions turned away by reason (too_large, busy)')
+
+_timings = contextvars.ContextVar('stage_timings', default=None)
+
+
+def record_stage(stage, seconds):
+    """Records a measured stage duration"""
+    STAGE_SECONDS.observe(seconds, stage=stage)
+    timings = _timings.get()
+    if timings is not None:
+        timings[stage] = timings.get(stage, 0.0) + seconds
+
+
+@contextmanager
+def span(stage):
+    """Times the enclosed block as one occurrence of `stage`"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(stage, time.perf_counter() - started)
+
+
+@contextmanager
+def collect_timings():
+    """Collects per-stage totals of every span in this context into a dict"""
+    timings = {}
+    token = _timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _timings.reset(token)
+
+
+def rounded(timings):
+    """Per-request timings block for API responses"""
+    return {stage: round(seconds, 4) for stage, seconds in sorted(timings.items())}
+
+
+def process_memory():
+    """Resident, proportional and shared memory of this process in MB
+
+    PSS splits pages shared with other processes (e.g. model weights
+    inherited copy-on-write from a pre-fork master) between them, so summed
+    over workers it is the real footprint. Needs Linux; other fields are None.
+    """
+    memory = {'pid': os.getpid(), 'rss_mb': None, 'pss_mb': None, 'shared_mb': None}
+    try:
+        with open('/proc/self/smaps_rollup', 'r') as f:
+            fields = dict(line.split(':', 1) for line in f if ':' in line and not line.startswith(' '))
+        kb = {name: int(value.split()[0]) for name, value in fields.items() if value.strip().endswith('kB')}
+        memory['rss_mb'] = round(kb['Rss'] / 1024, 1)
+        memory['pss_mb'] = round(kb['Pss'] / 1024, 1)
+        memory['shared_mb'] = round((kb['Shared_Clean'] + kb['Shared_Dirty']) / 1024, 1)
+    except (OSError, KeyError, ValueError):
+        pass
+    return memory
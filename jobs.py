@@ -0,0 +1,310 @@
+"""
+Extraction Job Queue
+====================
+Runs extractions in the background so HTTP requests return immediately.
+
+POST returns a job id, clients poll the job for status, per-image progress
+and partial results, and may cancel it. A bounded queue in front of a fixed
+set of worker threads provides backpressure: when it is full, `submit`
+raises `QueueFullError` and the caller should answer 429.
+
+A job runs in the process that accepted it, but its record - status,
+progress, results and the cancel flag - lives in one SQLite file under
+JOB_STORE_DIR (defaults to WORKSPACE_ROOT). Pre-fork workers share that
+directory, so any of them can answer a poll or cancel a job, and the
+worker running it sees the cancel flag before its next image. A job whose
+process exits before it finishes is reported as failed.
+"""
+
+import os
+import json
+import math
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from workspaces import WORKSPACE_ROOT
+
+DEFAULT_RETRY_AFTER = 30  # Seconds, used until a job has completed
+JOB_STORE_DIR = os.environ.get('JOB_STORE_DIR', WORKSPACE_ROOT)  # Shared by every worker process
+FINISHED = ('completed', 'failed', 'cancelled')
+
+
+class QueueFullError(Exception):
+    """Raised when the job queue cannot accept more work"""
+
+    def __init__(self, retry_after):
+        super().__init__("Extraction queue is full, retry later")
+        self.retry_after = retry_after
+
+
+def _process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class JobStore:
+    """SQLite-backed job records, readable and cancellable from any process"""
+
+    def __init__(self, directory=JOB_STORE_DIR):
+        self.directory = directory
+        self.path = os.path.join(directory, 'jobs.sqlite3')
+        self._ready = False
+
+    @contextmanager
+    def _connect(self):
+        # One short-lived connection per operation keeps this thread/process safe
+        if not self._ready:
+            self._create()
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _create(self):
+        # Created on first use so importing the service stays cheap
+        os.makedirs(self.directory, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                conn.execute('PRAGMA journal_mode=WAL')
+                conn.execute('''CREATE TABLE IF NOT EXISTS jobs (
+                                    id TEXT PRIMARY KEY,
+                                    status TEXT NOT NULL,
+                                    error TEXT,
+                                    total INTEGER,
+                                    info TEXT NOT NULL,
+                                    owner INTEGER NOT NULL,
+                                    cancel_requested INTEGER NOT NULL DEFAULT 0,
+                                    created_at REAL NOT NULL,
+                                    started_at REAL,
+                                    finished_at REAL)''')
+                conn.execute('''CREATE TABLE IF NOT EXISTS job_results (
+                                    job_id TEXT NOT NULL,
+                                    seq INTEGER NOT NULL,
+                                    result TEXT NOT NULL,
+                                    PRIMARY KEY (job_id, seq))''')
+        finally:
+            conn.close()
+        self._ready = True
+
+    def create(self, job_id, info):
+        with self._connect() as conn:
+            conn.execute('INSERT INTO jobs (id, status, info, owner, created_at) VALUES (?, ?, ?, ?, ?)',
+                         (job_id, 'queued', json.dumps(info), os.getpid(), time.time()))
+
+    def delete(self, job_id):
+        with self._connect() as conn:
+            conn.execute('DELETE FROM job_results WHERE job_id = ?', (job_id,))
+            conn.execute('DELETE FROM jobs WHERE id = ?', (job_id,))
+
+    def start(self, job_id):
+        """Marks a queued job running; False when it was cancelled first"""
+        with self._connect() as conn:
+            return conn.execute("UPDATE jobs SET status = 'running', started_at = ? WHERE id = ? AND status = 'queued'",
+                                (time.time(), job_id)).rowcount == 1
+
+    def finish(self, job_id, status, error=None):
+        with self._connect() as conn:
+            conn.execute('UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE id = ?',
+                         (status, error, time.time(), job_id))
+
+    def add_result(self, job_id, result, total):
+        with self._connect() as conn:
+            conn.execute('UPDATE jobs SET total = ? WHERE id = ?', (total, job_id))
+            conn.execute('INSERT INTO job_results VALUES (?, (SELECT COUNT(*) FROM job_results WHERE job_id = ?), ?)',
+                         (job_id, job_id, json.dumps(result)))
+
+    def update_info(self, job_id, **fields):
+        with self._connect() as conn:
+            row = conn.execute('SELECT info FROM jobs WHERE id = ?', (job_id,)).fetchone()
+            if row:
+                conn.execute('UPDATE jobs SET info = ? WHERE id = ?', (json.dumps({**json.loads(row[0]), **fields}), job_id))
+
+    def cancel_requested(self, job_id):
+        with self._connect() as conn:
+            row = conn.execute('SELECT cancel_requested FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        return bool(row and row[0])
+
+    def cancel(self, job_id):
+        """Sets the cancel flag; returns True when the job had not started and is now cancelled"""
+        with self._connect() as conn:
+            conn.execute("UPDATE jobs SET cancel_requested = 1 WHERE id = ? AND status IN ('queued', 'running')",
+                         (job_id,))
+            return conn.execute("UPDATE jobs SET status = 'cancelled', finished_at = ? WHERE id = ? AND status = 'queued'",
+                                (time.time(), job_id)).rowcount == 1
+
+    def get(self, job_id):
+        """The job's status dict with its results, or None"""
+        with self._connect() as conn:
+            row = conn.execute('''SELECT status, error, total, info, owner, created_at, started_at, finished_at
+                                  FROM jobs WHERE id = ?''', (job_id,)).fetchone()
+            if row is None:
+                return None
+            results = [json.loads(r[0]) for r in
+                       conn.execute('SELECT result FROM job_results WHERE job_id = ? ORDER BY seq', (job_id,))]
+        status, error, total, info, owner, created_at, started_at, finished_at = row
+        if status not in FINISHED and not _process_alive(owner):
+            status, error = 'failed', 'The worker process running this job exited'
+            self.finish(job_id, status, error)
+            finished_at = time.time()
+
+        processed = len(results)
+        now = finished_at or time.time()
+        return {
+            'job_id': job_id,
+            'status': status,
+            'error': error,
+            'progress': {
+                'processed': processed,
+                'total': total,
+                'percent': round(100 * processed / total, 1) if total else 0
+            },
+            'created_at': created_at,
+            'started_at': started_at,
+            'finished_at': finished_at,
+            'elapsed_seconds': round(now - started_at, 2) if started_at else 0,
+            'info': json.loads(info),
+            'results': results
+        }
+
+    def prune(self, retention):
+        """Deletes jobs that finished more than `retention` seconds ago"""
+        with self._connect() as conn:
+            expired = 'SELECT id FROM jobs WHERE finished_at < ?'
+            cutoff = time.time() - retention
+            conn.execute(f'DELETE FROM job_results WHERE job_id IN ({expired})', (cutoff,))
+            conn.execute('DELETE FROM jobs WHERE finished_at < ?', (cutoff,))
+
+
+class Job:
+    """One extraction job, as seen by the process that runs it
+
+    `payload` stays in this process; status, progress and results go to the store.
+    """
+
+    def __init__(self, payload, store):
+        self.id = uuid.uuid4().hex
+        self.payload = payload
+        self.store = store
+        self._cancelled = False
+
+    def is_cancelled(self):
+        # Another worker may have cancelled it; the flag only ever goes from unset to set
+        if not self._cancelled:
+            self._cancelled = self.store.cancel_requested(self.id)
+        return self._cancelled
+
+    def add_result(self, result, total):
+        """Progress callback: records one finished image"""
+        self.store.add_result(self.id, result, total)
+
+    def update_info(self, **fields):
+        """Adds fields to the job's public info (returned with its status)"""
+        self.store.update_info(self.id, **fields)
+
+
+class JobManager:
+    """Bounded queue of jobs served by a fixed pool of worker threads"""
+
+    def __init__(self, runner, workers=1, max_queue=8, retention=3600, on_skip=None, store=None):
+        self.runner = runner
+        # Called with a cancelled job's info instead of the runner, to free its resources
+        self.on_skip = on_skip
+        self.workers = max(1, int(workers))
+        self.retention = retention
+        self.store = store or JobStore()
+        self._queue = queue.Queue(maxsize=max(1, int(max_queue)))
+        self._lock = threading.Lock()
+        self._threads = []
+        self._durations = []
+        self._running = 0
+
+    def _ensure_workers(self):
+        # Threads are started lazily so importing the service stays cheap
+        with self._lock:
+            self._threads = [t for t in self._threads if t.is_alive()]
+            while len(self._threads) < self.workers:
+                t = threading.Thread(target=self._work, name=f'job-worker-{len(self._threads)}', daemon=True)
+                t.start()
+                self._threads.append(t)
+
+    def _work(self):
+        while True:
+            job = self._queue.get()
+            started = None
+            try:
+                # False when cancel() already skipped it
+                if not self.store.start(job.id):
+                    continue
+                started = time.time()
+                with self._lock:
+                    self._running += 1
+                self.runner(job)
+                self.store.finish(job.id, 'cancelled' if job.is_cancelled() else 'completed')
+            except Exception as e:
+                self.store.finish(job.id, 'failed', str(e))
+            finally:
+                if started:
+                    with self._lock:
+                        self._running -= 1
+                        self._durations = (self._durations + [time.time() - started])[-20:]
+                self._queue.task_done()
+
+    def retry_after(self):
+        """Seconds until a queue slot is likely to free up"""
+        with self._lock:
+            avg = sum(self._durations) / len(self._durations) if self._durations else DEFAULT_RETRY_AFTER
+        return max(1, math.ceil(avg * max(1, self._queue.qsize()) / self.workers))
+
+    def submit(self, payload, info):
+        """Queues a job, raising QueueFullError when the queue is full
+
+        `info` (JSON-serializable) is stored with the job and returned by get().
+        """
+        self.store.prune(self.retention)
+        self._ensure_workers()
+        job = Job(payload, self.store)
+        self.store.create(job.id, info)
+        try:
+            self._queue.put_nowait(job)
+        except queue.Full:
+            self.store.delete(job.id)
+            raise QueueFullError(self.retry_after())
+        return job
+
+    def get(self, job_id):
+        """Status of a job accepted by any worker, or None"""
+        return self.store.get(job_id)
+
+    def cancel(self, job_id):
+        """Requests cancellation; running jobs stop after the current image"""
+        job = self.store.get(job_id)
+        if job is None or job['status'] in FINISHED:
+            return job
+        if self.store.cancel(job_id) and self.on_skip:
+            try:
+                self.on_skip(job['info'])
+            except Exception as e:
+                print(f"⚠️  Cleanup of skipped job {job_id} failed: {e}")
+        return self.store.get(job_id)
+
+    def stats(self):
+        """Jobs of this process"""
+        with self._lock:
+            running = self._running
+        return {
+            'workers': self.workers,
+            'queued': self._queue.qsize(),
+            'queue_capacity': self._queue.maxsize,
+            'running': running
+        }
@@ -0,0 +1,187 @@
+"""
+Document Lineage
+================
+Incremental re-extraction of report revisions.
+
+A report is usually revised a few times before sign-off - a title is
+fixed, one screenshot is swapped - and every revision used to go through
+the full extraction again. Callers that pass the same lineage id for each
+revision of a document (?lineage=<id>) get a manifest kept for it: the
+ordered image hashes, titles and chosen values of the last complete
+extraction, plus the OCR fingerprint that produced them.
+
+On the next revision, images whose hash is in the manifest take their
+value and debug info from it without preprocessing or OCR; only new or
+changed images are OCR'd. Titles always come from the new revision's XML,
+so renamed metrics pair correctly. Every result's debug_info carries
+`lineage`: {'status': 'reused' | 'recomputed', ...} with the previous
+title or value where they changed. A manifest is only reused while the
+OCR settings fingerprint matches, and only replaced by an extraction that
+ran to the end.
+
+Manifests live in one SQLite file next to the OCR cache (LINEAGE_DIR
+defaults to OCR_CACHE_DIR), so they survive restarts wherever the cache
+does; the least recently updated lineages are dropped past
+LINEAGE_MAX_ENTRIES.
+"""
+
+import os
+import re
+import json
+import time
+import sqlite3
+import threading
+from contextlib import contextmanager
+from ocr_cache import OCR_CACHE_DIR
+
+LINEAGE_DIR = os.environ.get('LINEAGE_DIR', OCR_CACHE_DIR)  # Persisted with the cache (the compose volume)
+LINEAGE_MAX_ENTRIES = int(os.environ.get('LINEAGE_MAX_ENTRIES', '1000'))
+LINEAGE_ID_PATTERN = re.compile(r'^[A-Za-z0-9._-]{1,128}$')
+REUSED = 'reused'
+RECOMPUTED = 'recomputed'
+
+
+def validate_lineage_id(lineage_id):
+    """Returns the id, raising ValueError for ids that are not 1-128 of [A-Za-z0-9._-]"""
+    if not LINEAGE_ID_PATTERN.match(lineage_id or ''):
+        raise ValueError("lineage must be 1-128 letters, digits, '.', '_' or '-'")
+    return lineage_id
+
+
+class LineageStore:
+    """SQLite-backed manifests, one per lineage id"""
+
+    def __init__(self, directory=LINEAGE_DIR, max_entries=LINEAGE_MAX_ENTRIES):
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, 'lineage.sqlite3')
+        self.max_entries = max_entries
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('''CREATE TABLE IF NOT EXISTS manifests (
+                                lineage TEXT PRIMARY KEY,
+                                revision INTEGER NOT NULL,
+                                payload TEXT NOT NULL,
+                                updated_at REAL NOT NULL)''')
+            conn.execute('CREATE INDEX IF NOT EXISTS manifests_age ON manifests (updated_at)')
+
+    @contextmanager
+    def _connect(self):
+        # One short-lived connection per operation keeps this thread/process safe
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def load(self, lineage_id):
+        """The latest manifest of a lineage, or None"""
+        with self._connect() as conn:
+            row = conn.execute('SELECT payload FROM manifests WHERE lineage = ?', (lineage_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def save(self, lineage_id, manifest):
+        """Stores a manifest as the lineage's next revision; returns that revision number"""
+        with self._connect() as conn:
+            row = conn.execute('SELECT revision FROM manifests WHERE lineage = ?', (lineage_id,)).fetchone()
+            revision = (row[0] if row else 0) + 1
+            manifest = dict(manifest, lineage=lineage_id, revision=revision)
+            conn.execute('INSERT OR REPLACE INTO manifests VALUES (?, ?, ?, ?)',
+                         (lineage_id, revision, json.dumps(manifest), time.time()))
+            conn.execute('''DELETE FROM manifests WHERE lineage NOT IN
+                                (SELECT lineage FROM manifests ORDER BY updated_at DESC LIMIT ?)''',
+                         (self.max_entries,))
+        return revision
+
+    def delete(self, lineage_id):
+        with self._connect() as conn:
+            conn.execute('DELETE FROM manifests WHERE lineage = ?', (lineage_id,))
+
+    def stats(self):
+        with self._connect() as conn:
+            return {'lineages': conn.execute('SELECT COUNT(*) FROM manifests').fetchone()[0]}
+
+
+class DocumentLineage:
+    """One extraction's view of a lineage: the previous manifest and the revision being built
+
+    The extractor asks reusable() for outcomes it can skip OCR for, passes
+    every result through mark(), and calls save() once the document is done.
+    """
+
+    def __init__(self, lineage_id, store=None):
+        self.id = validate_lineage_id(lineage_id)
+        self.store = store or get_lineage_store()
+        self.previous = self.store.load(self.id)
+        self.revision = None
+        self.reused = 0
+        self.recomputed = 0
+        self._entries = []
+
+    def reusable(self, fingerprint):
+        """{image hash: previous entry} of outcomes made with the same OCR settings"""
+        if not self.previous or self.previous.get('fingerprint') != fingerprint:
+            return {}
+        return {entry['hash']: entry for entry in self.previous['images']
+                if not entry['debug_info'].get('selection_reason', '').startswith('Error')}
+
+    def reuse(self, entry):
+        """(value, debug_info) of a previous entry for an unchanged image"""
+        info = {key: v for key, v in entry['debug_info'].items() if key != 'timings'}
+        info['processed_image'] = None  # Rendered on demand; it was never written for this revision
+        info['lineage'] = {'status': REUSED, 'revision': self.previous['revision']}
+        return entry['value'], info
+
+    def mark(self, index, title, image_file, image_hash, value, info):
+        """Completes info['lineage'] for one result and records it for the next manifest"""
+        previous = self.previous['images'] if self.previous else []
+        before = previous[index] if index < len(previous) else None
+        lineage = info.setdefault('lineage', {'status': RECOMPUTED})
+        if lineage['status'] == REUSED:
+            self.reused += 1
+            if before is not None and before['hash'] == image_hash and before['title'] != title:
+                lineage['previous_title'] = before['title']
+        else:
+            self.recomputed += 1
+            if before is not None and before['value'] != value:
+                lineage['previous_value'] = before['value']
+
+        self._entries.append({
+            'hash': image_hash,
+            'title': title,
+            'value': value,
+            'image_file': image_file,
+            'debug_info': {key: v for key, v in info.items() if key not in ('lineage', 'timings')}
+        })
+        return info
+
+    def save(self, fingerprint):
+        """Makes the marked results the lineage's latest revision"""
+        self.revision = self.store.save(self.id, {
+            'fingerprint': fingerprint,
+            'saved_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'images': self._entries
+        })
+        return self.revision
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'revision': self.revision,
+            'previous_revision': self.previous['revision'] if self.previous else None,
+            'reused': self.reused,
+            'recomputed': self.recomputed
+        }
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_lineage_store():
+    """Returns the process-wide lineage store"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = LineageStore()
+        return _store
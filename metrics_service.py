@@ -3,17 +3,35 @@ Flask API Wrapper for Metrics Extraction Service
 Wraps extract_metrics_new.py as a REST API for Docker
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, g, Response, stream_with_context, send_file
 from flask_cors import CORS
 import os
 import sys
+import shutil
 import tempfile
 import time
 import json
 import base64
+import io
+import zipfile
+from contextlib import nullcontext
 from werkzeug.utils import secure_filename
 from extract_metrics_new import UniversalExtractorWithReport
-from docx import Document
+from reader_pool import get_reader_pool, checkout_reader, readiness, start_warmup, OCR_WORKERS, OCR_WARMUP
+from jobs import JobManager, QueueFullError, FINISHED
+from ocr_cache import get_ocr_cache
+from ocr_backends import validate_backend, uses_easyocr
+from docx_ingest import DocxDocumentModel, scan_media, docx_sources
+from time_estimator import ProcessingTimeEstimator
+from workspaces import get_workspace_manager, WorkspaceQuotaError
+from artifacts import (write_manifest, save_original, artifact_urls, artifact_file, report_url, ArtifactNotFound,
+                       DEFAULT_THUMBNAIL_SIZE)
+from reports import serialize_result, load_results, iter_report_html, REPORT_PAGE_SIZE
+from lineage import DocumentLineage, validate_lineage_id
+from admission import (get_admission_controller, estimate_cost, check_media, JobCost,
+                       AdmissionRejectedError, AdmissionBusyError)
+from instrumentation import (REGISTRY, REQUESTS_TOTAL, REQUEST_SECONDS, REQUESTS_IN_FLIGHT,
+                             span, record_stage, collect_timings, rounded, process_memory)
 
 app = Flask(__name__)
 CORS(app)
@@ -22,53 +40,45 @@ CORS(app)
 UPLOAD_FOLDER = tempfile.gettempdir()
 ALLOWED_EXTENSIONS = {'docx'}
 MAX_FILE_SIZE = 50 * 1024 * 1024  # 50MB
-AVG_TIME_PER_IMAGE = 2.5  # Average seconds per image for OCR
+BATCH_MAX_SIZE = int(os.environ.get('BATCH_MAX_SIZE_MB', '200')) * 1024 * 1024  # Upload and unzipped documents
+BATCH_MAX_DOCUMENTS = int(os.environ.get('BATCH_MAX_DOCUMENTS', '50'))
+READER_CHECKOUT_TIMEOUT = 300  # Seconds to wait for a free OCR reader
+JOB_WORKERS = int(os.environ.get('JOB_WORKERS', '1'))  # Concurrent background extractions
+JOB_QUEUE_SIZE = int(os.environ.get('JOB_QUEUE_SIZE', '8'))  # Queued jobs before answering 429
+JOB_RETENTION_SECONDS = 3600  # How long finished jobs stay pollable
+STREAM_FORMATS = {'ndjson': 'application/x-ndjson', 'sse': 'text/event-stream'}
 
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 app.config['MAX_CONTENT_LENGTH'] = MAX_FILE_SIZE
 
+estimator = ProcessingTimeEstimator()
+get_reader_pool().on_load = estimator.record_cold_start
+
+# Live gauges, refreshed on every /metrics scrape
+READER_POOL_READERS = REGISTRY.gauge('reader_pool_readers', 'OCR readers by state')
+READER_POOL_UTILISATION = REGISTRY.gauge('reader_pool_utilisation', 'Busy readers / pool size')
+READER_POOL_WAITING = REGISTRY.gauge('reader_pool_waiting', 'Requests waiting for a free reader')
+JOBS = REGISTRY.gauge('jobs', 'Background extraction jobs by state')
+OCR_CACHE_LOOKUPS = REGISTRY.gauge('ocr_cache_lookups', 'OCR cache lookups by result (all processes)')
+OCR_CACHE_HIT_RATE = REGISTRY.gauge('ocr_cache_hit_rate', 'OCR cache hits / lookups')
+OCR_CACHE_BYTES = REGISTRY.gauge('ocr_cache_bytes', 'Bytes stored in the OCR cache')
+WORKSPACE_BYTES = REGISTRY.gauge('workspace_bytes', 'Disk used by extraction workspaces')
+WORKSPACE_COUNT = REGISTRY.gauge('workspaces', 'Extraction workspaces on disk')
+PROCESS_MEMORY = REGISTRY.gauge('process_memory_bytes', 'Memory of this worker process by kind (rss, pss, shared)')
+ADMISSION_MEMORY = REGISTRY.gauge('admission_memory_bytes', 'Estimated extraction memory by state (in_use, budget)')
+ADMISSION_CPU = REGISTRY.gauge('admission_cpu_seconds', 'Estimated OCR seconds by state (in_use, budget)')
+ADMISSION_EXTRACTIONS = REGISTRY.gauge('admission_extractions', 'Extractions by admission state (running, waiting)')
+
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-def count_images_in_docx(filepath):
-    """Count the number of images in a DOCX file using multiple methods"""
+def count_images_in_docx(source):
+    """Count the picture references in a DOCX (path, stream or DocxDocumentModel)"""
     try:
-        doc = Document(filepath)
-        image_count = 0
-        
-        # Method 1: Count images via document relationships (most reliable)
-        # This counts actual image files embedded in the document
-        image_parts = []
-        for rel in doc.part.rels.values():
-            if "image" in rel.target_ref:
-                image_parts.append(rel.target_ref)
-        
-        relationship_count = len(image_parts)
-        print(f"Method 1 (Relationships): Found {relationship_count} images")
-        
-        # Method 2: Count inline images in paragraphs via blip elements
-        blip_count = 0
-        for paragraph in doc.paragraphs:
-            for run in paragraph.runs:
-                if 'blip' in run._element.xml:
-                    blip_count += 1
-
-        # Count images in tables
-        for table in doc.tables:
-            for row in table.rows:
-                for cell in row.cells:
-                    for paragraph in cell.paragraphs:
-                        for run in paragraph.runs:
-                            if 'blip' in run._element.xml:
-                                blip_count += 1
-        
-        print(f"Method 2 (Blip elements): Found {blip_count} images")
-        
-        # Use the maximum count from both methods
-        image_count = max(relationship_count, blip_count)
-        
-        print(f"Final image count: {image_count}")
-        
+        document = source if isinstance(source, DocxDocumentModel) else DocxDocumentModel.from_source(source)
+        image_count = document.image_count
+        print(f"Image references: {image_count} ({len(document.media_order)} distinct media)")
+
         return image_count if image_count > 0 else 1  # Minimum 1 if no images found
     except Exception as e:
         print(f"Error counting images: {e}")
@@ -77,20 +87,412 @@ def count_images_in_docx(filepath):
         return 1
 
 
-def estimate_processing_time(image_count):
-    """Estimate processing time in seconds based on image count"""
-    model_download_time = 30  # First run model download is ~30 seconds
-    processing_time = image_count * AVG_TIME_PER_IMAGE
-    return int(model_download_time + processing_time)
+def processing_time_estimate(image_count, megapixels=None):
+    """Calibrated estimate (with 90% interval) given the current load on the service"""
+    pool = get_reader_pool()
+    jobs = job_manager.stats()
+    pool_stats = pool.stats()
+    # A cold start is only paid when no reader is idle and the pool can still grow
+    warm_reader = pool.warm or OCR_WORKERS > 1 or pool_stats['created'] >= pool_stats['size']
+    return estimator.estimate(
+        image_count,
+        megapixels=megapixels,
+        queue_depth=jobs['queued'] + jobs['running'],
+        workers=jobs['workers'],
+        warm_reader=warm_reader,
+        parallelism=OCR_WORKERS
+    )
+
+def estimate_processing_time(image_count, megapixels=None):
+    """Estimate processing time in seconds from image count, or pixel area when known"""
+    return processing_time_estimate(image_count, megapixels)['estimated_time_seconds']
+
+def admission_cost(*uploads):
+    """Memory/CPU cost of extracting DOCX uploads, from their image headers
+
+    Raises AdmissionRejectedError for decompression bombs.
+    """
+    cost = JobCost()
+    for upload in uploads:
+        manifest = scan_media(upload)
+        check_media(manifest)
+        work = estimator.estimate(max(1, manifest.image_count), megapixels=manifest.megapixels,
+                                  parallelism=OCR_WORKERS)['breakdown']['processing_seconds']
+        cost += estimate_cost(manifest, work)
+    return cost
+
+def admission_error_response(e):
+    """413 for uploads that can never be admitted, 503 with Retry-After while the budgets are full"""
+    if isinstance(e, AdmissionBusyError):
+        response = jsonify({
+            'success': False,
+            'error': str(e),
+            'retry_after_seconds': e.retry_after
+        })
+        response.headers['Retry-After'] = str(e.retry_after)
+        return response, 503
+    return jsonify({
+        'success': False,
+        'error': str(e)
+    }), 413
+
+def format_simple_metric(r, extractor, include_images=True, workspace_id=None):
+    """Formats one extractor result in the /extract-simple response shape
+
+    include_images inlines the images as base64; with a workspace_id the
+    debug block carries /artifacts URLs for them instead.
+    """
+    debug_info = r.get('debug_info', {})
+    # Batch results name their image by content, shared across documents
+    image_file = r.get('artifact_file', r['image_file'])
+    candidates = debug_info.get('candidates', [])
+
+    # Calculate confidence from best candidate
+    confidence = candidates[0].get('conf', 0) if candidates else 0
+
+    # Get raw OCR text
+    ocr_texts = debug_info.get('ocr_text', [])
+    raw_text = ' | '.join([f"{t['text']} ({t['conf']:.0f}%)" for t in ocr_texts[:3]]) if ocr_texts else ''
+
+    # Encode images to base64 (from memory when the extractor still holds them)
+    original_image_b64 = None
+    processed_image_b64 = None
+
+    if include_images:
+        try:
+            original = extractor.original_image_bytes(image_file)
+            if original:
+                original_image_b64 = base64.b64encode(original).decode('utf-8')
+
+            processed = extractor.processed_image_bytes(r)
+            if processed:
+                processed_image_b64 = base64.b64encode(processed).decode('utf-8')
+        except Exception as e:
+            print(f"Error encoding images: {e}")
+
+    metric = {
+        'title': r['title'],
+        'value': r['value'],
+        'debug': {
+            'confidence': round(confidence, 1),
+            'raw_text': raw_text,
+            'selection_reason': debug_info.get('selection_reason', ''),
+            'candidates_count': len(candidates),
+            'candidates': candidates[:5], # Top 5 candidates
+            'image_index': r.get('id', 0),
+            'ocr_backend': debug_info.get('ocr_backend'),
+            'ocr_fallback': debug_info.get('ocr_fallback'),
+            'near_duplicate': debug_info.get('near_duplicate'),
+            'lineage': debug_info.get('lineage'),
+            'original_image': original_image_b64,
+            'processed_image': processed_image_b64
+        }
+    }
+    if workspace_id:
+        metric['debug'].update(artifact_urls(workspace_id, image_file))
+    return metric
+
+def format_metric_with_artifacts(r, extractor, workspace=None):
+    """/extract-simple metric with inline images, or (with a workspace) image URLs"""
+    if workspace is None:
+        return format_simple_metric(r, extractor)
+    save_original(workspace, extractor, r.get('artifact_file', r['image_file']))
+    return format_simple_metric(r, extractor, include_images=False, workspace_id=os.path.basename(workspace))
+
+def requested_ocr_options():
+    """Extractor OCR engine overrides from ?ocr_backend= and ?ocr_fallback=
+
+    ocr_fallback=none turns a configured fallback off. Raises ValueError for
+    unknown engines.
+    """
+    options = {}
+    backend = request.args.get('ocr_backend')
+    if backend:
+        options['ocr_backend'] = validate_backend(backend)
+    fallback = request.args.get('ocr_fallback')
+    if fallback:
+        options['ocr_fallback'] = '' if fallback.lower() == 'none' else validate_backend(fallback)
+    return options
+
+def requested_lineage():
+    """DocumentLineage for ?lineage=<id>, or None; raises ValueError for a malformed id"""
+    lineage_id = request.args.get('lineage')
+    return DocumentLineage(lineage_id) if lineage_id is not None else None
+
+def lineage_summary(extractor):
+    """Reuse counts of an extraction, for the response or stream summary"""
+    return {'lineage': extractor.lineage.to_dict() if extractor.lineage else None}
+
+def extraction_seconds(extractor, started):
+    """Wall time of an extraction for the estimator; None when lineage reuse skipped part of the work"""
+    if extractor.lineage is not None and extractor.lineage.reused:
+        return None
+    return time.time() - started
+
+def checkout_ocr_reader(ocr_options):
+    """A pooled EasyOCR reader, or none when the requested engines do not use EasyOCR"""
+    if not uses_easyocr(ocr_options.get('ocr_backend'), ocr_options.get('ocr_fallback')):
+        return nullcontext()
+    return checkout_reader(READER_CHECKOUT_TIMEOUT)
+
+def requested_stream_format():
+    """'ndjson' or 'sse' from ?stream= or the Accept header; None for a plain JSON response"""
+    fmt = request.args.get('stream', '').lower()
+    if fmt in STREAM_FORMATS:
+        return fmt
+    accept = request.headers.get('Accept', '')
+    if 'text/event-stream' in accept:
+        return 'sse'
+    if 'application/x-ndjson' in accept:
+        return 'ndjson'
+    return None
+
+def encode_stream_record(record, fmt):
+    data = json.dumps(record)
+    if fmt == 'sse':
+        return f"event: {record['type']}\ndata: {data}\n\n"
+    return data + '\n'
+
+def stream_response(records, fmt, on_close=None):
+    """Sends each record as soon as it is produced
+
+    on_close runs when the server is done with the response, even if the
+    client went away before the stream started.
+    """
+    response = Response(stream_with_context(encode_stream_record(r, fmt) for r in records),
+                        mimetype=STREAM_FORMATS[fmt])
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # Keep reverse proxies from buffering the stream
+    if on_close:
+        response.call_on_close(on_close)
+    return response
+
+def release_stream(admission, cost, workspaces, workspace):
+    """on_close of a streamed extraction: frees its admission budget and workspace
+
+    The stream's own cleanup never runs when the client leaves before the
+    first record, so the workspace is released here too (release is idempotent).
+    """
+    admission.release(cost)
+    if workspace:
+        workspaces.release(workspace)
+
+def stream_extraction(make_extractor, format_result, start, finish=None, cleanup=None, ocr_options=None):
+    """Records of a streamed extraction: 'start', one 'metric' per image, then 'summary'
+
+    make_extractor(reader) builds the extractor and format_result(r, extractor)
+    shapes each metric, which is sent as soon as its OCR finishes and then
+    dropped - only the per-image timings are kept for the estimator.
+    finish(extractor) may add fields to the summary; cleanup() runs however
+    the stream ends. Failures end the stream with an 'error' record; a client
+    disconnect stops the extraction. ocr_options decide whether a reader is
+    checked out.
+    """
+    started = time.time()
+    yield dict(start, type='start')
+
+    extractor, results = None, None
+    timed, count, successful = [], 0, 0
+    try:
+        with checkout_ocr_reader(ocr_options or {}) as reader:
+            extractor = make_extractor(reader)
+            results = extractor.iter_results()
+            for r in results:
+                count += 1
+                successful += r['value'] is not None
+                timed.append({'debug_info': {'timings': r['debug_info'].get('timings')}})
+                metric = format_result(r, extractor)
+                extractor.release_result(r)
+                yield {
+                    'type': 'metric',
+                    'index': count,
+                    'total': extractor.total,
+                    'elapsed_seconds': round(time.time() - started, 2),
+                    'metric': metric
+                }
+        estimator.record_results(timed, extraction_seconds(extractor, started))
+
+        summary = {
+            'type': 'summary',
+            'success': True,
+            'count': count,
+            'successful_extractions': successful,
+            'elapsed_seconds': round(time.time() - started, 2)
+        }
+        if finish:
+            summary.update(finish(extractor))
+        yield summary
+    except Exception as e:
+        yield {
+            'type': 'error',
+            'success': False,
+            'error': str(e),
+            'status': 503 if isinstance(e, TimeoutError) else 500
+        }
+    finally:
+        if results is not None:
+            results.close()
+        if extractor is not None:
+            extractor.release_images()
+        if cleanup:
+            cleanup()
+
+def run_extraction_job(job):
+    """Job runner: extracts one uploaded document in a worker thread"""
+    filepath = job.payload['filepath']
+    extractor = None
+    try:
+        ocr_options = job.payload.get('ocr_options', {})
+        # The previous revision is read when the job starts, so queued revisions build on each other
+        lineage_id = job.payload.get('lineage_id')
+        lineage = DocumentLineage(lineage_id) if lineage_id else None
+        # Background jobs wait in line for budget instead of being turned away
+        with get_admission_controller().admit(job.payload['cost'], wait_indefinitely=True), \
+                checkout_ocr_reader(ocr_options) as reader:
+            extractor = UniversalExtractorWithReport(filepath, job.payload['output_dir'], reader=reader,
+                                                     document=job.payload['document'], lineage=lineage,
+                                                     **ocr_options)
+            started = time.time()
+            results = extractor.process_document(on_result=job.add_result, should_stop=job.is_cancelled)
+        if lineage:
+            job.update_info(lineage=lineage.to_dict())
+        estimator.record_results(results, None if job.is_cancelled() else extraction_seconds(extractor, started))
+        with span('results.save'):
+            extractor.save_results(results)
+    finally:
+        # Finished jobs serve their images from the artifacts dir
+        if extractor is not None:
+            extractor.release_images()
+        if os.path.exists(filepath):
+            os.remove(filepath)
+        get_workspace_manager().release(job.payload['output_dir'])
+
+
+def discard_job(info):
+    """Skip hook: a job cancelled before it started has no artifacts, so its workspace goes at once"""
+    shutil.rmtree(info['output_dir'], ignore_errors=True)
+
+
+job_manager = JobManager(run_extraction_job, workers=JOB_WORKERS,
+                         max_queue=JOB_QUEUE_SIZE, retention=JOB_RETENTION_SECONDS, on_skip=discard_job)
+
+
+def collect_live_metrics():
+    """Copies reader pool, job queue and OCR cache state into the /metrics gauges"""
+    pool = get_reader_pool().stats()
+    for state in ('busy', 'idle'):
+        READER_POOL_READERS.set(pool[state], state=state)
+    READER_POOL_UTILISATION.set(round(pool['busy'] / pool['size'], 3) if pool['size'] else 0)
+    READER_POOL_WAITING.set(pool['waiting'])
+
+    jobs = job_manager.stats()
+    for state in ('queued', 'running'):
+        JOBS.set(jobs[state], state=state)
+
+    memory = process_memory()
+    for kind in ('rss', 'pss', 'shared'):
+        if memory[f'{kind}_mb'] is not None:
+            PROCESS_MEMORY.set(int(memory[f'{kind}_mb'] * 1024 * 1024), kind=kind)
+
+    admission = get_admission_controller().stats()
+    ADMISSION_MEMORY.set(admission['memory_in_use_bytes'], state='in_use')
+    ADMISSION_MEMORY.set(admission['memory_budget_bytes'], state='budget')
+    ADMISSION_CPU.set(admission['cpu_in_use_seconds'], state='in_use')
+    ADMISSION_CPU.set(admission['cpu_budget_seconds'], state='budget')
+    for state in ('running', 'waiting'):
+        ADMISSION_EXTRACTIONS.set(admission[state], state=state)
+
+    workspaces = get_workspace_manager().usage()
+    WORKSPACE_BYTES.set(workspaces['bytes'])
+    WORKSPACE_COUNT.set(workspaces['workspaces'])
+
+    cache = get_ocr_cache()
+    if cache:
+        cache_stats = cache.stats()
+        for result in ('hits', 'misses'):
+            OCR_CACHE_LOOKUPS.set(cache_stats[result], result=result)
+        OCR_CACHE_HIT_RATE.set(cache_stats['hit_rate'])
+        OCR_CACHE_BYTES.set(cache_stats['bytes'])
+
+
+REGISTRY.add_collector(collect_live_metrics)
+
+
+def request_endpoint():
+    return request.url_rule.rule if request.url_rule else 'unmatched'
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+    REQUESTS_IN_FLIGHT.inc()
+
+@app.after_request
+def record_request(response):
+    endpoint = request_endpoint()
+    REQUESTS_TOTAL.inc(endpoint=endpoint, method=request.method, status=response.status_code)
+    REQUEST_SECONDS.observe(time.perf_counter() - g.request_started, endpoint=endpoint)
+    return response
+
+@app.teardown_request
+def finish_request(exc):
+    if 'request_started' in g:
+        REQUESTS_IN_FLIGHT.dec()
+
+
+def format_job(data, include_images=False):
+    """Job status (from job_manager.get) with partial results in the /extract-simple metric shape
+
+    Images are read from the job's workspace, so any worker can inline them.
+    """
+    info = data.pop('info')
+    workspace_id = os.path.basename(info['output_dir'])
+    stored = (UniversalExtractorWithReport(None, info['output_dir'], save_artifacts=False, cache=False, workers=0,
+                                           load_reader=False) if include_images else None)
+    metrics = [format_simple_metric(r, stored, include_images, workspace_id) for r in data.pop('results')]
+    finished = data['status'] in FINISHED
+    data['success'] = data['status'] != 'failed'
+    data['filename'] = info['filename']
+    data['metrics'] = metrics
+    data['count'] = len(metrics)
+    data['successful_extractions'] = sum(1 for m in metrics if m['value'] is not None)
+    data['report_url'] = (report_url(workspace_id) if finished and data['started_at'] and data['status'] != 'failed'
+                          else None)
+    data['lineage'] = info.get('lineage')
+    return data
 
 @app.route('/health', methods=['GET'])
 def health():
-    """Health check endpoint"""
+    """Liveness check: answers as soon as the process serves requests
+
+    Touches nothing that can block; cache, memory and load figures are on /ready and /metrics.
+    """
     return jsonify({
         'status': 'healthy',
         'service': 'metrics-extraction'
     }), 200
 
+@app.route('/ready', methods=['GET'])
+def ready():
+    """Readiness check: 200 once a warm OCR reader exists, 503 until then
+
+    Also reports this worker's in-memory load: reader pool, jobs, admission and the estimator.
+    """
+    is_ready, details = readiness()
+    return jsonify({
+        'ready': is_ready,
+        'service': 'metrics-extraction',
+        **details,
+        'reader_pool': get_reader_pool().stats(),
+        'jobs': job_manager.stats(),
+        'admission': get_admission_controller().stats(),
+        'estimator': estimator.snapshot()
+    }), 200 if is_ready else 503
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus text exposition of request, stage, reader pool, job and cache metrics"""
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
 @app.route('/extract', methods=['POST'])
 def extract_metrics():
     """
@@ -98,6 +500,9 @@ def extract_metrics():
 
     Expected: multipart/form-data with 'file' field containing DOCX file
     Returns: JSON with extracted metrics
+    ?stream=ndjson|sse (or a matching Accept header) streams each metric as it completes
+    ?ocr_backend=easyocr|tesseract and ?ocr_fallback=<engine>|none pick the OCR engines
+    ?lineage=<id> re-OCRs only images that changed since the last revision with that id
     """
     try:
         # Check if file is present
@@ -112,43 +517,94 @@ def extract_metrics():
         if not allowed_file(file.filename):
             return jsonify({'error': 'Only .docx files are allowed'}), 400
 
-        # Save uploaded file temporarily
-        filename = secure_filename(file.filename)
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        file.save(filepath)
+        try:
+            ocr_options = requested_ocr_options()
+            lineage = requested_lineage()
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+
+        # Read the upload into memory; only the requested artifacts touch disk
+        with span('upload.read'):
+            upload = io.BytesIO(file.read())
 
+        # Admit the upload on its estimated memory/CPU cost before any work starts
+        admission = get_admission_controller()
+        with span('admission'):
+            cost = admission.acquire(admission_cost(upload))
+
+        # Isolated output directory, removed by the workspace sweeper after its TTL
+        workspaces = get_workspace_manager()
         try:
-            # Create temporary output directory
-            output_dir = os.path.join(app.config['UPLOAD_FOLDER'], f'extraction_{os.getpid()}')
+            output_dir = workspaces.create()
+        except Exception:
+            admission.release(cost)
+            raise
+        workspace_id = os.path.basename(output_dir)
 
-            # Process the document
-            extractor = UniversalExtractorWithReport(filepath, output_dir)
-            results = extractor.process_document()
-            extractor.save_results(results)
+        fmt = requested_stream_format()
+        if fmt:
+            kept = []
 
-            # Format results for API response
-            metrics = []
-            for r in results:
-                metrics.append({
-                    'id': r['id'],
-                    'title': r['title'],
-                    'value': r['value'],
-                    'image_file': r['image_file'],
-                    'debug_info': r['debug_info']
-                })
-
-            return jsonify({
-                'success': True,
-                'metrics': metrics,
-                'count': len(metrics),
-                'output_dir': output_dir
-            }), 200
+            def keep_metric(r, extractor):
+                kept.append(r)  # The saved results need every metric
+                return serialize_result(r)
+
+            def save_report(extractor):
+                with span('results.save'):
+                    extractor.save_results(kept)
+                return dict(lineage_summary(extractor), output_dir=output_dir, workspace_id=workspace_id,
+                            report_url=report_url(workspace_id))
+
+            return stream_response(stream_extraction(
+                lambda reader: UniversalExtractorWithReport(upload, output_dir, reader=reader, lineage=lineage,
+                                                            **ocr_options),
+                keep_metric,
+                {'filename': secure_filename(file.filename), 'workspace_id': workspace_id},
+                finish=save_report,
+                cleanup=lambda: workspaces.release(output_dir),
+                ocr_options=ocr_options
+            ), fmt, on_close=lambda: release_stream(admission, cost, workspaces, output_dir))
 
+        # Process the document with a reader from the shared pool
+        try:
+            started = time.time()
+            with checkout_ocr_reader(ocr_options) as reader:
+                record_stage('reader.wait', time.time() - started)
+                extractor = UniversalExtractorWithReport(upload, output_dir, reader=reader, lineage=lineage,
+                                                         **ocr_options)
+                results = extractor.process_document()
+            estimator.record_results(results, extraction_seconds(extractor, started))
+            with span('results.save'):
+                extractor.save_results(results)
         finally:
-            # Clean up uploaded file
-            if os.path.exists(filepath):
-                os.remove(filepath)
+            workspaces.release(output_dir)
+            admission.release(cost)
+
+        # Same records as the saved results.json; the HTML report is rendered on request
+        metrics = [serialize_result(r) for r in results]
+
+        return jsonify({
+            'success': True,
+            'metrics': metrics,
+            'count': len(metrics),
+            'output_dir': output_dir,
+            'workspace_id': workspace_id,
+            'report_url': report_url(workspace_id),
+            **lineage_summary(extractor)
+        }), 200
 
+    except (AdmissionRejectedError, AdmissionBusyError) as e:
+        return admission_error_response(e)
+    except WorkspaceQuotaError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 507
+    except TimeoutError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 503
     except Exception as e:
         return jsonify({
             'success': False,
@@ -158,7 +614,10 @@ def extract_metrics():
 @app.route('/estimate', methods=['POST'])
 def estimate():
     """
-    Estimate processing time based on image count
+    Estimate processing time based on image count and pixel area
+
+    Default (fast) mode reads only the zip manifest and image headers.
+    ?mode=full counts picture references from the parsed document instead.
     Returns: image_count and estimated_time_seconds
     """
     try:
@@ -173,32 +632,41 @@ def estimate():
         if not allowed_file(file.filename):
             return jsonify({'error': 'Only .docx files are allowed'}), 400
 
-        # Save uploaded file temporarily
-        filename = secure_filename(file.filename)
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        file.save(filepath)
-
-        try:
-            # Count images
-            image_count = count_images_in_docx(filepath)
-            estimated_time = estimate_processing_time(image_count)
-            
-            print(f"=== ESTIMATION RESPONSE ===")
-            print(f"Image count: {image_count}")
-            print(f"Estimated time: {estimated_time}s")
-            print(f"===========================")
+        upload = io.BytesIO(file.read())
+        mode = request.args.get('mode', 'fast')
 
-            return jsonify({
-                'success': True,
-                'image_count': image_count,
-                'estimated_time_seconds': estimated_time,
-                'message': f'Found {image_count} image(s). Estimated processing time: ~{estimated_time} seconds'
-            }), 200
+        if mode == 'full':
+            image_count = count_images_in_docx(upload)
+            prediction = processing_time_estimate(image_count)
+            media = None
+        else:
+            manifest = scan_media(upload)
+            image_count = max(1, manifest.image_count)
+            prediction = processing_time_estimate(image_count, manifest.megapixels)
+            media = manifest.to_dict()
+            media['cost'] = estimate_cost(manifest, prediction['breakdown']['processing_seconds']).to_dict()
+        estimated_time = prediction['estimated_time_seconds']
+        
+        print(f"=== ESTIMATION RESPONSE ===")
+        print(f"Mode: {mode}")
+        print(f"Image count: {image_count}")
+        print(f"Estimated time: {estimated_time}s")
+        print(f"===========================")
 
-        finally:
-            # Clean up uploaded file
-            if os.path.exists(filepath):
-                os.remove(filepath)
+        return jsonify({
+            'success': True,
+            'mode': mode,
+            'image_count': image_count,
+            'total_pixels': media['total_pixels'] if media else None,
+            'megapixels': media['megapixels'] if media else None,
+            'images': media['images'] if media else None,
+            'cost': media['cost'] if media else None,
+            'estimated_time_seconds': estimated_time,
+            'confidence_interval': prediction['confidence_interval'],
+            'breakdown': prediction['breakdown'],
+            'calibrated': prediction['calibrated'],
+            'message': f'Found {image_count} image(s). Estimated processing time: ~{estimated_time} seconds'
+        }), 200
 
     except Exception as e:
         return jsonify({
@@ -210,6 +678,11 @@ def estimate():
 def extract_simple():
     """
     Simplified extraction - returns only title and value pairs
+    Pass ?timings=true for a per-stage timings block (seconds) in the response
+    ?stream=ndjson|sse (or a matching Accept header) streams each metric as it completes
+    ?ocr_backend=easyocr|tesseract and ?ocr_fallback=<engine>|none pick the OCR engines
+    ?lineage=<id> re-OCRs only images that changed since the last revision with that id
+    Images are referenced by /artifacts URLs; ?inline_images=true embeds them as base64
     """
     try:
         if 'file' not in request.files:
@@ -223,104 +696,436 @@ def extract_simple():
         if not allowed_file(file.filename):
             return jsonify({'error': 'Only .docx files are allowed'}), 400
 
-        # Save uploaded file temporarily
-        filename = secure_filename(file.filename)
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        file.save(filepath)
-
+        include_timings = request.args.get('timings', 'false').lower() == 'true'
+        inline_images = request.args.get('inline_images', 'false').lower() == 'true'
         try:
-            # Count images for metadata
-            image_count = count_images_in_docx(filepath)
+            ocr_options = requested_ocr_options()
+            lineage = requested_lineage()
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+
+        with collect_timings() as timings:
+            # Read the upload into memory: nothing is written to disk for this endpoint
+            filename = secure_filename(file.filename)
+            with span('upload.read'):
+                upload = io.BytesIO(file.read())
+
+            # Parse once; the count, titles and image order all come from this model
+            with span('docx.parse'):
+                document = DocxDocumentModel.from_source(upload)
+            image_count = count_images_in_docx(document)
             estimated_time = estimate_processing_time(image_count)
 
-            # Create temporary output directory
-            output_dir = os.path.join(app.config['UPLOAD_FOLDER'], f'extraction_{os.getpid()}')
+            admission = get_admission_controller()
+            with span('admission'):
+                cost = admission.acquire(admission_cost(upload))
+
+            # Originals go to a workspace and are served from /artifacts; processed
+            # images are only rendered if someone opens them
+            workspaces = get_workspace_manager()
+            try:
+                workspace = None if inline_images else workspaces.create('simple')
+            except Exception:
+                admission.release(cost)
+                raise
+            workspace_id = os.path.basename(workspace) if workspace else None
+
+            def make_extractor(reader):
+                extractor = UniversalExtractorWithReport(upload, reader=reader, save_artifacts=False,
+                                                         keep_processed_images=inline_images, document=document,
+                                                         lineage=lineage, **ocr_options)
+                if workspace:
+                    write_manifest(workspace, extractor)
+                return extractor
+
+            def format_metric(r, extractor):
+                return format_metric_with_artifacts(r, extractor, workspace)
+
+            def release_workspace():
+                if workspace:
+                    workspaces.release(workspace)
+
+            fmt = requested_stream_format()
+            if fmt:
+                return stream_response(stream_extraction(
+                    make_extractor,
+                    format_metric,
+                    {'filename': filename, 'image_count': image_count, 'estimated_time_seconds': estimated_time,
+                     'workspace_id': workspace_id},
+                    finish=lineage_summary,
+                    cleanup=release_workspace,
+                    ocr_options=ocr_options
+                ), fmt, on_close=lambda: release_stream(admission, cost, workspaces, workspace))
 
             # Process the document
             print(f"=== STARTING EXTRACTION ===")
             print(f"File: {filename}")
             print(f"Image count: {image_count}")
-            
-            extractor = UniversalExtractorWithReport(filepath, output_dir)
-            results = extractor.process_document()
-            
-            print(f"Extraction complete. Results count: {len(results)}")
-            
-            # Debug: Print first few results
-            for i, r in enumerate(results[:3]):
-                print(f"Result {i+1}: title='{r['title']}', value={r['value']}, type={type(r['value'])}")
-
-            # Return title, value, and debug information
-            metrics = []
-            for r in results:
-                debug_info = r.get('debug_info', {})
-                candidates = debug_info.get('candidates', [])
-                
-                # Calculate confidence from best candidate
-                confidence = candidates[0].get('conf', 0) if candidates else 0
-                
-                # Get raw OCR text
-                ocr_texts = debug_info.get('ocr_text', [])
-                raw_text = ' | '.join([f"{t['text']} ({t['conf']:.0f}%)" for t in ocr_texts[:3]]) if ocr_texts else ''
-                
-                # Encode images to base64
-                original_image_b64 = None
-                processed_image_b64 = None
-                
+
+            try:
+                started = time.time()
+                with checkout_ocr_reader(ocr_options) as reader:
+                    record_stage('reader.wait', time.time() - started)
+                    extractor = make_extractor(reader)
+                    results = extractor.process_document()
+                estimator.record_results(results, extraction_seconds(extractor, started))
+
+                print(f"Extraction complete. Results count: {len(results)}")
+
+                # Debug: Print first few results
+                for i, r in enumerate(results[:3]):
+                    print(f"Result {i+1}: title='{r['title']}', value={r['value']}, type={type(r['value'])}")
+
+                # Return title, value, and debug information
+                with span('response.images'):
+                    metrics = [format_metric(r, extractor) for r in results]
+                extractor.release_images()
+            finally:
+                release_workspace()
+                admission.release(cost)
+
+        print(f"Formatted metrics count: {len(metrics)}")
+        print(f"=== EXTRACTION COMPLETE ===")
+
+        response = {
+            'success': True,
+            'metrics': metrics,
+            'count': len(metrics),
+            'workspace_id': workspace_id,
+            'image_count': image_count,
+            'estimated_time_seconds': estimated_time,
+            'successful_extractions': sum(1 for m in metrics if m['value'] is not None),
+            **lineage_summary(extractor)
+        }
+        if include_timings:
+            response['timings'] = rounded(timings)
+        return jsonify(response), 200
+
+    except (AdmissionRejectedError, AdmissionBusyError) as e:
+        return admission_error_response(e)
+    except WorkspaceQuotaError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 507
+    except TimeoutError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 503
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+def read_batch_uploads(files):
+    """[(filename, BytesIO)] of every document in the uploaded .docx and .zip files"""
+    sources = []
+    remaining = BATCH_MAX_SIZE
+    for file in files:
+        filename = secure_filename(file.filename or '')
+        extension = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+        if extension not in ALLOWED_EXTENSIONS | {'zip'}:
+            raise ValueError(f"{file.filename or 'Unnamed file'}: only .docx and .zip files are allowed")
+        upload = io.BytesIO(file.read())
+        try:
+            documents = docx_sources(upload, filename, max_bytes=remaining)
+        except zipfile.BadZipFile:
+            raise ValueError(f"{filename} is not a valid .docx or .zip file")
+        if extension == 'zip':
+            remaining -= sum(d.getbuffer().nbytes for _, d in documents)
+        sources.extend(documents)
+    if not sources:
+        raise ValueError("No .docx documents in the upload")
+    if len(sources) > BATCH_MAX_DOCUMENTS:
+        raise ValueError(f"{len(sources)} documents is over the limit of {BATCH_MAX_DOCUMENTS} per batch")
+    return sources
+
+@app.route('/extract-batch', methods=['POST'])
+def extract_batch():
+    """
+    Extracts several documents in one request
+    Upload any number of `files` (.docx, or .zip archives of .docx files). Images
+    are de-duplicated across all documents and OCR'd in one pass; every document
+    gets its own entry with `metrics` in the /extract-simple format.
+    ?inline_images=true embeds images as base64 instead of /artifacts URLs
+    ?ocr_backend=easyocr|tesseract and ?ocr_fallback=<engine>|none pick the OCR engines
+    """
+    try:
+        # Batches may be larger than a single upload (per-request limits need Flask 3.1)
+        request.max_content_length = BATCH_MAX_SIZE
+        files = request.files.getlist('files') + request.files.getlist('file')
+        if not files:
+            return jsonify({'error': 'No files provided'}), 400
+
+        include_timings = request.args.get('timings', 'false').lower() == 'true'
+        inline_images = request.args.get('inline_images', 'false').lower() == 'true'
+        try:
+            ocr_options = requested_ocr_options()
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+
+        with collect_timings() as timings:
+            with span('upload.read'):
                 try:
-                    # Original image
-                    img_path = os.path.join(output_dir, 'images', r['image_file'])
-                    if os.path.exists(img_path):
-                        with open(img_path, "rb") as image_file:
-                            original_image_b64 = base64.b64encode(image_file.read()).decode('utf-8')
-                            
-                    # Processed image
-                    proc_img_path = os.path.join(output_dir, debug_info.get('processed_image', ''))
-                    if os.path.exists(proc_img_path):
-                        with open(proc_img_path, "rb") as image_file:
-                            processed_image_b64 = base64.b64encode(image_file.read()).decode('utf-8')
-                except Exception as e:
-                    print(f"Error encoding images: {e}")
-
-                metrics.append({
-                    'title': r['title'],
-                    'value': r['value'],
-                    'debug': {
-                        'confidence': round(confidence, 1),
-                        'raw_text': raw_text,
-                        'selection_reason': debug_info.get('selection_reason', ''),
-                        'candidates_count': len(candidates),
-                        'candidates': candidates[:5], # Top 5 candidates
-                        'image_index': r.get('id', 0),
-                        'original_image': original_image_b64,
-                        'processed_image': processed_image_b64
-                    }
-                })
-            
-            print(f"Formatted metrics count: {len(metrics)}")
-            print(f"First metric: {metrics[0] if metrics else 'None'}\")")
-            print(f"=== EXTRACTION COMPLETE ===")
-
-            return jsonify({
-                'success': True,
-                'metrics': metrics,
-                'count': len(metrics),
-                'image_count': image_count,
-                'estimated_time_seconds': estimated_time,
-                'successful_extractions': sum(1 for m in metrics if m['value'] is not None)
-            }), 200
+                    sources = read_batch_uploads(files)
+                except ValueError as e:
+                    return jsonify({'success': False, 'error': str(e)}), 400
 
-        finally:
-            # Clean up uploaded file
-            if os.path.exists(filepath):
-                os.remove(filepath)
+            admission = get_admission_controller()
+            with span('admission'):
+                cost = admission.acquire(admission_cost(*(source for _, source in sources)))
+
+            workspaces = get_workspace_manager()
+            try:
+                workspace = None if inline_images else workspaces.create('batch')
+            except Exception:
+                admission.release(cost)
+                raise
+            workspace_id = os.path.basename(workspace) if workspace else None
+
+            print(f"=== STARTING BATCH EXTRACTION ===")
+            print(f"Documents: {len(sources)}")
+
+            try:
+                started = time.time()
+                with checkout_ocr_reader(ocr_options) as reader:
+                    record_stage('reader.wait', time.time() - started)
+                    extractor = UniversalExtractorWithReport(None, reader=reader, save_artifacts=False,
+                                                             keep_processed_images=inline_images, **ocr_options)
+                    if workspace:
+                        write_manifest(workspace, extractor)
+                    batch = extractor.process_batch(sources)
+                # Calibrate from the images that were actually OCR'd, once each
+                estimator.record_results([r for entry in batch for r in entry['results']
+                                          if not r['debug_info'].get('batch_reused')])
+
+                documents = []
+                with span('response.images'):
+                    for entry in batch:
+                        metrics = [format_metric_with_artifacts(r, extractor, workspace) for r in entry['results']]
+                        documents.append({
+                            'filename': entry['document'],
+                            'success': entry['error'] is None,
+                            'error': entry['error'],
+                            'metrics': metrics,
+                            'count': len(metrics),
+                            'successful_extractions': sum(1 for m in metrics if m['value'] is not None)
+                        })
+                unique_images = len(extractor.images)
+                extractor.release_images()
+            finally:
+                if workspace:
+                    workspaces.release(workspace)
+                admission.release(cost)
+
+        print(f"=== BATCH EXTRACTION COMPLETE ===")
+
+        response = {
+            'success': True,
+            'documents': documents,
+            'document_count': len(documents),
+            'count': sum(d['count'] for d in documents),
+            'unique_images': unique_images,
+            'successful_extractions': sum(d['successful_extractions'] for d in documents),
+            'workspace_id': workspace_id
+        }
+        if include_timings:
+            response['timings'] = rounded(timings)
+        return jsonify(response), 200
+
+    except (AdmissionRejectedError, AdmissionBusyError) as e:
+        return admission_error_response(e)
+    except WorkspaceQuotaError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 507
+    except TimeoutError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 503
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/artifacts/<workspace_id>/<kind>/<image_file>', methods=['GET'])
+def get_artifact(workspace_id, kind, image_file):
+    """
+    Serve an extraction image: kind is 'original' or 'processed'
+    ?size=<px> and/or ?format=webp|jpeg return a downscaled thumbnail
+    Responses carry an ETag and support conditional and Range requests
+    """
+    workspaces = get_workspace_manager()
+    workspace = workspaces.resolve(workspace_id)
+    if workspace is None:
+        return jsonify({'success': False, 'error': 'Workspace not found or expired'}), 404
+
+    try:
+        with span('artifact.render'):
+            path = artifact_file(workspace, kind, image_file,
+                                 request.args.get('size'), request.args.get('format'))
+    except ArtifactNotFound:
+        return jsonify({'success': False, 'error': 'Artifact not found'}), 404
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
 
+    response = send_file(path, conditional=True, etag=True, max_age=workspaces.ttl)
+    response.cache_control.public = False
+    response.cache_control.private = True
+    return response
+
+@app.route('/artifacts/<workspace_id>/report.html', methods=['GET'])
+def get_report(workspace_id):
+    """
+    Visual debug report of an /extract or /jobs extraction, rendered on request
+    ?page=<n> selects a page of ?page_size= metrics (default REPORT_PAGE_SIZE)
+    The HTML is streamed card by card; images are lazy-loaded from /artifacts
+    """
+    workspace = get_workspace_manager().resolve(workspace_id)
+    records = load_results(workspace) if workspace else None
+    if records is None:
+        return jsonify({'success': False, 'error': 'Report not found or expired'}), 404
+
+    try:
+        page = int(request.args.get('page', 1))
+        page_size = min(500, max(1, int(request.args.get('page_size', REPORT_PAGE_SIZE))))
+        # Validate the page before the response starts
+        chunks = iter_report_html(
+            records,
+            lambda r: f"original/{r['image_file']}",
+            lambda r: f"processed/{r['image_file']}?size={DEFAULT_THUMBNAIL_SIZE * 2}",
+            lambda n: f'report.html?page={n}&page_size={page_size}',
+            page, page_size)
+        first = next(chunks)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+    def render():
+        yield first
+        yield from chunks
+
+    response = Response(stream_with_context(render()), mimetype='text/html')
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+@app.route('/jobs', methods=['POST'])
+def submit_job():
+    """
+    Queue a DOCX for background extraction
+
+    Returns: 202 with job_id immediately, or 429 with Retry-After when the queue is full
+    ?ocr_backend=easyocr|tesseract and ?ocr_fallback=<engine>|none pick the OCR engines
+    ?lineage=<id> re-OCRs only images that changed since the last revision with that id
+    """
+    try:
+        if 'file' not in request.files:
+            return jsonify({'error': 'No file provided'}), 400
+
+        file = request.files['file']
+
+        if file.filename == '':
+            return jsonify({'error': 'No file selected'}), 400
+
+        if not allowed_file(file.filename):
+            return jsonify({'error': 'Only .docx files are allowed'}), 400
+        try:
+            ocr_options = requested_ocr_options()
+            lineage_id = request.args.get('lineage')
+            if lineage_id is not None:
+                validate_lineage_id(lineage_id)
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+
+        # Each job gets its own workspace for the upload and its artifacts
+        filename = secure_filename(file.filename)
+        workspaces = get_workspace_manager()
+        output_dir = workspaces.create('job')
+        # Nothing owns the workspace until the job is queued; remove it on any failure before that
+        try:
+            filepath = os.path.join(output_dir, f'upload_{filename}')
+            file.save(filepath)
+
+            document = DocxDocumentModel.from_source(filepath)
+            image_count = count_images_in_docx(document)
+            # Refuse jobs that could never be admitted now; the rest wait for budget when they run
+            cost = admission_cost(filepath)
+            get_admission_controller().check(cost)
+            job = job_manager.submit({
+                'filepath': filepath,
+                'output_dir': output_dir,
+                'document': document,
+                'ocr_options': ocr_options,
+                'lineage_id': lineage_id,
+                'cost': cost
+            }, info={'filename': filename, 'output_dir': output_dir})
+        except QueueFullError as e:
+            shutil.rmtree(output_dir, ignore_errors=True)
+            response = jsonify({
+                'success': False,
+                'error': str(e),
+                'retry_after_seconds': e.retry_after
+            })
+            response.headers['Retry-After'] = str(e.retry_after)
+            return response, 429
+        except zipfile.BadZipFile:
+            shutil.rmtree(output_dir, ignore_errors=True)
+            return jsonify({'success': False, 'error': f'{filename} is not a valid .docx file'}), 400
+        except BaseException:
+            shutil.rmtree(output_dir, ignore_errors=True)
+            raise
+
+        return jsonify({
+            'success': True,
+            'job_id': job.id,
+            'status': 'queued',
+            'status_url': f'/jobs/{job.id}',
+            'image_count': image_count,
+            'estimated_time_seconds': estimate_processing_time(image_count)
+        }), 202
+
+    except (AdmissionRejectedError, AdmissionBusyError) as e:
+        return admission_error_response(e)
+    except WorkspaceQuotaError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 507
     except Exception as e:
         return jsonify({
             'success': False,
             'error': str(e)
         }), 500
 
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """
+    Poll a job: status, per-image progress and partial results
+    Pass ?include_images=true to inline base64 images in the metrics
+    """
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({'success': False, 'error': 'Job not found'}), 404
+
+    include_images = request.args.get('include_images', 'false').lower() == 'true'
+    return jsonify(format_job(job, include_images)), 200
+
+@app.route('/jobs/<job_id>', methods=['DELETE'])
+def cancel_job(job_id):
+    """Cancel a queued or running job (running jobs stop after the current image)"""
+    job = job_manager.cancel(job_id)
+    if job is None:
+        return jsonify({'success': False, 'error': 'Job not found'}), 404
+
+    return jsonify(format_job(job)), 200
+
 if __name__ == '__main__':
+    # Load the OCR model in the background; /ready turns green when it is usable
+    if OCR_WARMUP:
+        start_warmup()
     # Run on port 5000, accessible from Docker network
     app.run(host='0.0.0.0', port=5000, debug=False)
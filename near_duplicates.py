@@ -0,0 +1,95 @@
+"""
+Near-Duplicate Image Index
+==========================
+Groups images that look the same but are not byte-identical: screenshots
+of one panel that were re-encoded, recompressed or rescaled, or that
+differ by a stray pixel. MD5 de-duplication only catches exact copies.
+
+Matching is two-step:
+1. Shortlist by difference hash (dHash): the image is shrunk to a
+   (HASH_SIZE + 1) x HASH_SIZE grey grid and every bit records whether a
+   cell is brighter than its right-hand neighbour. Images within
+   NEAR_DUPLICATE_DISTANCE bits (Hamming distance) are candidates.
+2. Confirm on pixels: both images are scaled to SIGNATURE_WIDTH and
+   compared in BLOCK x BLOCK cells. Recompression noise spreads thinly over
+   every cell, while a changed digit concentrates in a few, so a match
+   needs every cell's mean difference under NEAR_DUPLICATE_MAX_DIFF grey
+   levels.
+
+The hash alone is not enough: two cards in the same style whose values
+differ by one digit hash as close as a recompressed copy. The pixel check
+is what keeps them apart - and it also rejects anything that covers a
+patch of the image, such as a mouse cursor.
+
+Off by default (NEAR_DUPLICATES).
+"""
+
+import os
+import numpy as np
+from PIL import Image
+
+NEAR_DUPLICATES = os.environ.get('NEAR_DUPLICATES', 'false').lower() in ('1', 'true', 'yes')
+NEAR_DUPLICATE_DISTANCE = int(os.environ.get('NEAR_DUPLICATE_DISTANCE', '12'))  # Max differing hash bits
+NEAR_DUPLICATE_MAX_DIFF = float(os.environ.get('NEAR_DUPLICATE_MAX_DIFF', '24'))  # Grey levels per cell
+HASH_SIZE = 16  # 256-bit hash
+SIGNATURE_WIDTH = 256  # px
+BLOCK = 8  # px, in the signature
+ASPECT_TOLERANCE = 0.05  # Differently shaped images never match
+
+
+def dhash(image, hash_size=HASH_SIZE):
+    """Difference hash of a PIL image, as an int of hash_size * hash_size bits"""
+    small = image.convert('L').resize((hash_size + 1, hash_size), Image.BILINEAR)
+    pixels = np.asarray(small, dtype=np.int16)
+    bits = (pixels[:, :-1] > pixels[:, 1:]).flatten()
+    return int.from_bytes(np.packbits(bits).tobytes(), 'big')
+
+
+def hamming_distance(a, b):
+    return (a ^ b).bit_count()
+
+
+def signature(image, aspect):
+    """Greyscale copy at SIGNATURE_WIDTH, the same shape for any image of this aspect ratio"""
+    height = max(BLOCK, round(SIGNATURE_WIDTH / aspect))
+    return np.asarray(image.convert('L').resize((SIGNATURE_WIDTH, height), Image.BILINEAR), dtype=np.uint8)
+
+
+def max_block_difference(a, b):
+    """Largest mean absolute difference over BLOCK x BLOCK cells of two signatures"""
+    height = min(a.shape[0], b.shape[0]) // BLOCK * BLOCK
+    width = a.shape[1] // BLOCK * BLOCK
+    diff = np.abs(a[:height, :width].astype(np.int16) - b[:height, :width])
+    cells = diff.reshape(height // BLOCK, BLOCK, width // BLOCK, BLOCK).mean(axis=(1, 3))
+    return float(cells.max())
+
+
+class NearDuplicateIndex:
+    """Clusters images; the first image of a cluster represents it"""
+
+    def __init__(self, max_distance=NEAR_DUPLICATE_DISTANCE, max_difference=NEAR_DUPLICATE_MAX_DIFF):
+        self.max_distance = max_distance
+        self.max_difference = max_difference
+        self._representatives = []  # (key, hash, aspect ratio, signature)
+
+    def add(self, key, image):
+        """(representative key, hash distance) of a near match, or None after adding `image` as a new cluster"""
+        width, height = image.size
+        aspect = width / height
+        value = dhash(image)
+        own_signature = signature(image, aspect)
+
+        shortlist = []
+        for other_key, other_value, other_aspect, other_signature in self._representatives:
+            if abs(aspect - other_aspect) > ASPECT_TOLERANCE * max(aspect, other_aspect):
+                continue
+            distance = hamming_distance(value, other_value)
+            if distance <= self.max_distance:
+                shortlist.append((distance, other_key, other_signature))
+
+        for distance, other_key, other_signature in sorted(shortlist, key=lambda c: c[0]):
+            if max_block_difference(own_signature, other_signature) <= self.max_difference:
+                return other_key, distance
+
+        self._representatives.append((key, value, aspect, own_signature))
+        return None
@@ -0,0 +1,136 @@
+"""
+OCR Backends
+============
+Engines the extractor can read text with. Every backend returns EasyOCR's
+`detail=1` shape - [(4-point box, text, confidence 0-1)] - which is what
+candidate scoring already consumes.
+
+- easyocr: the default. Deep-learning detector and recogniser (torch).
+- tesseract: Tesseract through pytesseract, restricted to digits, the
+  decimal point and unit characters. No torch, a fraction of the image
+  size and much cheaper per image on CPU; weaker on stylised fonts.
+
+OCR_BACKEND picks the engine and OCR_FALLBACK_BACKEND optionally names a
+second one. When the primary engine's best numeric box is below
+OCR_FALLBACK_CONFIDENCE percent (or it found no number), the image is read
+again by the fallback and the more confident reading wins. Both can be
+overridden per request.
+
+Tesseract is an optional dependency: pytesseract plus the tesseract
+binary (apt-get install tesseract-ocr).
+"""
+
+import os
+from functools import lru_cache
+from PIL import Image
+
+EASYOCR = 'easyocr'
+TESSERACT = 'tesseract'
+OCR_BACKENDS = (EASYOCR, TESSERACT)
+
+OCR_BACKEND = os.environ.get('OCR_BACKEND', EASYOCR)
+OCR_FALLBACK_BACKEND = os.environ.get('OCR_FALLBACK_BACKEND', '')  # Empty = no fallback
+OCR_FALLBACK_CONFIDENCE = float(os.environ.get('OCR_FALLBACK_CONFIDENCE', '50'))  # Percent
+TESSERACT_PSM = int(os.environ.get('TESSERACT_PSM', '11'))  # Sparse text: cards have scattered labels
+TESSERACT_ALLOWLIST = '0123456789.,%msS'
+
+
+def validate_backend(name, allow_none=False):
+    """Returns a known backend name (or None when allowed), raising ValueError otherwise"""
+    if not name and allow_none:
+        return None
+    name = (name or '').lower()
+    if name not in OCR_BACKENDS:
+        raise ValueError(f"Unknown OCR backend '{name}' (choose from {', '.join(OCR_BACKENDS)})")
+    return name
+
+
+def uses_easyocr(backend=None, fallback=None):
+    """True when the primary or fallback engine needs an EasyOCR reader"""
+    backend = backend or OCR_BACKEND
+    fallback = OCR_FALLBACK_BACKEND if fallback is None else fallback
+    return EASYOCR in (backend, fallback)
+
+
+def best_confidence(raw):
+    """Highest confidence (0-1) among boxes that contain a digit"""
+    return max((conf for _, text, conf in raw if any(c.isdigit() for c in text)), default=0.0)
+
+
+class OCRBackend:
+    """Interface: readtext(pixels, **options) -> [(box, text, confidence)]"""
+
+    name = None
+
+    def readtext(self, pixels, **options):
+        raise NotImplementedError
+
+    def readtext_batched(self, images, batch_size=1, **options):
+        return [self.readtext(pixels, **options) for pixels in images]
+
+
+class EasyOCRBackend(OCRBackend):
+    name = EASYOCR
+
+    def __init__(self, reader):
+        self.reader = reader
+
+    def readtext(self, pixels, **options):
+        return self.reader.readtext(pixels, detail=1, **options)
+
+    def readtext_batched(self, images, batch_size=1, **options):
+        return self.reader.readtext_batched(images, batch_size=batch_size, detail=1, **options)
+
+
+def _import_pytesseract():
+    try:
+        import pytesseract
+    except ImportError:
+        raise RuntimeError("The tesseract OCR backend needs pytesseract and the tesseract binary")
+    return pytesseract
+
+
+class TesseractBackend(OCRBackend):
+    """Tesseract in numeric mode, one subprocess call per image"""
+
+    name = TESSERACT
+
+    def __init__(self, psm=TESSERACT_PSM, allowlist=TESSERACT_ALLOWLIST):
+        self.psm = psm
+        self.allowlist = allowlist
+
+    def readtext(self, pixels, allowlist=None, **options):
+        # EasyOCR-only options (canvas_size, ...) do not apply
+        pytesseract = _import_pytesseract()
+        config = f'--psm {self.psm} -c tessedit_char_whitelist={allowlist or self.allowlist}'
+        data = pytesseract.image_to_data(Image.fromarray(pixels), config=config,
+                                         output_type=pytesseract.Output.DICT)
+        boxes = []
+        for text, conf, left, top, width, height in zip(data['text'], data['conf'], data['left'],
+                                                        data['top'], data['width'], data['height']):
+            text, conf = text.strip(), float(conf)
+            if not text or conf < 0:  # -1 marks layout rows, not words
+                continue
+            right, bottom = left + width, top + height
+            boxes.append(([[left, top], [right, top], [right, bottom], [left, bottom]], text, conf / 100))
+        return boxes
+
+
+def create_backend(name, reader=None):
+    """Backend instance by name; EasyOCR reads with the given reader"""
+    if name == EASYOCR:
+        return EasyOCRBackend(reader)
+    if name == TESSERACT:
+        return TesseractBackend()
+    raise ValueError(f"Unknown OCR backend '{name}'")
+
+
+@lru_cache(maxsize=None)
+def backend_version(name):
+    """Engine version, part of the OCR cache fingerprint"""
+    if name == EASYOCR:
+        import easyocr
+        return getattr(easyocr, '__version__', 'unknown')
+    if name == TESSERACT:
+        return str(_import_pytesseract().get_tesseract_version())
+    raise ValueError(f"Unknown OCR backend '{name}'")
@@ -0,0 +1,129 @@
+"""
+OCR Result Cache
+================
+Persistent, content-addressed cache of OCR output.
+
+Entries are keyed on the image's MD5 plus a fingerprint of the
+preprocessing and OCR settings, and hold the raw OCR boxes and scored
+candidates. The same dashboard screenshots are re-uploaded in every report
+revision, so a hit lets the extractor skip preprocessing and OCR entirely.
+The store is a single SQLite file, shared safely by threads and OCR worker
+processes; the least recently used entries are evicted once it grows past
+its size limit.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import tempfile
+import threading
+from contextlib import contextmanager
+
+OCR_CACHE_ENABLED = os.environ.get('OCR_CACHE_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+OCR_CACHE_DIR = os.environ.get('OCR_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'ocr_cache'))
+OCR_CACHE_MAX_MB = float(os.environ.get('OCR_CACHE_MAX_MB', '256'))
+
+
+class OCRCache:
+    """SQLite-backed LRU cache of OCR results"""
+
+    def __init__(self, directory=OCR_CACHE_DIR, max_bytes=int(OCR_CACHE_MAX_MB * 1024 * 1024)):
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, 'ocr_cache.sqlite3')
+        self.max_bytes = max_bytes
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('''CREATE TABLE IF NOT EXISTS entries (
+                                image_hash TEXT NOT NULL,
+                                fingerprint TEXT NOT NULL,
+                                payload TEXT NOT NULL,
+                                size INTEGER NOT NULL,
+                                created_at REAL NOT NULL,
+                                last_access REAL NOT NULL,
+                                PRIMARY KEY (image_hash, fingerprint))''')
+            conn.execute('CREATE INDEX IF NOT EXISTS entries_lru ON entries (last_access)')
+            # Counters live in the database so they aggregate across worker processes
+            conn.execute('CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)')
+            conn.executemany('INSERT OR IGNORE INTO counters VALUES (?, 0)',
+                             [('hits',), ('misses',), ('evictions',)])
+
+    @contextmanager
+    def _connect(self):
+        # One short-lived connection per operation keeps this thread/process safe
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, image_hash, fingerprint):
+        """Returns the cached payload dict, or None on a miss"""
+        with self._connect() as conn:
+            row = conn.execute('SELECT payload FROM entries WHERE image_hash = ? AND fingerprint = ?',
+                               (image_hash, fingerprint)).fetchone()
+            if row is None:
+                conn.execute("UPDATE counters SET value = value + 1 WHERE name = 'misses'")
+                return None
+            conn.execute('UPDATE entries SET last_access = ? WHERE image_hash = ? AND fingerprint = ?',
+                         (time.time(), image_hash, fingerprint))
+            conn.execute("UPDATE counters SET value = value + 1 WHERE name = 'hits'")
+        return json.loads(row[0])
+
+    def put(self, image_hash, fingerprint, payload):
+        """Stores a payload and evicts least recently used entries over the size limit"""
+        data = json.dumps(payload)
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute('INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?)',
+                         (image_hash, fingerprint, data, len(data), now, now))
+            self._evict(conn)
+
+    def _evict(self, conn):
+        total = conn.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        evicted = 0
+        for image_hash, fingerprint, size in conn.execute(
+                'SELECT image_hash, fingerprint, size FROM entries ORDER BY last_access').fetchall():
+            if total <= self.max_bytes:
+                break
+            conn.execute('DELETE FROM entries WHERE image_hash = ? AND fingerprint = ?', (image_hash, fingerprint))
+            total -= size
+            evicted += 1
+        conn.execute("UPDATE counters SET value = value + ? WHERE name = 'evictions'", (evicted,))
+
+    def clear(self):
+        with self._connect() as conn:
+            conn.execute('DELETE FROM entries')
+
+    def stats(self):
+        with self._connect() as conn:
+            counters = dict(conn.execute('SELECT name, value FROM counters').fetchall())
+            entries, size = conn.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries').fetchone()
+        lookups = counters['hits'] + counters['misses']
+        return {
+            'entries': entries,
+            'bytes': size,
+            'max_bytes': self.max_bytes,
+            'hits': counters['hits'],
+            'misses': counters['misses'],
+            'evictions': counters['evictions'],
+            'hit_rate': round(counters['hits'] / lookups, 3) if lookups else 0.0
+        }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_ocr_cache():
+    """Returns the process-wide cache, or None when caching is disabled"""
+    global _cache
+    if not OCR_CACHE_ENABLED:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = OCRCache()
+        return _cache
@@ -0,0 +1,266 @@
+"""
+OCR Reader Pool
+===============
+Process-wide pool of EasyOCR readers.
+
+Loading the detection and recognition weights takes seconds and a large
+temporary memory spike, so readers are created once, shared by every
+extractor in the process and checked out per job.
+
+easyocr (and with it torch) is only imported when the first reader is
+created, so importing this module - and the service - stays fast. A
+background warm-up loads and exercises a reader right after startup;
+`readiness()` reports when one is usable.
+"""
+
+import os
+import time
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager, nullcontext
+
+OCR_LANGUAGES = ['en']
+DEFAULT_POOL_SIZE = int(os.environ.get('OCR_READER_POOL_SIZE', '1'))
+OCR_WORKERS = int(os.environ.get('OCR_WORKERS', '0'))  # OCR processes per document, 0/1 = in-process
+OCR_TORCH_THREADS = int(os.environ.get('OCR_TORCH_THREADS', '0'))  # Intra-op threads per process, 0 = auto
+OCR_WARMUP = os.environ.get('OCR_WARMUP', 'true').lower() in ('1', 'true', 'yes')  # Load a reader at startup
+
+
+def create_reader():
+    """Loads a new EasyOCR reader (slow: imports torch and reads the model weights)"""
+    import easyocr
+    return easyocr.Reader(OCR_LANGUAGES, gpu=False, verbose=False)
+
+
+class ReaderPool:
+    """Bounded pool of lazily created OCR readers"""
+
+    def __init__(self, size=DEFAULT_POOL_SIZE, factory=create_reader, on_load=None):
+        self.size = max(1, int(size))
+        self._factory = factory
+        self.on_load = on_load  # Called with the model load time of each new reader
+        self._idle = []
+        self._created = 0
+        self._loaded = 0
+        self._busy = 0
+        self._waiting = 0
+        self._cond = threading.Condition()
+
+    def acquire(self, timeout=None):
+        """Checks out a reader, creating one if the pool is not full yet"""
+        with self._cond:
+            self._waiting += 1
+            try:
+                while not self._idle and self._created >= self.size:
+                    if not self._cond.wait(timeout):
+                        raise TimeoutError(f"No OCR reader available after {timeout}s")
+            finally:
+                self._waiting -= 1
+
+            self._busy += 1
+            if self._idle:
+                return self._idle.pop()
+            self._created += 1
+            number = self._created
+
+        # Model loading happens outside the lock so other checkouts are not blocked
+        try:
+            print(f"Initializing EasyOCR reader {number}/{self.size}...")
+            started = time.perf_counter()
+            reader = self._factory()
+            load_seconds = time.perf_counter() - started
+            with self._cond:
+                self._loaded += 1
+            print(f"✓ Reader ready ({load_seconds:.1f}s)")
+            if self.on_load:
+                self.on_load(load_seconds)
+            return reader
+        except Exception:
+            with self._cond:
+                self._created -= 1
+                self._busy -= 1
+                self._cond.notify()
+            raise
+
+    def release(self, reader):
+        """Returns a reader to the pool"""
+        with self._cond:
+            self._busy -= 1
+            self._idle.append(reader)
+            self._cond.notify()
+
+    @contextmanager
+    def reader(self, timeout=None):
+        """Context manager: `with pool.reader() as reader: ...`"""
+        reader = self.acquire(timeout)
+        try:
+            yield reader
+        finally:
+            self.release(reader)
+
+    @property
+    def warm(self):
+        """True when a checkout would not have to load a model"""
+        with self._cond:
+            return bool(self._idle)
+
+    def stats(self):
+        """Snapshot of pool utilisation"""
+        with self._cond:
+            return {
+                'size': self.size,
+                'created': self._created,
+                'loaded': self._loaded,
+                'busy': self._busy,
+                'idle': len(self._idle),
+                'waiting': self._waiting
+            }
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_reader_pool():
+    """Returns the process-wide reader pool, creating it on first use"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ReaderPool()
+        return _pool
+
+
+def checkout_reader(timeout=None):
+    """Reader for one extraction: from the pool, or None when OCR runs in worker processes"""
+    if OCR_WORKERS > 1:
+        return nullcontext()
+    return get_reader_pool().reader(timeout)
+
+
+def exercise_reader(reader):
+    """One OCR pass over a tiny blank image, so the first real request pays no warm-up"""
+    import numpy as np
+    reader.readtext(np.full((32, 128), 255, dtype=np.uint8), detail=1)
+
+
+# ---------------------------------------------------------------------------
+# Startup warm-up and readiness
+# ---------------------------------------------------------------------------
+
+_warmup = {'state': 'idle', 'seconds': None, 'error': None}
+_warmup_lock = threading.Lock()
+
+
+def start_warmup():
+    """Loads and exercises an OCR reader (or the worker processes) in the background"""
+    with _warmup_lock:
+        if _warmup['state'] in ('warming', 'ready'):
+            return
+        _warmup.update(state='warming', error=None)
+    threading.Thread(target=_run_warmup, name='ocr-warmup', daemon=True).start()
+
+
+def _run_warmup():
+    started = time.perf_counter()
+    try:
+        if OCR_WORKERS > 1:
+            pool = get_ocr_process_pool(OCR_WORKERS)
+            for future in [pool.submit(_warm_worker) for _ in range(OCR_WORKERS)]:
+                future.result()
+        else:
+            with get_reader_pool().reader() as reader:
+                exercise_reader(reader)
+        seconds = time.perf_counter() - started
+        with _warmup_lock:
+            _warmup.update(state='ready', seconds=round(seconds, 2))
+        print(f"✓ OCR warm-up complete ({seconds:.1f}s)")
+    except Exception as e:
+        with _warmup_lock:
+            _warmup.update(state='failed', error=str(e))
+        print(f"⚠️  OCR warm-up failed: {e}")
+
+
+def readiness():
+    """(ready, details): ready once a warm OCR reader exists"""
+    with _warmup_lock:
+        warmup = dict(_warmup)
+    if OCR_WORKERS > 1:
+        ready = warmup['state'] == 'ready'
+    else:
+        # A reader loaded by a request counts too (e.g. with OCR_WARMUP off)
+        ready = warmup['state'] == 'ready' or get_reader_pool().stats()['loaded'] > 0
+    return ready, {'warmup': warmup, 'ocr_workers': OCR_WORKERS}
+
+
+# ---------------------------------------------------------------------------
+# OCR worker processes
+# ---------------------------------------------------------------------------
+# Each worker process loads its own reader once in the initializer and keeps
+# it warm for every task it runs. Workers are spawned rather than forked so
+# they never inherit a parent's half-initialised torch/OpenMP thread pools.
+
+_worker_reader = None
+_process_pool = None
+_process_pool_key = None
+_process_pool_lock = threading.Lock()
+
+
+def default_torch_threads(workers):
+    """Splits the CPUs between workers so the two knobs don't oversubscribe"""
+    if OCR_TORCH_THREADS > 0:
+        return OCR_TORCH_THREADS
+    return max(1, (os.cpu_count() or 1) // max(1, workers))
+
+
+def set_torch_threads(threads):
+    """Limits torch intra-op parallelism in the current process"""
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+
+
+def _init_ocr_worker(torch_threads):
+    global _worker_reader
+    set_torch_threads(torch_threads)
+    _worker_reader = create_reader()
+
+
+def get_worker_reader():
+    """Reader owned by the current OCR worker process"""
+    return _worker_reader
+
+
+def _warm_worker():
+    exercise_reader(_worker_reader)
+
+
+def get_ocr_process_pool(workers, torch_threads=None):
+    """Returns the shared OCR process pool, recreating it if the sizing changed"""
+    global _process_pool, _process_pool_key
+    torch_threads = torch_threads or default_torch_threads(workers)
+    with _process_pool_lock:
+        if _process_pool is not None and _process_pool_key != (workers, torch_threads):
+            _process_pool.shutdown(wait=False, cancel_futures=True)
+            _process_pool = None
+        if _process_pool is None:
+            print(f"Starting {workers} OCR worker processes ({torch_threads} torch threads each)...")
+            _process_pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_ocr_worker,
+                initargs=(torch_threads,)
+            )
+            _process_pool_key = (workers, torch_threads)
+        return _process_pool
+
+
+def reset_ocr_process_pool():
+    """Drops a broken pool so the next call starts fresh workers"""
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is not None:
+            _process_pool.shutdown(wait=False, cancel_futures=True)
+            _process_pool = None
@@ -0,0 +1,189 @@
+"""
+Extraction Reports
+==================
+The JSON/CSV exports and the visual debug report (original vs processed
+image, selection reason and top candidates for every metric), all built
+from one serialized form of the results.
+
+- serialize_result: the record shape shared by the /extract response,
+  results.json and results.csv
+- iter_report_html: the report as a stream of HTML chunks, one page of
+  REPORT_PAGE_SIZE metrics at a time. Images are lazy-loaded, so a browser
+  only fetches the ones scrolled into view
+- write_report: streams every page to report.html, report_2.html, ...
+
+Extractions only write the exports. The service renders a report from a
+workspace's results.json when someone opens it; the CLI writes one to disk.
+"""
+
+import os
+import csv
+import json
+from html import escape
+
+REPORT_PAGE_SIZE = int(os.environ.get('REPORT_PAGE_SIZE', '50'))  # Metrics per report page
+RESULTS_FILE = 'results.json'
+CSV_FILE = 'results.csv'
+CSV_FIELDS = ['title', 'value']
+REPORT_CANDIDATES = 5
+
+REPORT_HEAD = """<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="UTF-8">
+    <title>Extraction Debug Report</title>
+    <style>
+        body { font-family: sans-serif; background: #f4f6f8; padding: 20px; }
+        .card { background: white; padding: 20px; margin-bottom: 20px; border-radius: 8px; box-shadow: 0 2px 4px rgba(0,0,0,0.1); }
+        .header { display: flex; justify-content: space-between; align-items: center; border-bottom: 1px solid #eee; padding-bottom: 10px; margin-bottom: 15px; }
+        .value-box { font-size: 24px; font-weight: bold; padding: 5px 15px; border-radius: 4px; }
+        .success { background: #d4edda; color: #155724; }
+        .failure { background: #f8d7da; color: #721c24; }
+        .grid { display: grid; grid-template-columns: 1fr 1fr; gap: 20px; }
+        .img-container { text-align: center; border: 1px solid #eee; padding: 10px; border-radius: 4px; }
+        img { max-width: 100%; height: auto; }
+        .debug-section { margin-top: 15px; background: #f8f9fa; padding: 15px; border-radius: 4px; font-size: 13px; }
+        .candidate { display: flex; justify-content: space-between; padding: 5px; border-bottom: 1px solid #eee; }
+        .candidate.selected { background: #e8f5e9; font-weight: bold; border-left: 3px solid #28a745; }
+        .pages { display: flex; gap: 8px; flex-wrap: wrap; margin: 15px 0; }
+        .pages a, .pages span { padding: 4px 10px; border-radius: 4px; background: white; border: 1px solid #ddd; text-decoration: none; }
+        .pages span { background: #333; color: white; }
+    </style>
+</head>
+<body>
+    <h1>📊 Extraction Debug Report</h1>
+"""
+
+
+def serialize_result(r):
+    """One extractor result as the API, results.json and the report see it"""
+    return {
+        'id': r['id'],
+        'title': r['title'],
+        'value': r['value'],
+        'image_file': r['image_file'],
+        'debug_info': r['debug_info']
+    }
+
+
+def save_exports(output_dir, records):
+    """Writes serialized results to results.json and (title, value) rows to results.csv"""
+    with open(os.path.join(output_dir, RESULTS_FILE), 'w', encoding='utf-8') as f:
+        json.dump(records, f, indent=2, ensure_ascii=False)
+
+    with open(os.path.join(output_dir, CSV_FILE), 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=CSV_FIELDS, extrasaction='ignore')
+        writer.writeheader()
+        writer.writerows(records)
+
+
+def load_results(output_dir):
+    """Serialized results from results.json, or None when the directory has none"""
+    try:
+        with open(os.path.join(output_dir, RESULTS_FILE), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def page_count(total, page_size=REPORT_PAGE_SIZE):
+    return max(1, -(-total // page_size))
+
+
+def _page_links(page, pages, page_href):
+    if pages == 1:
+        return ''
+    links = [f'<span>{n}</span>' if n == page else f'<a href="{escape(page_href(n))}">{n}</a>'
+             for n in range(1, pages + 1)]
+    return f'    <nav class="pages">{"".join(links)}</nav>\n'
+
+
+def _card(r, original_src, processed_src):
+    debug_info = r.get('debug_info') or {}
+    value = r.get('value')
+    status_class = "success" if value is not None else "failure"
+    processed = processed_src(r)
+    lineage = debug_info.get('lineage') or {}
+    if processed:
+        processed_html = f'<img loading="lazy" decoding="async" src="{escape(processed)}">'
+    elif lineage.get('status') == 'reused':
+        processed_html = f"<em>Reused from revision {lineage['revision']}</em>"
+    else:
+        processed_html = '<em>Served from OCR cache</em>'
+
+    candidates = []
+    for c in debug_info.get('candidates', [])[:REPORT_CANDIDATES]:
+        sel_class = "selected" if c['value'] == value else ""
+        candidates.append(f"""
+                <div class="candidate {sel_class}">
+                    <span>Val: {c['value']} (from "{escape(str(c['text']))}")</span>
+                    <span>Score: {c['score']:.0f} | Area: {c['area']:.0f}</span>
+                </div>""")
+
+    return f"""
+    <div class="card">
+        <div class="header">
+            <h3>#{r.get('id', '')} {escape(str(r.get('title', '')))}</h3>
+            <div class="value-box {status_class}">{value if value is not None else "FAILED"}</div>
+        </div>
+
+        <div class="grid">
+            <div class="img-container">
+                <strong>Original Image</strong><br>
+                <img loading="lazy" decoding="async" src="{escape(original_src(r))}">
+            </div>
+            <div class="img-container">
+                <strong>Processed for OCR</strong><br>
+                {processed_html}
+            </div>
+        </div>
+
+        <div class="debug-section">
+            <strong>🏆 Selection Reason:</strong> {escape(str(debug_info.get('selection_reason', '')))}<br><br>
+            <strong>🔢 Top {REPORT_CANDIDATES} Candidates:</strong>
+            <div style="margin-top:5px; border:1px solid #ddd; background:white;">{''.join(candidates)}
+            </div>
+        </div>
+    </div>"""
+
+
+def iter_report_html(records, original_src, processed_src, page_href, page=1, page_size=REPORT_PAGE_SIZE):
+    """Yields one page of the report in chunks: the head, a card per metric, then the closing tags
+
+    original_src(record) and processed_src(record) give image URLs (processed
+    may be None); page_href(n) links to other pages. Raises ValueError for a
+    page outside the report.
+    """
+    pages = page_count(len(records), page_size)
+    if not 1 <= page <= pages:
+        raise ValueError(f"Page {page} is out of range (1-{pages})")
+
+    links = _page_links(page, pages, page_href)
+    yield REPORT_HEAD
+    yield (f'    <p>{len(records)} metrics'
+           + (f', page {page} of {pages}' if pages > 1 else '') + '</p>\n' + links)
+    for r in records[(page - 1) * page_size:page * page_size]:
+        yield _card(r, original_src, processed_src)
+    yield '\n' + links + "</body></html>"
+
+
+def report_page_name(n):
+    return 'report.html' if n == 1 else f'report_{n}.html'
+
+
+def write_report(output_dir, records, page_size=REPORT_PAGE_SIZE):
+    """Streams every page of the report for an output directory laid out by the extractor
+
+    Returns the path of the first page.
+    """
+    def original_src(r):
+        return f"images/{r['image_file']}"
+
+    def processed_src(r):
+        return (r.get('debug_info') or {}).get('processed_image')
+
+    for page in range(1, page_count(len(records), page_size) + 1):
+        with open(os.path.join(output_dir, report_page_name(page)), 'w', encoding='utf-8') as f:
+            for chunk in iter_report_html(records, original_src, processed_src, report_page_name, page, page_size):
+                f.write(chunk)
+    return os.path.join(output_dir, report_page_name(1))
@@ -0,0 +1,140 @@
+"""
+Metrics Service Entry Point
+===========================
+Starts the extraction service in the mode chosen by SERVING_MODE:
+
+- dev (default): the single-process Flask/Werkzeug server, as before.
+- prefork: gunicorn with SERVE_WORKERS worker processes. The OCR model is
+  loaded once in the master before forking, so every worker shares the
+  weights copy-on-write instead of loading its own copy.
+
+Pre-fork workers are recycled after WORKER_MAX_JOBS extraction requests or
+once their RSS passes WORKER_MAX_RSS_MB (0 disables either limit). A worker
+is only recycled while it has no background job queued or running. Each
+worker reports its RSS/PSS on /metrics; PSS summed over the workers is
+the pod's real footprint.
+
+A background job (/jobs) runs in the worker that accepted the upload, but
+its record is shared through the job store (jobs.py), so any worker can
+answer GET or DELETE /jobs/<id>. The admission budgets (admission.py) are
+split evenly between the workers.
+
+Forking after the model load is safe because the master never starts a
+torch/OpenMP thread team: it loads the weights with one intra-op thread and
+runs no inference (the warm-up pass runs in each worker). Every worker then
+sizes its own intra-op pool in post_fork.
+
+Usage:
+    SERVING_MODE=prefork SERVE_WORKERS=4 python serve.py
+"""
+
+import os
+import gc
+from metrics_service import app, job_manager
+from reader_pool import (get_reader_pool, start_warmup, set_torch_threads, default_torch_threads,
+                         OCR_WORKERS, OCR_WARMUP)
+from instrumentation import process_memory
+
+SERVING_MODE = os.environ.get('SERVING_MODE', 'dev')  # 'dev' or 'prefork'
+SERVE_HOST = os.environ.get('SERVE_HOST', '0.0.0.0')
+SERVE_PORT = int(os.environ.get('SERVE_PORT', '5000'))
+SERVE_WORKERS = int(os.environ.get('SERVE_WORKERS', '2'))  # Pre-fork worker processes
+SERVE_THREADS = int(os.environ.get('SERVE_THREADS', '4'))  # Request threads per worker
+SERVE_TIMEOUT = 600  # Matches the dashboard's extraction proxy timeout
+WORKER_MAX_JOBS = int(os.environ.get('WORKER_MAX_JOBS', '0'))  # Extraction requests before recycling, 0 = never
+WORKER_MAX_RSS_MB = float(os.environ.get('WORKER_MAX_RSS_MB', '0'))  # RSS ceiling before recycling, 0 = none
+
+EXTRACTION_PATHS = ('/extract', '/extract-simple', '/extract-batch', '/jobs')
+
+_extractions_served = 0  # Per worker: the counter is copied at fork
+
+
+def preload_model():
+    """Loads the OCR reader in the master so forked workers inherit its weights"""
+    if OCR_WORKERS > 1:
+        print("OCR runs in worker processes (OCR_WORKERS > 1); skipping model preload")
+        return
+    # One thread: the master must not own an OpenMP thread team when it forks
+    set_torch_threads(1)
+    pool = get_reader_pool()
+    pool.release(pool.acquire())
+    # Move everything loaded so far out of the GC's reach: collections would
+    # otherwise touch every object header and un-share the pages
+    gc.freeze()
+    print(f"✓ Model preloaded in master (RSS {process_memory()['rss_mb']} MB)")
+
+
+def post_fork(server, worker):
+    # Each worker builds its own intra-op pool, sharing the CPUs with its siblings
+    set_torch_threads(default_torch_threads(SERVE_WORKERS))
+    # The inherited reader is loaded; the warm-up runs one OCR pass in this process
+    if OCR_WARMUP:
+        start_warmup()
+    print(f"Worker {worker.pid} started")
+
+
+def recycle_reason():
+    if WORKER_MAX_JOBS and _extractions_served >= WORKER_MAX_JOBS:
+        return f"served {_extractions_served} extractions"
+    rss = process_memory()['rss_mb']
+    if WORKER_MAX_RSS_MB and rss is not None and rss > WORKER_MAX_RSS_MB:
+        return f"RSS {rss} MB over {WORKER_MAX_RSS_MB:.0f} MB"
+    return None
+
+
+def post_request(worker, req, environ, resp):
+    global _extractions_served
+    if environ.get('REQUEST_METHOD') == 'POST' and environ.get('PATH_INFO') in EXTRACTION_PATHS:
+        _extractions_served += 1
+
+    reason = recycle_reason()
+    if reason is None:
+        return
+    jobs = job_manager.stats()
+    if jobs['queued'] or jobs['running']:
+        return  # Retried after a later request, once background jobs have drained
+    print(f"♻️  Recycling worker {worker.pid}: {reason}")
+    worker.alive = False  # Gunicorn replaces it with a fresh fork of the master
+
+
+def run_prefork():
+    from gunicorn.app.base import BaseApplication
+
+    class PreforkApplication(BaseApplication):
+        def __init__(self, application, options):
+            self.application = application
+            self.options = options
+            super().__init__()
+
+        def load_config(self):
+            for key, value in self.options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return self.application
+
+    preload_model()
+    print(f"Starting {SERVE_WORKERS} pre-fork workers on {SERVE_HOST}:{SERVE_PORT}")
+    PreforkApplication(app, {
+        'bind': f'{SERVE_HOST}:{SERVE_PORT}',
+        'workers': SERVE_WORKERS,
+        'worker_class': 'gthread',
+        'threads': SERVE_THREADS,
+        'timeout': SERVE_TIMEOUT,
+        'preload_app': True,
+        'post_fork': post_fork,
+        'post_request': post_request
+    }).run()
+
+
+def run_dev():
+    if OCR_WARMUP:
+        start_warmup()
+    app.run(host=SERVE_HOST, port=SERVE_PORT, debug=False)
+
+
+if __name__ == '__main__':
+    if SERVING_MODE == 'prefork':
+        run_prefork()
+    else:
+        run_dev()
@@ -2760,9 +2760,20 @@ app.post('/api/extract-metrics', upload.single('file'), async (req, res) => {
             });
 
             if (response.data.success) {
+                // Image references point at the Python service; route them through this server
+                const metrics = (response.data.metrics || []).map(metric => {
+                    const debug = { ...(metric.debug || {}) };
+                    ['original_image_url', 'processed_image_url', 'processed_thumbnail_url'].forEach(key => {
+                        if (debug[key]) {
+                            debug[key] = debug[key].replace(/^\/artifacts\//, '/api/metrics-artifacts/');
+                        }
+                    });
+                    return { ...metric, debug };
+                });
+
                 return res.json({
                     success: true,
-                    metrics: response.data.metrics,
+                    metrics: metrics,
                     count: response.data.count
                 });
             } else {
@@ -2843,6 +2854,44 @@ app.post('/api/estimate-metrics', upload.single('file'), async (req, res) => {
     }
 });
 
+// Extraction images (originals, processed images, thumbnails) from the Python service
+app.get('/api/metrics-artifacts/*', async (req, res) => {
+    try {
+        const metricsServiceUrl = process.env.METRICS_SERVICE_URL || 'http://localhost:5000';
+
+        // Pass caching and range headers both ways so ETags and partial content keep working
+        const headers = {};
+        ['range', 'if-none-match', 'if-modified-since'].forEach(name => {
+            if (req.headers[name]) {
+                headers[name] = req.headers[name];
+            }
+        });
+
+        const response = await axios.get(`${metricsServiceUrl}/artifacts/${req.params[0]}`, {
+            params: req.query,
+            headers: headers,
+            responseType: 'stream',
+            timeout: 60000,
+            validateStatus: () => true
+        });
+
+        res.status(response.status);
+        ['content-type', 'content-length', 'content-range', 'accept-ranges', 'etag', 'last-modified', 'cache-control'].forEach(name => {
+            if (response.headers[name]) {
+                res.setHeader(name, response.headers[name]);
+            }
+        });
+        response.data.pipe(res);
+    } catch (error) {
+        console.error('Error proxying metrics artifact:', error.message);
+        res.status(503).json({
+            success: false,
+            error: 'Metrics extraction service is unavailable',
+            details: error.message
+        });
+    }
+});
+
 // Health check for metrics service
 app.get('/api/metrics-service-health', async (req, res) => {
     try {
@@ -0,0 +1,165 @@
+"""
+Processing Time Estimator
+=========================
+Learns extraction cost from real runs instead of fixed constants.
+
+Rolling windows of measured samples are kept for:
+- OCR seconds per source megapixel
+- preprocessing seconds per source megapixel
+- reader cold-start (model load) seconds
+- whole-job seconds (to price the queue ahead of a new upload)
+- megapixels per image (when only an image count is known)
+
+Statistics persist to a small JSON file so a restart doesn't forget them.
+Until enough samples exist, priors matching the old hard-coded estimate
+are used with a wide interval.
+"""
+
+import os
+import json
+import math
+import tempfile
+import threading
+from collections import deque
+
+ESTIMATOR_STATE_PATH = os.environ.get('ESTIMATOR_STATE_PATH',
+                                      os.path.join(tempfile.gettempdir(), 'metrics_estimator.json'))
+WINDOW = 200  # Samples kept per statistic
+MIN_SAMPLES = 5  # Below this the prior is blended in
+Z_90 = 1.645  # Two-sided 90% interval
+
+PRIORS = {
+    'ocr_per_mp': 2.3,
+    'preprocess_per_mp': 0.2,
+    'cold_start': 30.0,
+    'job_seconds': 60.0,
+    'mp_per_image': 1.0
+}
+
+
+class RollingStat:
+    """Mean/stdev over the most recent samples, falling back to a prior"""
+
+    def __init__(self, prior, samples=()):
+        self.prior = prior
+        self.samples = deque(samples, maxlen=WINDOW)
+
+    def add(self, value):
+        self.samples.append(float(value))
+
+    @property
+    def count(self):
+        return len(self.samples)
+
+    @property
+    def mean(self):
+        if not self.samples:
+            return self.prior
+        observed = sum(self.samples) / len(self.samples)
+        if len(self.samples) >= MIN_SAMPLES:
+            return observed
+        # Shrink towards the prior while evidence is thin
+        weight = len(self.samples) / MIN_SAMPLES
+        return weight * observed + (1 - weight) * self.prior
+
+    @property
+    def stdev(self):
+        if len(self.samples) < MIN_SAMPLES:
+            return self.mean * 0.5  # Wide until calibrated
+        mean = sum(self.samples) / len(self.samples)
+        return math.sqrt(sum((x - mean) ** 2 for x in self.samples) / (len(self.samples) - 1))
+
+
+class ProcessingTimeEstimator:
+    """Self-calibrating estimate of extraction time with a 90% interval"""
+
+    def __init__(self, path=ESTIMATOR_STATE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        state = self._load()
+        self.stats = {name: RollingStat(prior, state.get(name, ())) for name, prior in PRIORS.items()}
+
+    def _load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def save(self):
+        with self._lock:
+            state = {name: list(stat.samples) for name, stat in self.stats.items()}
+        tmp_path = f'{self.path}.{os.getpid()}.tmp'  # Pre-fork workers share the state file
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(state, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"  ⚠️  Could not persist estimator state: {e}")
+
+    def record_cold_start(self, seconds):
+        with self._lock:
+            self.stats['cold_start'].add(seconds)
+        self.save()
+
+    def record_results(self, results, job_seconds=None):
+        """Feeds the stage timings of a finished extraction into the statistics"""
+        with self._lock:
+            for r in results:
+                timings = r.get('debug_info', {}).get('timings')
+                if not timings or timings.get('cache_hit') or not timings.get('megapixels'):
+                    continue
+                mp = timings['megapixels']
+                self.stats['mp_per_image'].add(mp)
+                self.stats['ocr_per_mp'].add(timings['ocr_seconds'] / mp)
+                self.stats['preprocess_per_mp'].add(timings['preprocess_seconds'] / mp)
+            if job_seconds is not None:
+                self.stats['job_seconds'].add(job_seconds)
+        self.save()
+
+    def estimate(self, image_count, megapixels=None, queue_depth=0, workers=1,
+                 warm_reader=True, parallelism=1):
+        """Estimated seconds for a new upload, with breakdown and 90% interval"""
+        with self._lock:
+            ocr, pre = self.stats['ocr_per_mp'], self.stats['preprocess_per_mp']
+            cold, job = self.stats['cold_start'], self.stats['job_seconds']
+            mp_per_image = self.stats['mp_per_image']
+
+            if megapixels is None:
+                megapixels = image_count * mp_per_image.mean
+            parallelism = max(1, parallelism)
+
+            work = megapixels * (ocr.mean + pre.mean) / parallelism
+            work_var = (megapixels / parallelism) ** 2 * (ocr.stdev ** 2 + pre.stdev ** 2)
+
+            queue_wait = queue_depth * job.mean / max(1, workers)
+            queue_var = queue_depth * job.stdev ** 2 / max(1, workers)
+
+            cold_start = 0.0 if warm_reader else cold.mean
+            cold_var = 0.0 if warm_reader else cold.stdev ** 2
+
+            samples = min(ocr.count, pre.count)
+
+        total = work + queue_wait + cold_start
+        margin = Z_90 * math.sqrt(work_var + queue_var + cold_var)
+        return {
+            'estimated_time_seconds': int(math.ceil(total)),
+            'confidence_interval': {
+                'level': 0.9,
+                'low_seconds': int(max(0, math.floor(total - margin))),
+                'high_seconds': int(math.ceil(total + margin))
+            },
+            'breakdown': {
+                'processing_seconds': round(work, 1),
+                'queue_wait_seconds': round(queue_wait, 1),
+                'cold_start_seconds': round(cold_start, 1)
+            },
+            'megapixels': round(megapixels, 3),
+            'calibration_samples': samples,
+            'calibrated': samples >= MIN_SAMPLES
+        }
+
+    def snapshot(self):
+        with self._lock:
+            return {name: {'mean': round(stat.mean, 4), 'stdev': round(stat.stdev, 4), 'samples': stat.count}
+                    for name, stat in self.stats.items()}
@@ -0,0 +1,215 @@
+"""
+Extraction Workspaces
+=====================
+Isolated per-request directories for uploads and extraction artifacts.
+
+Every extraction that writes to disk gets its own directory under
+WORKSPACE_ROOT instead of a shared `extraction_<pid>` folder, so
+concurrent requests can't overwrite each other's images and reports.
+
+Workspaces outlive their request so reports can be fetched afterwards, and
+are garbage collected by a background sweeper:
+- any workspace not in use and idle for longer than WORKSPACE_TTL_SECONDS
+  is deleted
+- while total usage is over WORKSPACE_QUOTA_MB, the least recently used
+  workspaces that are not in use are deleted
+
+In-use workspaces carry a marker file, so the sweeper of another process
+(pre-fork workers share the root) never deletes one mid-extraction. The
+process holding a workspace touches its marker on every sweep, even while
+a job waits in the queue or for admission without writing anything. A
+marker left untouched for WORKSPACE_STALE_SECONDS was left behind by a
+crashed process, and its workspace expires like any other.
+"""
+
+import os
+import stat
+import time
+import uuid
+import shutil
+import tempfile
+import threading
+
+WORKSPACE_ROOT = os.environ.get('WORKSPACE_ROOT', os.path.join(tempfile.gettempdir(), 'metrics_workspaces'))
+WORKSPACE_QUOTA_MB = float(os.environ.get('WORKSPACE_QUOTA_MB', '2048'))
+WORKSPACE_TTL_SECONDS = int(os.environ.get('WORKSPACE_TTL_SECONDS', '3600'))
+WORKSPACE_SWEEP_SECONDS = int(os.environ.get('WORKSPACE_SWEEP_SECONDS', '300'))
+WORKSPACE_STALE_SECONDS = int(os.environ.get('WORKSPACE_STALE_SECONDS', '86400'))  # Crash recovery for markers
+
+IN_USE_MARKER = '.in_use'
+
+
+class WorkspaceQuotaError(Exception):
+    """Raised when the quota is used up by workspaces that are still in use"""
+
+
+def _directory_usage(path):
+    """(bytes, last modification time) of everything under path"""
+    size, last_modified = 0, os.path.getmtime(path)
+    for root, dirs, files in os.walk(path):
+        for name in dirs + files:
+            try:
+                st = os.stat(os.path.join(root, name))
+            except OSError:
+                continue  # Deleted while walking
+            last_modified = max(last_modified, st.st_mtime)
+            if not stat.S_ISDIR(st.st_mode):
+                size += st.st_size
+    return size, last_modified
+
+
+class WorkspaceManager:
+    """Creates workspaces and enforces the quota and TTL"""
+
+    def __init__(self, root=WORKSPACE_ROOT, quota_bytes=int(WORKSPACE_QUOTA_MB * 1024 * 1024),
+                 ttl=WORKSPACE_TTL_SECONDS, sweep_interval=WORKSPACE_SWEEP_SECONDS,
+                 stale_after=WORKSPACE_STALE_SECONDS):
+        self.root = root
+        self.quota_bytes = quota_bytes
+        self.ttl = ttl
+        self.sweep_interval = sweep_interval
+        self.stale_after = max(stale_after, 2 * sweep_interval)  # Heartbeats must land well inside it
+        self._lock = threading.Lock()
+        self._held = set()  # In-use workspaces of this process
+        self._sweeper = None
+        self._deleted = 0
+        self._freed_bytes = 0
+
+    def _ensure_sweeper(self):
+        # Started lazily, like the job workers, so importing stays cheap
+        with self._lock:
+            if self._sweeper is None or not self._sweeper.is_alive():
+                self._sweeper = threading.Thread(target=self._sweep_forever, name='workspace-sweeper', daemon=True)
+                self._sweeper.start()
+
+    def _sweep_forever(self):
+        while True:
+            time.sleep(self.sweep_interval)
+            try:
+                self.sweep()
+            except Exception as e:
+                print(f"  ⚠️  Workspace sweep failed: {e}")
+
+    def create(self, prefix='extraction'):
+        """Creates a new, in-use workspace and returns its path
+
+        Raises WorkspaceQuotaError when the quota is exhausted even after
+        deleting every workspace that is not in use.
+        """
+        self._ensure_sweeper()
+        if self.usage()['bytes'] >= self.quota_bytes:
+            self.sweep()
+            if self.usage()['bytes'] >= self.quota_bytes:
+                raise WorkspaceQuotaError(
+                    f"Workspace quota of {self.quota_bytes // (1024 * 1024)} MB is used up by running extractions")
+
+        path = os.path.join(self.root, f'{prefix}_{uuid.uuid4().hex}')
+        os.makedirs(path)
+        open(os.path.join(path, IN_USE_MARKER), 'w').close()
+        with self._lock:
+            self._held.add(path)
+        return path
+
+    def release(self, path):
+        """Marks a workspace as finished; it stays available until the TTL or quota removes it"""
+        with self._lock:
+            self._held.discard(path)
+        try:
+            os.remove(os.path.join(path, IN_USE_MARKER))
+        except FileNotFoundError:
+            pass
+
+    def _heartbeat(self):
+        """Touches the markers of this process's in-use workspaces"""
+        with self._lock:
+            held = list(self._held)
+        for path in held:
+            try:
+                os.utime(os.path.join(path, IN_USE_MARKER))
+            except FileNotFoundError:
+                with self._lock:
+                    self._held.discard(path)  # Released or deleted by its owner
+
+    def resolve(self, workspace_id):
+        """Path of an existing workspace from its id (directory name), or None"""
+        if not workspace_id or os.path.basename(workspace_id) != workspace_id or workspace_id.startswith('.'):
+            return None
+        path = os.path.join(self.root, workspace_id)
+        return path if os.path.isdir(path) else None
+
+    def _scan(self):
+        """[(path, bytes, last activity, in use)] of every workspace, least recently used first
+
+        A workspace is in use while its marker has been touched within stale_after.
+        """
+        if not os.path.isdir(self.root):
+            return []
+        now = time.time()
+        workspaces = []
+        for entry in os.scandir(self.root):
+            if not entry.is_dir():
+                continue
+            try:
+                size, last_activity = _directory_usage(entry.path)
+            except OSError:
+                continue  # Removed by another process
+            try:
+                in_use = now - os.path.getmtime(os.path.join(entry.path, IN_USE_MARKER)) <= self.stale_after
+            except OSError:
+                in_use = False
+            workspaces.append((entry.path, size, last_activity, in_use))
+        workspaces.sort(key=lambda w: w[2])
+        return workspaces
+
+    def _delete(self, path, size):
+        shutil.rmtree(path, ignore_errors=True)
+        with self._lock:
+            self._deleted += 1
+            self._freed_bytes += size
+
+    def sweep(self):
+        """Deletes expired workspaces, then the least recently used ones while over quota"""
+        self._heartbeat()
+        now = time.time()
+        workspaces = self._scan()
+        total = sum(size for _, size, _, _ in workspaces)
+        deleted = 0
+        for path, size, last_activity, in_use in workspaces:
+            if in_use:
+                continue
+            if now - last_activity > self.ttl or total > self.quota_bytes:
+                self._delete(path, size)
+                total -= size
+                deleted += 1
+        if deleted:
+            print(f"🧹 Removed {deleted} workspace(s), {total / (1024 * 1024):.1f} MB in use")
+        return deleted
+
+    def usage(self):
+        workspaces = self._scan()
+        with self._lock:
+            deleted, freed = self._deleted, self._freed_bytes
+        return {
+            'root': self.root,
+            'workspaces': len(workspaces),
+            'in_use': sum(1 for w in workspaces if w[3]),
+            'bytes': sum(w[1] for w in workspaces),
+            'quota_bytes': self.quota_bytes,
+            'ttl_seconds': self.ttl,
+            'oldest_age_seconds': round(time.time() - workspaces[0][2], 1) if workspaces else 0,
+            'deleted_total': deleted,
+            'freed_bytes_total': freed
+        }
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_workspace_manager():
+    """Returns the process-wide workspace manager"""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = WorkspaceManager()
+        return _manager